@@ -0,0 +1,167 @@
+"""
+Micro-benchmark da extração de JSON das respostas do juiz.
+
+Compara o extrator único (src/json_extract.py) com a implementação antiga
+de várias passadas (replace/split de cercas, find/rfind e json.loads
+repetido), usando um corpus de respostas do juiz por categoria: JSON puro,
+bloco ```json, texto + JSON, chaves dentro de strings, resposta fused,
+vários objetos, truncada e sem JSON.
+
+O corpus padrão (benchmarks/data/judge_responses.jsonl) é sintético: 17
+respostas escritas à mão, uma ou mais por categoria, no formato visto nos
+juízes. Para medir sobre respostas reais, grave uma avaliação com
+LLM_PROVIDER=record e passe o cassette com --cassette: as respostas do juiz
+são extraídas dele e classificadas por formato (categorize).
+
+Uso:
+    python benchmarks/bench_json_extract.py
+    python benchmarks/bench_json_extract.py --iterations 50000 --corpus <arquivo.jsonl>
+    python benchmarks/bench_json_extract.py --cassette cassettes/llm_cassette.jsonl
+
+O corpus é um JSONL com {"category": ..., "response": ...} por linha.
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from json_extract import JSON_BACKEND, extract_json  # noqa: E402
+
+DEFAULT_CORPUS = ROOT / "benchmarks" / "data" / "judge_responses.jsonl"
+
+# Trecho presente em todos os prompts do juiz (metrics.py)
+JUDGE_PROMPT_MARKER = "Retorne APENAS um objeto JSON"
+
+
+def legacy_extract(response_text: str) -> Optional[Dict[str, Any]]:
+    """Extrator antigo de metrics.py (referência do benchmark), sem o print e sem o score 0.0 de fallback."""
+    text = response_text.strip()
+    if "```" in text:
+        text = text.replace("```json", "```").replace("```JSON", "```")
+        for part in text.split("```"):
+            part = part.strip()
+            if part.startswith("{") and part.endswith("}"):
+                try:
+                    return json.loads(part)
+                except ValueError:
+                    continue
+    start_idx = text.find("{")
+    end_idx = text.rfind("}")
+    if start_idx != -1 and end_idx > start_idx:
+        try:
+            return json.loads(text[start_idx:end_idx + 1])
+        except ValueError:
+            pass
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def new_extract(response_text: str) -> Optional[Dict[str, Any]]:
+    return extract_json(response_text).data
+
+
+def load_corpus(path: Path) -> List[Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def categorize(response_text: str) -> str:
+    """Categoria de formato de uma resposta gravada (subconjunto das categorias do corpus sintético)."""
+    text = response_text.strip()
+    if "{" not in text:
+        return "no_object"
+    if "```" in text:
+        return "fenced"
+    if extract_json(text).data is None:
+        return "truncated"
+    return "clean" if text.startswith("{") and text.endswith("}") else "prose"
+
+
+def load_cassette_corpus(path: Path) -> List[Dict[str, str]]:
+    """
+    Corpus com as respostas do juiz gravadas em um cassette (LLM_PROVIDER=record).
+
+    São consideradas do juiz as chamadas em JSON mode ou cujo prompt pede o objeto JSON.
+    """
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            prompt = "\n".join(str(m.get("content", "")) for m in entry.get("messages", []))
+            if entry.get("json_mode") or JUDGE_PROMPT_MARKER in prompt:
+                corpus.append({"category": categorize(entry["response"]), "response": entry["response"]})
+    return corpus
+
+
+def time_calls(func: Callable[[str], Any], responses: List[str], iterations: int) -> float:
+    """Chamadas por segundo de `func` percorrendo as respostas em ciclo."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(responses[i % len(responses)])
+    return iterations / (time.perf_counter() - start)
+
+
+def run(corpus: List[Dict[str, str]], iterations: int) -> Dict[str, Any]:
+    """
+    Mede chamadas/s por categoria para as duas implementações e quantas
+    respostas cada uma consegue extrair.
+
+    Returns:
+        Dict com backend e, por categoria, {responses, legacy_calls_per_s,
+        new_calls_per_s, speedup, legacy_parsed, new_parsed}
+    """
+    by_category: Dict[str, List[str]] = defaultdict(list)
+    for row in corpus:
+        by_category[row["category"]].append(row["response"])
+    by_category["all"] = [row["response"] for row in corpus]
+
+    categories = {}
+    for category, responses in by_category.items():
+        legacy = time_calls(legacy_extract, responses, iterations)
+        new = time_calls(new_extract, responses, iterations)
+        categories[category] = {
+            "responses": len(responses),
+            "legacy_calls_per_s": round(legacy, 1),
+            "new_calls_per_s": round(new, 1),
+            "speedup": round(new / legacy, 2),
+            "legacy_parsed": sum(legacy_extract(r) is not None for r in responses),
+            "new_parsed": sum(new_extract(r) is not None for r in responses),
+        }
+    return {"backend": JSON_BACKEND, "iterations": iterations, "categories": categories}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da extração de JSON das respostas do juiz")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS,
+                        help="JSONL com category/response (padrão: corpus sintético)")
+    parser.add_argument("--cassette", type=Path, default=None,
+                        help="Cassette gravado com LLM_PROVIDER=record: usa as respostas reais do juiz")
+    parser.add_argument("--iterations", type=int, default=20000, help="Chamadas por categoria e implementação")
+    args = parser.parse_args()
+
+    corpus = load_cassette_corpus(args.cassette) if args.cassette else load_corpus(args.corpus)
+    if not corpus:
+        print(f"❌ Nenhuma resposta do juiz em {args.cassette or args.corpus}")
+        return
+    report = run(corpus, args.iterations)
+    source = f"cassette {args.cassette}" if args.cassette else f"corpus {args.corpus.name}"
+    print(f"📦 Backend JSON: {report['backend']} | {args.iterations} chamadas por categoria | {source}\n")
+    print(f"{'categoria':<18} {'n':>3} {'antigo/s':>11} {'novo/s':>11} {'speedup':>8} {'extraídos (antigo → novo)':>27}")
+    for category, r in report["categories"].items():
+        print(f"{category:<18} {r['responses']:>3} {r['legacy_calls_per_s']:>11.0f} {r['new_calls_per_s']:>11.0f} "
+              f"{r['speedup']:>7.2f}x {r['legacy_parsed']:>15} → {r['new_parsed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark do pipeline de avaliação contra o provider simulado (LLM_PROVIDER=fake).
+
+Mede, para cada tamanho de dataset e nível de concorrência:
+- extract_json_from_response (chamadas/s)
+- funções de métrica isoladas (judge calls/s, p50/p95)
+- GlobalEvaluator.evaluate_run (exemplos/s, p50/p95)
+- caminho local de run_evaluation_for_prompt (exemplos/s, judge calls/s, p50/p95)
+e o pico de memória (RSS) de cada cenário, executado em um processo separado.
+
+Uso:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes 22,1000,10000 --concurrency 1,4,16 --latency-ms 5
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/<anterior>.json
+
+Os resultados são gravados em benchmarks/results/<data>-<commit>.json.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+DATASET_PATH = ROOT / "datasets" / "bug_to_user_story.jsonl"
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Métricas reportadas e se "maior é melhor" (usado no --compare)
+COMPARED_FIELDS = {
+    "examples_per_s": True,
+    "judge_calls_per_s": True,
+    "calls_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentil por interpolação linear (p entre 0 e 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo atual, em MB (None se indisponível)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS reporta bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def latency_summary(latencies_s: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(latencies_s, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies_s, 95) * 1000, 3),
+    }
+
+
+def make_dataset(size: int, path: str):
+    """Gera um JSONL com `size` exemplos ciclando o dataset do repositório (inputs únicos)."""
+    base = [json.loads(line) for line in DATASET_PATH.read_text(encoding="utf-8").splitlines() if line.strip()]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(size):
+            example = json.loads(json.dumps(base[i % len(base)]))
+            if i >= len(base):
+                example["inputs"]["bug_report"] += f" (variação {i // len(base)})"
+            f.write(json.dumps(example, ensure_ascii=False) + "\n")
+
+
+def load_examples(size: int) -> List[SimpleNamespace]:
+    from local_runner import iter_jsonl_examples
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dataset.jsonl")
+        make_dataset(size, path)
+        return list(iter_jsonl_examples(path))
+
+
+def fake_client():
+    """Cliente simulado compartilhado (mesmo modelo/temperatura do gerador e do juiz)."""
+    from utils import get_llm
+    return get_llm(model="fake-chat", temperature=0.0)
+
+
+# === Cenários (executados no processo filho) ===
+
+def bench_json_extraction(iterations: int, **_) -> Dict[str, Any]:
+    from json_extract import extract_json_from_response
+    corpus = [
+        '{"score": 0.95, "reasoning": "Tom profissional."}',
+        'Segue a avaliação:\n```json\n{"score": 0.9, "reasoning": "ok"}\n```',
+        'Raciocínio: a história cobre o bug.\n{"precision": 0.9, "recall": 0.8, "reasoning": "ok"}\nFim.',
+    ]
+    start = time.perf_counter()
+    for i in range(iterations):
+        extract_json_from_response(corpus[i % len(corpus)])
+    elapsed = time.perf_counter() - start
+    return {"calls": iterations, "calls_per_s": round(iterations / elapsed, 1)}
+
+
+def bench_metric_functions(size: int, concurrency: int, **_) -> Dict[str, Any]:
+    from metrics import evaluate_tone_score
+    examples = load_examples(size)
+    client = fake_client()
+    story = "# Titulo\n\n**Como** cliente, **Eu quero** comprar, **Para que** receba."
+
+    def timed(example):
+        start = time.perf_counter()
+        evaluate_tone_score(example.inputs["bug_report"], story, example.outputs["reference"], model="fake-chat")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, examples))
+    elapsed = time.perf_counter() - start
+    return {
+        "judge_calls": client.call_stats()["judge"],
+        "judge_calls_per_s": round(client.call_stats()["judge"] / elapsed, 2),
+        **latency_summary(latencies),
+    }
+
+
+def bench_evaluate_run(size: int, concurrency: int, **_) -> Dict[str, Any]:
+    from evaluate import GlobalEvaluator
+    examples = load_examples(size)
+    client = fake_client()
+    evaluator = GlobalEvaluator(model_name="fake-chat")
+    story = fake_client().invoke("Bug Report: \"benchmark\"").content
+    baseline_calls = client.call_stats()["judge"]
+
+    def timed(example):
+        run = SimpleNamespace(outputs={"output": story})
+        start = time.perf_counter()
+        evaluator.evaluate_run(run, example)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, examples))
+    elapsed = time.perf_counter() - start
+    judge_calls = client.call_stats()["judge"] - baseline_calls
+    return {
+        "examples_per_s": round(size / elapsed, 2),
+        "judge_calls_per_s": round(judge_calls / elapsed, 2),
+        **latency_summary(latencies),
+    }
+
+
+def bench_local_pipeline(size: int, concurrency: int, **_) -> Dict[str, Any]:
+    from evaluate import run_evaluation_for_prompt
+    client = fake_client()
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = os.path.join(tmp, "dataset.jsonl")
+        make_dataset(size, dataset)
+        start = time.perf_counter()
+        run_evaluation_for_prompt(
+            "bug_to_user_story_v2", model_name="fake-chat", use_cache=False,
+            local_dataset=dataset, max_workers=concurrency, results_dir=tmp
+        )
+        elapsed = time.perf_counter() - start
+        results_file = next(Path(tmp).glob("*-eval-*.jsonl"))
+        records = [json.loads(line) for line in results_file.read_text(encoding="utf-8").splitlines()]
+
+    latencies = [r["timings"]["generation_s"] + r["timings"]["judge_s"] for r in records]
+    stats = client.call_stats()
+    return {
+        "examples_per_s": round(size / elapsed, 2),
+        "judge_calls_per_s": round(stats["judge"] / elapsed, 2),
+        "llm_calls": stats["total"],
+        **latency_summary(latencies),
+    }
+
+
+SCENARIOS = {
+    "json_extraction": bench_json_extraction,
+    "metric_functions": bench_metric_functions,
+    "evaluate_run": bench_evaluate_run,
+    "local_pipeline": bench_local_pipeline,
+}
+
+
+def run_scenario(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Executa um cenário (no processo filho) e anexa o pico de RSS."""
+    os.chdir(ROOT)
+    warnings.filterwarnings("ignore", category=FutureWarning)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = SCENARIOS[name](**params)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_isolated(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Executa o cenário em um processo novo, para medir o pico de RSS isoladamente."""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_scenario, (name, params))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    """Imprime a variação percentual de cada métrica em relação a um resultado anterior."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["scenario"], r.get("size"), r.get("concurrency")): r for r in baseline["results"]}
+
+    print(f"\n📈 Comparação com {baseline.get('commit')} ({baseline_path}):")
+    for row in current["results"]:
+        old = previous.get((row["scenario"], row.get("size"), row.get("concurrency")))
+        if not old:
+            continue
+        for field, higher_is_better in COMPARED_FIELDS.items():
+            if field in row and old.get(field):
+                delta = (row[field] - old[field]) / old[field] * 100
+                worse = delta < 0 if higher_is_better else delta > 0
+                flag = "⚠️ " if worse and abs(delta) > 10 else "  "
+                print(f"  {flag}{row['scenario']:<17} n={row.get('size', '-'):<6} c={row.get('concurrency', '-'):<3} "
+                      f"{field:<18} {old[field]:>10} -> {row[field]:>10} ({delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de avaliação (provider simulado)")
+    parser.add_argument("--sizes", type=str, default="22,1000,10000", help="Tamanhos de dataset (separados por vírgula)")
+    parser.add_argument("--concurrency", type=str, default="4,16", help="Níveis de concorrência (separados por vírgula)")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latência simulada por chamada ao LLM")
+    parser.add_argument("--jitter-ms", type=float, default=1.0, help="Jitter da latência simulada")
+    parser.add_argument("--scenarios", type=str, default=",".join(SCENARIOS), help="Cenários a executar")
+    parser.add_argument("--json-iterations", type=int, default=20000, help="Iterações do cenário json_extraction")
+    parser.add_argument("--output", type=str, default=None, help="Arquivo JSON de saída")
+    parser.add_argument("--compare", type=str, default=None, help="Resultado anterior para comparação")
+    args = parser.parse_args()
+
+    # Herdado pelos processos filhos
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["FAKE_LLM_ERROR_RATE"] = "0"
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    scenarios = args.scenarios.split(",")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms},
+        "results": [],
+    }
+
+    for name in scenarios:
+        grid = [{"iterations": args.json_iterations}] if name == "json_extraction" else \
+            [{"size": n, "concurrency": c} for n in sizes for c in levels]
+        for params in grid:
+            print(f"⏱️  {name} {params} ...", flush=True)
+            result = run_isolated(name, params)
+            report["results"].append({"scenario": name, **params, **result})
+            print(f"   {result}")
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    output = args.output or str(RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit']}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Resultados salvos em {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Ponto de entrada único dos scripts do projeto.
+
+Uso (na raiz do repositório):
+    python -m src evaluate --prompt bug_to_user_story_v2 --local datasets/bug_to_user_story.jsonl
+    python -m src compare --sequential
+    python -m src pull | push | upload
+    python -m src --version
+
+Os módulos de cada comando (e, através deles, os providers de LLM e o SDK
+do LangSmith) só são importados depois que o comando é escolhido: --help e
+--version respondem sem carregar nada pesado e informam o tempo de
+inicialização.
+"""
+
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import importlib
+import os
+import sys
+from typing import List, Optional
+
+__version__ = "0.1.0"
+
+# comando -> (módulo em src/, descrição); cada módulo expõe main(argv)
+COMMANDS = {
+    "evaluate": ("evaluate", "Avalia um prompt (LangSmith ou dataset local com --local)"),
+    "compare": ("compare_prompts", "Compara os prompts v1 e v2 e gera o relatório em Markdown"),
+    "pull": ("pull_prompts", "Puxa os prompts do LangSmith Prompt Hub"),
+    "push": ("push_prompts", "Envia o prompt v2 para o LangSmith Hub"),
+    "upload": ("upload_dataset", "Sincroniza o dataset local (JSONL) com o LangSmith"),
+}
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    commands = "\n".join(f"  {name:<10} {description}" for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Avaliação e otimização do prompt Bug to User Story.",
+        epilog=f"comandos:\n{commands}\n\nUse 'python -m src <comando> --help' para as opções de cada comando.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        add_help=False,
+    )
+    # --help tratado em main() (e não pelo argparse, que encerra o processo) para incluir o tempo de inicialização
+    parser.add_argument("-h", "--help", action="store_true", help="Mostra esta ajuda e o tempo de inicialização")
+    parser.add_argument("--version", action="store_true", help="Mostra a versão e o tempo de inicialização")
+    parser.add_argument("command", nargs="?", choices=list(COMMANDS), metavar="<comando>",
+                        help="Comando a executar (lista abaixo)")
+    return parser
+
+
+def startup_report() -> str:
+    """Tempo desde o início deste módulo e CPU desde o início do processo (inclui o interpretador)."""
+    return (f"⚡ Inicialização: {(time.perf_counter() - _START) * 1000:.1f} ms "
+            f"({time.process_time() * 1000:.0f} ms de CPU no processo, {len(sys.modules)} módulos carregados)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    # Opções globais só antes do comando; o resto vai inteiro para o main() do comando
+    split = next((i for i, arg in enumerate(argv) if not arg.startswith("-")), len(argv))
+    parser = build_parser()
+    args = parser.parse_args(argv[:split + 1])
+
+    if args.version:
+        print(f"mba-ia-pull-evaluation-prompt {__version__}")
+        print(startup_report())
+        return 0
+    if args.help or args.command is None:
+        parser.print_help()
+        print(f"\n{startup_report()}")
+        return 0
+
+    # Os scripts importam uns aos outros pelo nome (from metrics import ...), como em python src/<script>.py
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    module = importlib.import_module(COMMANDS[args.command][0])
+    sys.argv[0] = f"python -m src {args.command}"  # prog exibido no --help do comando
+    return module.main(argv[split + 1:]) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+"""
+Avaliação pela batch API do provider (--batch), para execuções noturnas.
+
+Em vez de uma chamada interativa por geração e por métrica, a avaliação
+roda em jobs batch — mais baratos e fora dos rate limits interativos:
+
+1. generate: um request por exemplo (prompt renderizado + stop sequences)
+2. judge:    para cada saída normalizada, um request por métrica que não
+             foi resolvida pela pré-checagem (metrics.batch_judge_messages)
+3. re-ask:   as respostas do juiz fora do schema voltam em um job extra,
+             com a resposta anterior e o erro de validação
+
+Cada fase grava um JSONL no formato da Batch API da OpenAI
+(custom_id/method/url/body), submete, aguarda o fim do job (polling) e lê
+o JSONL de saída. Os registros por exemplo vão para o ResultsStore no mesmo
+formato dos outros motores, então médias, --resume e o resumo são os mesmos.
+
+Só um job "completed" é definitivo: nele, a requisição que falhou vira
+score 0.0 (como uma falha definitiva no modo interativo). Se o job termina
+failed/expired/cancelled, os exemplos sem resposta não são gravados e
+continuam pendentes para o --resume.
+
+Backends:
+- openai: Batch API (/v1/chat/completions, janela de 24h)
+- local:  processa o arquivo em uma thread com o cliente do provider local
+          (LLM_PROVIDER=fake|record|replay) e grava a saída no mesmo formato
+- google: o SDK google-generativeai não expõe batch — use o modo interativo
+"""
+
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langsmith.evaluation.evaluator import EvaluationResult
+
+from local_runner import LocalRun, result_to_record
+from metrics import BATCH_JUDGE_METRICS, batch_judge_messages, parse_batch_judgment
+from profiling import span
+from usage import example_scope, get_usage_tracker, merge_usage, track_stage
+from utils import get_llm, json_mode_kwargs, resolve_llm_provider
+
+DEFAULT_POLL_INTERVAL_S = 30.0
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+# Status finais de um job (nomes da Batch API da OpenAI, usados também pelo backend local)
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+_MESSAGE_TYPES = {"system": SystemMessage, "user": HumanMessage, "assistant": AIMessage}
+
+# Ids dos jobs do backend local (únicos no processo, como os da API)
+_local_job_ids = itertools.count(1)
+
+
+@dataclass
+class BatchRequest:
+    """Uma requisição do job: mensagens e parâmetros do chat completion."""
+    custom_id: str
+    messages: List[BaseMessage]
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BatchResult:
+    """Resposta de uma requisição do job (content None se a requisição falhou)."""
+    content: Optional[str]
+    usage: Dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def write_batch_file(path: str, requests: List[BatchRequest], model: str) -> str:
+    """
+    Grava as requisições no JSONL de entrada da Batch API.
+
+    Returns:
+        O caminho do arquivo
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            body = {"model": model,
+                    "messages": [{"role": _ROLES[m.type], "content": m.content} for m in request.messages],
+                    **request.params}
+            f.write(json.dumps({"custom_id": request.custom_id, "method": "POST", "url": CHAT_COMPLETIONS_URL,
+                                "body": body}, ensure_ascii=False) + "\n")
+    return path
+
+
+def parse_output_line(line: str) -> Tuple[str, BatchResult]:
+    """Converte uma linha do JSONL de saída (ou de erros) da Batch API em (custom_id, BatchResult)."""
+    data = json.loads(line)
+    response = data.get("response") or {}
+    body = response.get("body") or {}
+    error = data.get("error") or body.get("error")
+    if error or response.get("status_code", 200) != 200:
+        message = (error or {}).get("message") if isinstance(error, dict) else error
+        return data["custom_id"], BatchResult(None, error=message or f"HTTP {response.get('status_code')}")
+
+    usage = body.get("usage") or {}
+    return data["custom_id"], BatchResult(
+        content=body["choices"][0]["message"].get("content") or "",
+        usage={"prompt_tokens": usage.get("prompt_tokens", 0),
+               "completion_tokens": usage.get("completion_tokens", 0),
+               "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0},
+    )
+
+
+class OpenAIBatchBackend:
+    """Batch API da OpenAI: upload do arquivo, criação do job, polling e download da saída."""
+
+    name = "openai"
+
+    def __init__(self, client: Any = None):
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI()
+        self.client = client
+
+    def submit(self, path: str) -> str:
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        job = self.client.batches.create(input_file_id=uploaded.id, endpoint=CHAT_COMPLETIONS_URL,
+                                         completion_window="24h")
+        return job.id
+
+    def poll(self, job_id: str) -> Dict[str, Any]:
+        job = self.client.batches.retrieve(job_id)
+        counts = job.request_counts
+        return {"status": job.status, "completed": getattr(counts, "completed", 0) if counts else 0,
+                "failed": getattr(counts, "failed", 0) if counts else 0}
+
+    def results(self, job_id: str) -> Dict[str, BatchResult]:
+        job = self.client.batches.retrieve(job_id)
+        results = {}
+        # Job expirado/cancelado ainda pode ter saída parcial; requisições sem linha viram falha no chamador
+        for file_id in (job.output_file_id, job.error_file_id):
+            if file_id:
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if line.strip():
+                        custom_id, result = parse_output_line(line)
+                        results[custom_id] = result
+        return results
+
+
+class LocalBatchBackend:
+    """
+    Stand-in local da Batch API: processa o arquivo de entrada em uma thread
+    (com o cliente do provider local) e grava a saída no formato da OpenAI.
+    """
+
+    name = "local"
+
+    def __init__(self, llm: Any, max_workers: int = 4):
+        self.llm = llm
+        self.max_workers = max_workers
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _answer(self, line: str) -> Tuple[str, bool]:
+        request = json.loads(line)
+        body = request["body"]
+        messages = [_MESSAGE_TYPES[m["role"]](content=m["content"]) for m in body["messages"]]
+        # JSON mode do corpo (formato OpenAI) no formato do cliente local, como nas chamadas interativas
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        call_kwargs = json_mode_kwargs(self.llm) if json_mode else {}
+        try:
+            message = self.llm.invoke(messages, stop=body.get("stop"), **call_kwargs)
+        except Exception as e:
+            return json.dumps({"custom_id": request["custom_id"], "response": None,
+                               "error": {"message": str(e)}}, ensure_ascii=False), False
+        usage = message.usage_metadata or {}
+        completion = {
+            "object": "chat.completion",
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": message.content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": usage.get("input_tokens", 0),
+                      "completion_tokens": usage.get("output_tokens", 0),
+                      "prompt_tokens_details": {
+                          "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read") or 0}},
+        }
+        return json.dumps({"custom_id": request["custom_id"],
+                           "response": {"status_code": 200, "body": completion}, "error": None},
+                          ensure_ascii=False), True
+
+    def _process(self, job: Dict[str, Any]):
+        with open(job["input_path"], encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            outputs = list(pool.map(self._answer, lines))
+        with open(job["output_path"], "w", encoding="utf-8") as f:
+            f.write("".join(output + "\n" for output, _ in outputs))
+        with self._lock:
+            job["completed"] = sum(ok for _, ok in outputs)
+            job["failed"] = len(outputs) - job["completed"]
+            job["status"] = "completed"
+
+    def submit(self, path: str) -> str:
+        job_id = f"local-batch-{next(_local_job_ids)}"
+        job = {"status": "in_progress", "input_path": path, "completed": 0, "failed": 0,
+               "output_path": path.replace(".jsonl", "") + ".output.jsonl"}
+        with self._lock:
+            self._jobs[job_id] = job
+        threading.Thread(target=self._process, args=(job,), name=job_id, daemon=True).start()
+        return job_id
+
+    def poll(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            job = self._jobs[job_id]
+            return {"status": job["status"], "completed": job["completed"], "failed": job["failed"]}
+
+    def results(self, job_id: str) -> Dict[str, BatchResult]:
+        with self._lock:
+            output_path = self._jobs[job_id]["output_path"]
+        with open(output_path, encoding="utf-8") as f:
+            return dict(parse_output_line(line) for line in f if line.strip())
+
+
+def batch_backend_for(model: Optional[str], temperature: float = 0.0):
+    """
+    Backend batch do provider resolvido para o modelo.
+
+    Raises:
+        ValueError: provider sem batch API neste projeto (Google)
+    """
+    provider, model_name = resolve_llm_provider(model)
+    if provider in ("fake", "record", "replay"):
+        return LocalBatchBackend(get_llm(model=model, temperature=temperature)), model_name
+    if provider == "openai":
+        return OpenAIBatchBackend(), model_name
+    raise ValueError(f"Modo --batch indisponível para o provider {provider}: "
+                     "o SDK google-generativeai não expõe batch; use o modo interativo ou a OpenAI")
+
+
+def run_batch_job(backend: Any, path: str, requests: List[BatchRequest], model: str, phase: str,
+                  poll_interval_s: float = DEFAULT_POLL_INTERVAL_S) -> Tuple[Dict[str, BatchResult], Dict[str, Any]]:
+    """
+    Grava, submete e aguarda um job batch.
+
+    Returns:
+        ({custom_id: BatchResult}, estatísticas do job: phase, job_id, requests, status, completed, failed, wall_s)
+    """
+    start = time.perf_counter()
+    with span(f"batch:{phase}"):
+        job_id = backend.submit(write_batch_file(path, requests, model))
+        print(f"📦 Job batch {phase} submetido ({backend.name}): {job_id} | {len(requests)} requisições")
+        last = None
+        while True:
+            state = backend.poll(job_id)
+            if state != last:
+                print(f"   ⏳ {job_id}: {state['status']} ({state['completed']}/{len(requests)} concluídas, "
+                      f"{state['failed']} falhas)")
+                last = state
+            if state["status"] in TERMINAL_STATUSES:
+                break
+            time.sleep(poll_interval_s)
+        results = backend.results(job_id)
+    stats = {"phase": phase, "job_id": job_id, "requests": len(requests), "status": state["status"],
+             "completed": sum(r.error is None for r in results.values()),
+             "failed": len(requests) - sum(r.error is None for r in results.values()),
+             "wall_s": time.perf_counter() - start}
+    return results, stats
+
+
+def _record_usage(usage: Dict[str, Dict[str, float]], stage: str, result: Optional[BatchResult]):
+    """Registra o uso de uma resposta do job no tracker global e no acumulador do exemplo."""
+    tokens = result.usage if result is not None else {}
+    with example_scope() as call_usage:
+        get_usage_tracker().record(stage, tokens.get("prompt_tokens", 0), tokens.get("completion_tokens", 0),
+                                   cached_tokens=tokens.get("cached_tokens", 0))
+    usage.update(merge_usage([usage, call_usage]))
+
+
+def run_batch_evaluation(examples: List[Any], prompt: Any, model_name: str, judge_model: str, store: Any,
+                         file_prefix: str, normalizer: Any, prechecker: Any = None, stop: Optional[List[str]] = None,
+                         early_stop: Any = None, temperature: float = 0.0,
+                         poll_interval_s: float = DEFAULT_POLL_INTERVAL_S) -> List[Dict[str, Any]]:
+    """
+    Avalia os exemplos em jobs batch (geração, juiz e re-ask) e grava um registro por exemplo.
+
+    Args:
+        examples: Exemplos pendentes (LocalExample ou langsmith Example)
+        prompt: PromptTemplate do gerador
+        model_name: Modelo gerador
+        judge_model: Modelo avaliador
+        store: ResultsStore do experimento
+        file_prefix: Prefixo dos arquivos dos jobs (<prefixo>.batch-<fase>.jsonl)
+        normalizer: OutputNormalizer da versão do prompt
+        prechecker: Prechecker (None = sempre consulta o juiz)
+        stop: Stop sequences do gerador
+        early_stop: EarlyStopStats que recebe as saídas do gerador (opcional)
+        temperature: Temperatura do gerador
+        poll_interval_s: Intervalo entre consultas ao status do job
+
+    Returns:
+        Estatísticas dos jobs (uma entrada por fase executada; pending_examples =
+        exemplos deixados sem registro porque o job não terminou "completed")
+    """
+    jobs: List[Dict[str, Any]] = []
+    if not examples:
+        return jobs
+    unfinished = set()  # exemplos que um job interrompido não cobriu: sem registro, pendentes para o --resume
+
+    def answered(result: Optional[BatchResult], stats: Dict[str, Any]) -> bool:
+        """Se a requisição tem desfecho definitivo (resposta, ou erro dentro de um job concluído)."""
+        return stats["status"] == "completed" or (result is not None and result.error is None)
+
+    def report_unfinished(stats: Dict[str, Any], indices: set):
+        stats["pending_examples"] = len(indices)
+        if indices:
+            print(f"⚠️  Job {stats['phase']} ({stats['job_id']}) terminou {stats['status']}: "
+                  f"{len(indices)} exemplos sem resposta ficam pendentes para o --resume")
+        unfinished.update(indices)
+    usage: Dict[str, Dict[str, Dict[str, float]]] = {str(e.id): {} for e in examples}
+
+    # 1. Gerações
+    backend, gen_model = batch_backend_for(model_name, temperature)
+    gen_params: Dict[str, Any] = {"temperature": temperature, **({"stop": stop} if stop else {})}
+    gen_requests = [BatchRequest(f"gen-{i}", [HumanMessage(content=prompt.format(**e.inputs))], gen_params)
+                    for i, e in enumerate(examples)]
+    gen_results, stats = run_batch_job(backend, f"{file_prefix}.batch-generate.jsonl", gen_requests, gen_model,
+                                       "generate", poll_interval_s)
+    jobs.append(stats)
+
+    outputs, stories, errors = {}, {}, {}
+    report_unfinished(stats, {i for i in range(len(examples)) if not answered(gen_results.get(f"gen-{i}"), stats)})
+    for i, example in enumerate(examples):
+        result = gen_results.get(f"gen-{i}")
+        _record_usage(usage[str(example.id)], "generate", result)
+        if i in unfinished:
+            continue
+        if result is None or result.error is not None:
+            errors[i] = result.error if result is not None else "sem resposta no job"
+            print(f"❌ Erro ao gerar saída para o exemplo {example.id}: {errors[i]}")
+        outputs[i] = result.content if result is not None and result.error is None else ""
+        if early_stop is not None and i not in errors:
+            early_stop.record(outputs[i])
+        with track_stage("parse"):
+            stories[i] = normalizer.normalize(outputs[i]).text
+
+    # 2. Juiz: uma requisição por (exemplo, métrica) que a pré-checagem não resolveu
+    judged: Dict[int, Dict[str, Dict[str, Any]]] = {i: {} for i in stories}
+    pending: Dict[str, Tuple[int, str, Optional[Tuple[str, str]]]] = {}
+    for i, story in stories.items():
+        if not story:
+            continue
+        if prechecker is not None:
+            judged[i].update(prechecker.run(story))
+        for metric in BATCH_JUDGE_METRICS:
+            if metric not in judged[i]:
+                pending[f"judge-{i}-{metric}"] = (i, metric, None)
+
+    judge_backend, judge_model_name = batch_backend_for(judge_model)
+    judge_params = {"temperature": 0.0, "response_format": {"type": "json_object"}}
+    for phase in ("judge", "reask"):
+        pending = {custom_id: entry for custom_id, entry in pending.items() if entry[0] not in unfinished}
+        if not pending:
+            break
+        requests = []
+        for custom_id, (i, metric, correction) in pending.items():
+            example = examples[i]
+            reference = example.outputs.get("user_story") or example.outputs.get("reference")
+            requests.append(BatchRequest(custom_id, batch_judge_messages(
+                metric, example.inputs.get("bug_report"), stories[i], reference, correction), judge_params))
+        results, stats = run_batch_job(judge_backend, f"{file_prefix}.batch-{phase}.jsonl", requests,
+                                       judge_model_name, phase, poll_interval_s)
+        jobs.append(stats)
+        report_unfinished(stats, {i for custom_id, (i, _, _) in pending.items()
+                                  if not answered(results.get(custom_id), stats)})
+
+        reask = {}
+        for custom_id, (i, metric, _) in pending.items():
+            result = results.get(custom_id)
+            _record_usage(usage[str(examples[i].id)], f"judge:{BATCH_JUDGE_METRICS[metric][2]}", result)
+            if i in unfinished:
+                continue
+            error = (result.error if result is not None else "sem resposta no job")
+            parsed, correction = parse_batch_judgment(metric, result.content if result is not None else None,
+                                                      error=error, reasked=phase == "reask")
+            if correction is not None:
+                reask[custom_id.replace("judge-", "reask-", 1)] = (i, metric, correction)
+            else:
+                judged[i][metric] = parsed
+        pending = reask
+
+    # 3. Registros por exemplo (mesmo formato do runner local); os não cobertos ficam para o --resume
+    for i, example in enumerate(examples):
+        if i in unfinished:
+            continue
+        if not stories[i]:
+            evaluation = {"results": [EvaluationResult(key="error", score=0, comment="No output")]}
+        else:
+            evaluation = {"results": [EvaluationResult(key=metric, score=judged[i][metric].get("score"),
+                                                       comment=judged[i][metric].get("reasoning"))
+                                      for metric in BATCH_JUDGE_METRICS]}
+        store.append(result_to_record({
+            "run": LocalRun(outputs={"output": outputs[i]}, error=errors.get(i)),
+            "example": example,
+            "evaluation_results": evaluation,
+            "timings": {"generation_s": None, "judge_s": None},
+            "usage": usage[str(example.id)],
+        }))
+    return jobs
@@ -0,0 +1,194 @@
+"""
+Cache persistente em disco (SQLite) endereçado por conteúdo.
+
+Usado para evitar chamadas repetidas ao LLM quando a entrada é idêntica
+(temperatura 0): a chave é um hash SHA-256 do conteúdo relevante da chamada
+(prompt renderizado, provider, modelo, ...).
+
+Suporta expiração por TTL e limite de entradas (eviction LRU), e mantém
+contadores de hits/misses para o resumo da avaliação.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Gera a chave de cache a partir das partes que identificam a chamada.
+
+    Args:
+        *parts: Valores serializáveis em JSON (prompt, provider, modelo, ...)
+
+    Returns:
+        Hash SHA-256 hexadecimal
+    """
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """
+    Cache chave/valor thread-safe persistido em SQLite.
+
+    Os valores são serializados em JSON. Entradas mais antigas que `ttl_seconds`
+    são descartadas na leitura; ao ultrapassar `max_entries`, as entradas
+    acessadas há mais tempo são removidas.
+    """
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None, refresh: bool = False):
+        """
+        Args:
+            path: Caminho do arquivo SQLite (diretórios são criados se necessário)
+            ttl_seconds: Tempo de vida das entradas (None = sem expiração)
+            max_entries: Número máximo de entradas (None = sem limite)
+            refresh: Se True, ignora leituras (sempre miss) mas continua gravando
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+        self._conn.commit()
+        self.purge_expired()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Retorna o valor da chave ou None (miss, expirado ou modo refresh).
+        """
+        with self._lock:
+            if self.refresh:
+                self.misses += 1
+                return None
+
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+
+            if row is None or (self.ttl_seconds is not None and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """
+        Grava o valor (serializável em JSON) e aplica o limite de entradas.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            if self.max_entries is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    " SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self.evictions += max(cursor.rowcount, 0)
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Remove todas as entradas expiradas.
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+            removed = max(cursor.rowcount, 0)
+            self.evictions += removed
+            return removed
+
+    def clear(self):
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna contadores de uso do cache.
+
+        Returns:
+            Dict com hits, misses, hit_rate e evictions
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def close(self):
+        """Fecha a conexão com o banco."""
+        with self._lock:
+            self._conn.close()
+
+
+def open_cache_from_env(prefix: str, default_path: str, refresh: bool = False) -> SQLiteCache:
+    """
+    Abre um SQLiteCache configurado por variáveis de ambiente:
+    {prefix}_PATH, {prefix}_TTL_DAYS e {prefix}_MAX_ENTRIES.
+
+    Args:
+        prefix: Prefixo das variáveis (ex: "JUDGE_CACHE")
+        default_path: Caminho padrão do arquivo SQLite
+        refresh: Ignorar leituras e regravar as entradas
+
+    Returns:
+        Instância de SQLiteCache
+    """
+    ttl_days = float(os.getenv(f"{prefix}_TTL_DAYS", "30"))
+    max_entries = int(os.getenv(f"{prefix}_MAX_ENTRIES", "50000"))
+    return SQLiteCache(
+        os.getenv(f"{prefix}_PATH", default_path),
+        ttl_seconds=ttl_days * 86400 if ttl_days > 0 else None,
+        max_entries=max_entries if max_entries > 0 else None,
+        refresh=refresh,
+    )
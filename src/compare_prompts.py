@@ -10,26 +10,38 @@ Salva resultados em Markdown e JSON.
 import sys
 import json
 import argparse
+from typing import List, Optional
 from evaluate import run_evaluation_for_prompt
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def run_comparison(model_name: str = "gemini-2.0-flash"):
+def run_comparison(model_name: str = "gemini-2.0-flash", fused: bool = False,
+                   use_cache: bool = True, refresh_cache: bool = False,
+                   min_concurrency: int = 1, max_concurrency: int = 16,
+                   sequential: bool = False, batch_size: int = 10, alpha: float = 0.05,
+                   profile: bool = False, profile_cpu: bool = False):
     prompts_to_compare = [
         ("Baseline (v1)", "bug_to_user_story_v1"),
         ("Final (v2 XML)", "bug_to_user_story_v2")
     ]
     
     results = {}
+    run_infos = {}
     
     print(f"🏁 Iniciando Comparação Geral com Modelo: {model_name} ...")
     
     for label, prompt_name in prompts_to_compare:
         print(f"\n➡️  Avaliando {label} [{prompt_name}]...")
-        scores = run_evaluation_for_prompt(prompt_name, model_name=model_name)
+        run_info = {}
+        scores = run_evaluation_for_prompt(prompt_name, model_name=model_name, fused=fused,
+                                           use_cache=use_cache, refresh_cache=refresh_cache,
+                                           min_concurrency=min_concurrency, max_concurrency=max_concurrency,
+                                           sequential=sequential, batch_size=batch_size, alpha=alpha,
+                                           run_info=run_info, profile=profile, profile_cpu=profile_cpu)
         if scores:
             results[label] = scores
+            run_infos[label] = run_info
         else:
             print(f"⚠️  Sem resultados para {label}")
 
@@ -75,7 +87,42 @@ def run_comparison(model_name: str = "gemini-2.0-flash"):
     md_content += f"{header}\n{separator}\n"
     md_content += "\n".join(match_rows)
     md_content += f"\n{avg_row}\n"
-    
+
+    if sequential:
+        examples_row = "| Exemplos avaliados (sequencial) |"
+        for label in labels:
+            info = run_infos.get(label, {})
+            examples_row += f" {info.get('examples_used', '-')}/{info.get('examples_total', '-')} |"
+        md_content += f"{examples_row} - |\n"
+
+    # Custo de cada prompt: tokens e latência (geração + juiz), para decidir se cada métrica/prompt compensa
+    md_content += "\n## 💰 Custo por Prompt\n\n"
+    md_content += "| Prompt | Tokens (in / out) | Tokens/exemplo | Geração (tokens) | Juiz (tokens) | Parede (s) | Fila (s) |\n"
+    md_content += "|---|---|---|---|---|---|---|\n"
+    stage_names = []
+    for label in labels:
+        usage = run_infos.get(label, {}).get("usage", {})
+        stages, totals = usage.get("stages", {}), usage.get("totals", {})
+        stage_names += [s for s in stages if s not in stage_names]
+        gen = stages.get("generate", {})
+        judge_tokens = sum(u["prompt_tokens"] + u["completion_tokens"]
+                           for s, u in stages.items() if s.startswith("judge:"))
+        md_content += (f"| {label} | {totals.get('tokens', 0)} ({totals.get('prompt_tokens', 0)} / "
+                       f"{totals.get('completion_tokens', 0)}) | "
+                       f"{usage.get('per_example', {}).get('avg_tokens', 0):.0f} | "
+                       f"{gen.get('prompt_tokens', 0) + gen.get('completion_tokens', 0)} | {judge_tokens} | "
+                       f"{totals.get('wall_s', 0):.2f} | {totals.get('queue_s', 0):.2f} |\n")
+
+    # Detalhe por etapa (tokens | tempo de parede) para cada prompt
+    md_content += f"\n| Etapa | {' | '.join(f'{label} (tokens / s)' for label in labels)} |\n"
+    md_content += f"|---|{'---|' * len(labels)}\n"
+    for stage in stage_names:
+        row = f"| {stage} |"
+        for label in labels:
+            u = run_infos.get(label, {}).get("usage", {}).get("stages", {}).get(stage)
+            row += f" {u['prompt_tokens'] + u['completion_tokens']} / {u['wall_s']:.2f} |" if u else " - |"
+        md_content += f"{row}\n"
+
     # Análise Rápida
     md_content += "\n## 🏆 Análise Rápida\n"
     
@@ -99,9 +146,27 @@ def run_comparison(model_name: str = "gemini-2.0-flash"):
     print(f"\n✅ Relatório salvo em {filename}")
     print(md_content)
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Comparar os prompts v1 e v2")
     parser.add_argument("--model", type=str, default="gemini-2.0-flash")
-    args = parser.parse_args()
-    
-    run_comparison(model_name=args.model)
+    parser.add_argument("--fused", action="store_true", help="Uma única chamada ao juiz por exemplo")
+    parser.add_argument("--no-cache", action="store_true", help="Desativa os caches persistentes do juiz e do gerador")
+    parser.add_argument("--refresh", action="store_true", help="Ignora os caches do juiz e do gerador e regrava as respostas")
+    parser.add_argument("--min-concurrency", type=int, default=1, help="Limite mínimo de chamadas simultâneas ao LLM")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="Limite máximo de chamadas simultâneas ao LLM")
+    parser.add_argument("--sequential", action="store_true", help="Para cada prompt assim que as métricas alvo estão decididas")
+    parser.add_argument("--batch-size", type=int, default=10, help="Exemplos por lote no modo --sequential")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Taxa de erro global do teste sequencial")
+    parser.add_argument("--profile", action="store_true", help="Grava um trace (Chrome/speedscope) de cada prompt em results/")
+    parser.add_argument("--profile-cpu", action="store_true", help="Grava também um perfil de CPU (cProfile, .prof) de cada prompt")
+    args = parser.parse_args(argv)
+
+    run_comparison(model_name=args.model, fused=args.fused,
+                   use_cache=not args.no_cache, refresh_cache=args.refresh,
+                   min_concurrency=args.min_concurrency, max_concurrency=args.max_concurrency,
+                   sequential=args.sequential, batch_size=args.batch_size, alpha=args.alpha,
+                   profile=args.profile, profile_cpu=args.profile_cpu)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Controle adaptativo de concorrência (AIMD) para as chamadas ao LLM.
+
+Em vez de um max_concurrency fixo, o limite de chamadas simultâneas ao
+provider (gerador + juiz) é ajustado durante a avaliação:
+- aumento aditivo (+1) a cada janela de chamadas saudável
+  (latência estável e taxa de erro baixa);
+- redução multiplicativa (x0.5) ao receber rate limit (429) ou erro 5xx.
+
+Assim o throughput acompanha a cota real de cada provider, sem transformar
+429s em scores 0.0 pelo except genérico das métricas.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+from profiling import span
+from usage import add_queue_wait
+
+# Tipos de exceção dos SDKs (openai, google-api-core, httpx) por nome, em qualquer ponto do MRO:
+# a classificação não depende de importar os providers
+ERROR_TYPE_KINDS = {
+    "RateLimitError": "rate_limit", "ResourceExhausted": "rate_limit", "TooManyRequests": "rate_limit",
+    "InternalServerError": "server", "ServiceUnavailable": "server", "BadGateway": "server",
+    "GatewayTimeout": "server",
+    "APITimeoutError": "timeout", "DeadlineExceeded": "timeout", "TimeoutException": "timeout",
+    "TimeoutError": "timeout",
+    "APIConnectionError": "connection", "ConnectError": "connection", "RemoteProtocolError": "connection",
+    "ConnectionError": "connection",
+}
+
+# Só para erros sem status HTTP nem tipo conhecido; códigos numéricos com borda de palavra
+# (ex: "max_tokens: 15000" não é um 500) e frases completas (ex: "quota project not set" não é rate limit)
+MESSAGE_PATTERNS = (
+    ("rate_limit", re.compile(r"\b429\b|rate[ _-]?limit|resource[ _]exhausted|too many requests"
+                              r"|quota (?:exceeded|exhausted)|exceeded (?:your |the )?(?:current )?quota")),
+    ("server", re.compile(r"\b5\d\d\b|internal server error|overloaded|service unavailable|bad gateway"
+                          r"|gateway timeout")),
+    ("timeout", re.compile(r"\btimeout\b|timed out|deadline[ _]exceeded")),
+    ("connection", re.compile(r"connection (?:error|refused|reset|aborted|closed)|connect error"
+                              r"|remote protocol error|broken pipe|server disconnected")),
+)
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classifica um erro de chamada ao LLM.
+
+    Ordem: status HTTP (status_code, code ou response.status_code) — com
+    status, só 429 e 5xx são transitórios —, depois o tipo da exceção e, por
+    último, a mensagem.
+
+    Returns:
+        "rate_limit", "server", "timeout", "connection" ou "other"
+    """
+    status = None
+    for candidate in (getattr(error, "status_code", None), getattr(error, "code", None),
+                      getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(candidate, int):
+            status = candidate
+            break
+
+    if status is not None:
+        if status == 429:
+            return "rate_limit"
+        return "server" if 500 <= status < 600 else "other"
+
+    for cls in type(error).__mro__:
+        if cls.__name__ in ERROR_TYPE_KINDS:
+            return ERROR_TYPE_KINDS[cls.__name__]
+
+    message = str(error).lower()
+    for kind, pattern in MESSAGE_PATTERNS:
+        if pattern.search(message):
+            return kind
+    return "other"
+
+
+class AdaptiveConcurrencyController:
+    """
+    Limita as chamadas simultâneas ao LLM com um limite ajustado por AIMD.
+
+    Cada chamada ocupa um slot (slot() / aslot()); ao liberar o slot, a latência
+    e o eventual erro alimentam o controlador. Uma "janela" tem tantas chamadas
+    quanto o limite atual: se a janela foi saudável o limite sobe em
+    `increase_step`; um rate limit ou erro 5xx multiplica o limite por
+    `decrease_factor` (no máximo uma redução a cada `cooldown_s`).
+    """
+
+    def __init__(self, min_concurrency: int = 1, max_concurrency: int = 16,
+                 initial_concurrency: Optional[int] = None, increase_step: int = 1,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 2.0,
+                 max_error_rate: float = 0.1, cooldown_s: float = 2.0, verbose: bool = True):
+        """
+        Args:
+            min_concurrency: Limite mínimo (--min-concurrency)
+            max_concurrency: Limite máximo (--max-concurrency)
+            initial_concurrency: Limite inicial (padrão: 4, dentro dos limites)
+            increase_step: Aumento aditivo por janela saudável
+            decrease_factor: Fator multiplicativo aplicado em rate limit / 5xx
+            latency_tolerance: Janela é saudável se a latência média <= tolerância x latência base
+            max_error_rate: Taxa máxima de erros (não-429/5xx) numa janela saudável
+            cooldown_s: Intervalo mínimo entre duas reduções
+            verbose: Imprime cada decisão de ajuste
+        """
+        if min_concurrency < 1 or max_concurrency < min_concurrency:
+            raise ValueError(f"Limites de concorrência inválidos: min={min_concurrency}, max={max_concurrency}")
+
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.cooldown_s = cooldown_s
+        self.verbose = verbose
+
+        self.limit = self._clamp(initial_concurrency if initial_concurrency is not None else 4)
+        self.peak_limit = self.limit
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.overload_errors = 0
+        self.decisions: List[Dict[str, Any]] = []
+
+        self._cond = threading.Condition()
+        self._window_successes = 0
+        self._window_errors = 0
+        self._latency_ewma: Optional[float] = None
+        self._latency_baseline: Optional[float] = None
+        self._last_decrease = float("-inf")
+
+    def _clamp(self, value: int) -> int:
+        return max(self.min_concurrency, min(self.max_concurrency, int(value)))
+
+    def acquire(self):
+        """Bloqueia até haver um slot livre dentro do limite atual."""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def try_acquire(self) -> bool:
+        """Ocupa um slot se houver um livre; não bloqueia."""
+        with self._cond:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency_s: float, error: Optional[BaseException] = None):
+        """Libera o slot e registra o resultado da chamada (chamadas canceladas não contam)."""
+        with self._cond:
+            self.in_flight -= 1
+            if not isinstance(error, asyncio.CancelledError):
+                self._record(latency_s, error)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Context manager síncrono: ocupa um slot durante a chamada ao LLM."""
+        queued = time.perf_counter()
+        with span("wait:concurrency", "queue"):
+            self.acquire()
+        start = time.perf_counter()
+        add_queue_wait(start - queued)
+        try:
+            yield
+        except BaseException as e:
+            self.release(time.perf_counter() - start, e)
+            raise
+        self.release(time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def aslot(self, poll_interval_s: float = 0.01):
+        """Versão assíncrona de slot() (aguarda sem bloquear o event loop)."""
+        queued = time.perf_counter()
+        with span("wait:concurrency", "queue"):
+            while not self.try_acquire():
+                await asyncio.sleep(poll_interval_s)
+        start = time.perf_counter()
+        add_queue_wait(start - queued)
+        try:
+            yield
+        except BaseException as e:
+            self.release(time.perf_counter() - start, e)
+            raise
+        self.release(time.perf_counter() - start)
+
+    def _record(self, latency_s: float, error: Optional[BaseException]):
+        """Atualiza as estatísticas da janela e decide o ajuste (chamado com o lock)."""
+        kind = classify_error(error) if error is not None else None
+
+        if kind in ("rate_limit", "server"):
+            self.overload_errors += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown_s:
+                self._last_decrease = now
+                self._set_limit(self._clamp(self.limit * self.decrease_factor),
+                                f"{kind}: {str(error)[:80]}")
+            self._reset_window()
+            return
+
+        if error is not None:
+            self._window_errors += 1
+        else:
+            self._window_successes += 1
+            self._latency_ewma = latency_s if self._latency_ewma is None else \
+                0.8 * self._latency_ewma + 0.2 * latency_s
+            if self._latency_baseline is None or self._latency_ewma < self._latency_baseline:
+                self._latency_baseline = self._latency_ewma
+
+        total = self._window_successes + self._window_errors
+        if total < self.limit:
+            return
+
+        error_rate = self._window_errors / total
+        latency_ok = (self._latency_ewma is not None
+                      and self._latency_ewma <= self.latency_tolerance * self._latency_baseline)
+        if error_rate <= self.max_error_rate and latency_ok and self.limit < self.max_concurrency:
+            self._set_limit(self._clamp(self.limit + self.increase_step),
+                            f"latência {self._latency_ewma * 1000:.0f}ms, erros {error_rate:.0%}")
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_successes = 0
+        self._window_errors = 0
+
+    def _set_limit(self, new_limit: int, reason: str):
+        old_limit = self.limit
+        if new_limit == old_limit:
+            return
+        self.limit = new_limit
+        self.peak_limit = max(self.peak_limit, new_limit)
+        if new_limit > old_limit:
+            self.increases += 1
+        else:
+            self.decreases += 1
+        self.decisions.append({"time": time.time(), "from": old_limit, "to": new_limit, "reason": reason})
+        if self.verbose:
+            icon = "📈" if new_limit > old_limit else "📉"
+            print(f"{icon} Concorrência {old_limit} → {new_limit} ({reason})")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna o estado do controlador.
+
+        Returns:
+            Dict com limit, peak_limit, min/max, increases, decreases e overload_errors
+        """
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "peak_limit": self.peak_limit,
+                "min_concurrency": self.min_concurrency,
+                "max_concurrency": self.max_concurrency,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "overload_errors": self.overload_errors,
+            }
+
+
+# Controlador usado pelo gerador e pelo juiz (ativado via configure_concurrency)
+_controller: Optional[AdaptiveConcurrencyController] = None
+
+
+def configure_concurrency(min_concurrency: int = 1, max_concurrency: int = 16,
+                          initial_concurrency: Optional[int] = None,
+                          enabled: bool = True) -> Optional[AdaptiveConcurrencyController]:
+    """
+    Ativa (ou desativa) o controle adaptativo de concorrência das chamadas ao LLM.
+
+    Returns:
+        O controlador ativo (ou None se desativado)
+    """
+    global _controller
+    _controller = AdaptiveConcurrencyController(min_concurrency, max_concurrency,
+                                                initial_concurrency) if enabled else None
+    return _controller
+
+
+def get_concurrency_controller() -> Optional[AdaptiveConcurrencyController]:
+    """Retorna o controlador ativo (ou None)."""
+    return _controller
+
+
+def concurrency_slot():
+    """Slot do controlador ativo para uma chamada síncrona (no-op se desativado)."""
+    controller = _controller
+    return controller.slot() if controller is not None else nullcontext()
+
+
+def aconcurrency_slot():
+    """Slot do controlador ativo para uma chamada assíncrona (no-op se desativado)."""
+    controller = _controller
+    return controller.aslot() if controller is not None else nullcontext()
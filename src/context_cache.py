@@ -0,0 +1,183 @@
+"""
+Cache de contexto explícito no provider (prefixo estático dos prompts).
+
+Os prompts do juiz (e o do gerador) começam com um prefixo estático longo
+seguido de uma parte variável por exemplo. O cache implícito de prefixo dos
+providers já reaproveita esse prefixo quando ele é idêntico entre chamadas;
+no modo explícito, o prefixo é registrado uma vez como contexto em cache e
+as chamadas enviam apenas a parte variável, referenciando o contexto:
+
+- Gemini: google.generativeai.caching.CachedContent + `cached_content=`
+- provider simulado (fake): FakeChatModel.create_cached_context
+- demais providers: sem suporte — a chamada segue com o prompt completo
+
+Um prefixo que o provider recusa (ex: abaixo do mínimo de tokens do cache)
+não é tentado de novo: as chamadas seguintes vão direto pelo caminho normal.
+Ao fim da execução, ContextCacheManager.close() apaga os contextos criados,
+em vez de deixá-los no provider até o TTL expirar.
+
+Nos templates do gerador (PromptTemplate), o prefixo estático é o texto
+antes da linha da primeira variável (prompt_static_prefix): regras e
+exemplos few-shot ficam no contexto, e cada exemplo envia só o restante.
+"""
+
+import hashlib
+import os
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TTL_S = 3600
+
+# Valor provisório das variáveis ao localizar a primeira delas no template renderizado
+_SENTINEL = "\x00"
+
+
+def _create_gemini_context(llm: Any, prefix: str, ttl_s: int) -> str:
+    from google.generativeai import caching
+
+    model = llm.model if llm.model.startswith("models/") else f"models/{llm.model}"
+    cached = caching.CachedContent.create(
+        model=model,
+        contents=[{"role": "user", "parts": [{"text": prefix}]}],
+        ttl=timedelta(seconds=ttl_s),
+    )
+    return cached.name
+
+
+def _delete_gemini_context(llm: Any, name: str):
+    from google.generativeai import caching
+
+    caching.CachedContent.get(name).delete()
+
+
+def _context_creator(llm: Any):
+    """Função (llm, prefixo, ttl) -> nome do contexto, ou None se o provider não suporta."""
+    if hasattr(llm, "create_cached_context"):
+        return lambda client, prefix, ttl_s: client.create_cached_context(prefix, ttl_s=ttl_s)
+    if getattr(llm, "_llm_type", None) == "chat-google-generative-ai":
+        return _create_gemini_context
+    return None
+
+
+def _context_deleter(llm: Any):
+    """Função (llm, nome do contexto) que apaga o contexto no provider (par de _context_creator)."""
+    if hasattr(llm, "delete_cached_context"):
+        return lambda client, name: client.delete_cached_context(name)
+    if getattr(llm, "_llm_type", None) == "chat-google-generative-ai":
+        return _delete_gemini_context
+    return None
+
+
+class ContextCacheManager:
+    """
+    Contextos em cache por (cliente, prefixo), criados no primeiro uso (thread-safe).
+
+    Contadores: created (contextos registrados), reused (chamadas que usaram
+    um contexto já existente), fallbacks (chamadas pelo caminho normal porque
+    o provider não suporta ou recusou o prefixo).
+    """
+
+    def __init__(self, ttl_s: Optional[int] = None):
+        self.ttl_s = ttl_s or int(os.getenv("CONTEXT_CACHE_TTL_S", str(DEFAULT_TTL_S)))
+        self._handles: Dict[Tuple[int, str], Optional[str]] = {}
+        self._created: List[Tuple[Any, str]] = []  # (cliente, nome) dos contextos a apagar em close()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.fallbacks = 0
+
+    def handle_for(self, llm: Any, prefix: str) -> Optional[str]:
+        """
+        Nome do contexto em cache com `prefix` para o cliente `llm`.
+
+        Returns:
+            Nome do contexto, ou None (chamar com o prompt completo)
+        """
+        client = getattr(llm, "inner", llm)  # RecordingChatModel: o contexto é criado no provider real
+        creator = _context_creator(client)
+        key = (id(client), hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        with self._lock:
+            if creator is None or (key in self._handles and self._handles[key] is None):
+                self.fallbacks += 1
+                return None
+            if key in self._handles:
+                self.reused += 1
+                return self._handles[key]
+
+            # Criado sob o lock: um único contexto por prefixo mesmo com várias threads
+            try:
+                handle = creator(client, prefix, self.ttl_s)
+            except Exception as e:
+                print(f"⚠️  Cache de contexto indisponível para este prefixo ({e}); usando chamadas normais")
+                handle = None
+            self._handles[key] = handle
+            if handle is None:
+                self.fallbacks += 1
+            else:
+                self.created += 1
+                self._created.append((client, handle))
+            return handle
+
+    def close(self) -> int:
+        """
+        Apaga no provider os contextos criados por este gerenciador.
+
+        Falhas ao apagar são só avisadas (o contexto expira pelo TTL). Depois
+        de close(), um novo handle_for cria o contexto de novo.
+
+        Returns:
+            Número de contextos apagados
+        """
+        with self._lock:
+            created, self._created = self._created, []
+            self._handles.clear()
+        deleted = 0
+        for client, name in created:
+            deleter = _context_deleter(client)
+            if deleter is None:
+                continue
+            try:
+                deleter(client, name)
+                deleted += 1
+            except Exception as e:
+                print(f"⚠️  Não foi possível apagar o contexto em cache {name} ({e}); ele expira pelo TTL")
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict com created, reused e fallbacks
+        """
+        with self._lock:
+            return {"created": self.created, "reused": self.reused, "fallbacks": self.fallbacks}
+
+
+def prompt_static_prefix(prompt: Any) -> str:
+    """
+    Texto fixo do PromptTemplate até a linha da primeira variável.
+
+    Returns:
+        Prefixo estático ("" se o template não tem variáveis ou começa por uma)
+    """
+    rendered = prompt.format(**{name: _SENTINEL for name in prompt.input_variables})
+    idx = rendered.find(_SENTINEL)
+    if idx < 0:
+        return ""
+    return rendered[:rendered.rfind("\n", 0, idx) + 1]
+
+
+def split_static_prefix(text: str, prefix: str) -> Tuple[str, str]:
+    """
+    Separa o prompt renderizado em (prefixo, parte variável), com prefix + parte == text.
+
+    Se o texto não começa com o prefixo, ele é todo parte variável: ("", text).
+    """
+    if prefix and text.startswith(prefix):
+        return prefix, text[len(prefix):]
+    return "", text
+
+
+def cached_context_kwargs(handle: str) -> Dict[str, Any]:
+    """Parâmetros de invoke/ainvoke que referenciam o contexto em cache."""
+    return {"cached_content": handle}
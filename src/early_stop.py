@@ -0,0 +1,70 @@
+"""
+Corte da geração no fechamento da tag </user_story>.
+
+Prompts que pedem a user story dentro de <user_story>...</user_story> têm a
+saída extraída pelo OutputNormalizer (estratégia xml_tag): tudo o que o
+modelo escreve depois da tag de fechamento é pago e descartado. Quando o
+template pede a tag, o gerador recebe a tag de fechamento como stop
+sequence do provider (Gemini e OpenAI suportam `stop`): a geração termina
+ali e a saída chega sem a tag de fechamento.
+
+Os contadores registram quantas gerações foram cortadas e quantos tokens
+(estimados) vieram depois da tag quando o corte não aconteceu — com o corte
+desativado (--no-stop), esse é o desperdício que o corte evita.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from output_normalizer import CLOSE_TAG, OPEN_TAG
+
+
+def stop_sequences_for(template: str) -> List[str]:
+    """Stop sequences do gerador para o template (vazio se o prompt não usa <user_story>)."""
+    return [CLOSE_TAG] if CLOSE_TAG in (template or "") else []
+
+
+def approx_tokens(text: str) -> int:
+    """Estimativa de tokens (~4 caracteres por token, a mesma do provider simulado)."""
+    return len(text) // 4
+
+
+class EarlyStopStats:
+    """Contadores thread-safe das gerações: total, cortadas na tag e tokens após a tag."""
+
+    def __init__(self, stop: Optional[List[str]] = None):
+        self.stop = list(stop or [])
+        self._lock = threading.Lock()
+        self.generations = 0
+        self.stopped = 0
+        self.trailing_tokens = 0
+
+    def record(self, output: Optional[str]):
+        """
+        Classifica uma saída do gerador.
+
+        Cortada: tem a tag de abertura e não tem a de fechamento (o provider
+        remove a stop sequence). Com a tag de fechamento presente, o texto
+        depois dela conta como tokens descartados.
+        """
+        output = output or ""
+        close_idx = output.find(CLOSE_TAG)
+        with self._lock:
+            self.generations += 1
+            if close_idx >= 0:
+                self.trailing_tokens += approx_tokens(output[close_idx + len(CLOSE_TAG):].strip())
+            elif self.stop and OPEN_TAG in output:
+                self.stopped += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict com enabled, generations, stopped e trailing_tokens
+        """
+        with self._lock:
+            return {
+                "enabled": bool(self.stop),
+                "generations": self.generations,
+                "stopped": self.stopped,
+                "trailing_tokens": self.trailing_tokens,
+            }
@@ -5,19 +5,16 @@ Suporta --evaluator-model para separar modelo gerador do avaliador.
 """
 
 import os
+import json
 import argparse
-import re
-from typing import Any, Dict
+import asyncio
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
-from langchain import hub
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import load_prompt
 
-# preciso de um wrapper para o SDK.
-from langsmith import Client
+# Os providers (langchain_openai / langchain_google_genai) são importados sob demanda em utils,
+# e o SDK de avaliação do LangSmith só no caminho que o usa (ver run_evaluation_for_prompt)
+from langchain_core.messages import HumanMessage
 from langsmith.schemas import Run, Example
-from langsmith.evaluation import evaluate
 
 from metrics import (
     evaluate_tone_score,
@@ -26,79 +23,179 @@ from metrics import (
     evaluate_completeness_score,
     evaluate_clarity,
     evaluate_precision,
-    evaluate_f1_score
+    evaluate_f1_score,
+    evaluate_fused_scores,
+    aevaluate_tone_score,
+    aevaluate_acceptance_criteria_score,
+    aevaluate_user_story_format_score,
+    aevaluate_completeness_score,
+    aevaluate_f1_score,
+    aevaluate_fused_scores,
+    configure_judge_cache,
+    configure_judge_context_cache,
+    configure_judge_retries
 )
-from utils import get_llm
+from utils import get_llm, resolve_llm_provider
+from llm_registry import get_llm_registry
+from cache import SQLiteCache, make_cache_key, open_cache_from_env
+from local_runner import iter_jsonl_examples, run_local_evaluation
+from batch_runner import DEFAULT_POLL_INTERVAL_S, run_batch_evaluation
+from concurrency import configure_concurrency, concurrency_slot, aconcurrency_slot
+from rate_limiter import rate_limiter_stats
+from sequential import run_sequential_evaluation
+from precheck import Prechecker
+from results_store import ResultsStore, StreamingEvaluator, aggregate_scores, is_failed
+from prompt_loader import get_prompt_cache, load_prompt_file
+from profiling import CpuProfiler, configure_profiling, span, top_functions
+from early_stop import CLOSE_TAG, EarlyStopStats, approx_tokens, stop_sequences_for
+from output_normalizer import OutputNormalizer
+from context_cache import ContextCacheManager, cached_context_kwargs, prompt_static_prefix, split_static_prefix
+from usage import (example_scope, example_usage_summary, reset_usage_tracker, track_llm_call, track_stage,
+                   usage_totals)
 
 load_dotenv()
 
-from langsmith.evaluation import RunEvaluator, EvaluationResult
+DEFAULT_GENERATION_CACHE_PATH = ".cache/generation_cache.sqlite"
+
+# Cache persistente das user stories geradas (ativado via configure_generation_cache)
+_generation_cache: Optional[SQLiteCache] = None
+
+
+def configure_generation_cache(enabled: bool = True, refresh: bool = False) -> Optional[SQLiteCache]:
+    """
+    Ativa/desativa o cache persistente das saídas do gerador (target_func).
+
+    O caminho, o TTL e o tamanho máximo vêm de GENERATION_CACHE_PATH,
+    GENERATION_CACHE_TTL_DAYS e GENERATION_CACHE_MAX_ENTRIES.
+
+    Args:
+        enabled: Se False, toda geração vai ao provider
+        refresh: Se True, ignora saídas em cache mas grava as novas
+
+    Returns:
+        O cache ativo (ou None se desativado)
+    """
+    global _generation_cache
+    if _generation_cache is not None:
+        _generation_cache.close()
+    _generation_cache = open_cache_from_env(
+        "GENERATION_CACHE", DEFAULT_GENERATION_CACHE_PATH, refresh=refresh
+    ) if enabled else None
+    return _generation_cache
+
+
+def generation_cache_key_prefix(template: str, provider: str, model: str, temperature: float,
+                                stop: Optional[List[str]] = None) -> tuple:
+    """
+    Prefixo da chave de cache de uma geração (completado com os inputs de cada exemplo).
+
+    Identifica a geração pelo template do prompt, provider/modelo, temperatura e
+    stop sequences: mudar qualquer um deles invalida as saídas em cache.
+    """
+    prefix = ("generation", make_cache_key(template), provider, model, temperature)
+    if stop:
+        prefix += (tuple(stop),)
+    return prefix
+
+from langsmith.evaluation.evaluator import RunEvaluator, EvaluationResult
+
+# Lista de funções métricas avaliadas por exemplo (versões síncrona e assíncrona)
+METRIC_FUNCS = [
+    ("tone", evaluate_tone_score),
+    ("acceptance_criteria", evaluate_acceptance_criteria_score),
+    ("user_story_format", evaluate_user_story_format_score),
+    ("completeness", evaluate_completeness_score),
+    ("f1_score", evaluate_f1_score)
+]
+
+ASYNC_METRIC_FUNCS = [
+    ("tone", aevaluate_tone_score),
+    ("acceptance_criteria", aevaluate_acceptance_criteria_score),
+    ("user_story_format", aevaluate_user_story_format_score),
+    ("completeness", aevaluate_completeness_score),
+    ("f1_score", aevaluate_f1_score)
+]
+
+
+_default_normalizer = OutputNormalizer()
+
+
+def clean_generated_story(generated_story: Optional[str]) -> Optional[str]:
+    """
+    Smart Parsing: remove o Chain of Thought (raciocínio) antes da User Story.
+
+    Atalho para OutputNormalizer com a cadeia padrão (xml_tag, markdown_header, raw).
+    """
+    return _default_normalizer.normalize(generated_story).text
+
 
 class GlobalEvaluator(RunEvaluator):
-    def __init__(self, model_name: str = "gemini-2.0-flash"):
+    def __init__(self, model_name: str = "gemini-2.0-flash", fused: bool = False, precheck: bool = True,
+                 normalizer: Optional[OutputNormalizer] = None):
+        """
+        Args:
+            model_name: Modelo LLM avaliador (Judge)
+            fused: Se True, avalia todas as métricas em uma única chamada ao juiz,
+                   com fallback para a função individual das métricas ausentes na resposta
+            precheck: Se True, métricas de saídas estruturalmente quebradas são
+                      pontuadas por regras locais, sem chamar o juiz
+            normalizer: Extrai a user story da saída do gerador (padrão: cadeia padrão,
+                        ver output_normalizer)
+        """
         self.model_name = model_name
-
-    def evaluate_run(self, run: Run, example: Example = None) -> Dict[str, Any]:
+        self.fused = fused
+        self.prechecker = Prechecker() if precheck else None
+        self.normalizer = normalizer or OutputNormalizer()
+
+    def _precheck(self, generated_story: str) -> Dict[str, Dict[str, Any]]:
+        """Resultados locais das métricas que dispensam o juiz (vazio sem precheck)."""
+        if self.prechecker is None:
+            return {}
+        local_results = self.prechecker.run(generated_story)
+        for name in local_results:
+            print(f"      [Precheck] {name}: regra estrutural violada, juiz dispensado")
+        return local_results
+
+    def _prepare(self, run: Run, example: Example):
+        """Extrai (bug_report, referência, user story limpa) do run/exemplo."""
         bug_report = example.inputs.get("bug_report")
         reference_story = example.outputs.get("user_story") or example.outputs.get("reference")
-        generated_story = run.outputs.get("output")
-
-        # Smart Parsing: Remove Chain of Thought (Reasoning)
-        # Se o prompt gera raciocínio, ele vem antes do título da User Story (# Título)
-        # Vamos ignorar tudo antes do primeiro Markdown Header '# '
-        if generated_story:
-            # 1. Tentar extrair via XML (V5)
-            if "<user_story>" in generated_story:
-                match = re.search(r'<user_story>(.*?)</user_story>', generated_story, re.DOTALL)
-                if match:
-                    generated_story = match.group(1).strip()
-
-            # 2. Fallback: Ignorar texto antes do primeiro título markdown (# ou ##)
-            else:
-                 # Encontra índices
-                 h1_idx = generated_story.find("# ")
-                 h2_idx = generated_story.find("## ")
-
-                 # Pega o menor índice positivo
-                 idxs = [i for i in [h1_idx, h2_idx] if i >= 0]
+        with track_stage("parse"):
+            generated_story = self.normalizer.normalize(run.outputs.get("output")).text
+        return bug_report, reference_story, generated_story
 
-                 if idxs:
-                     start_idx = min(idxs)
-                     generated_story = generated_story[start_idx:].strip()
-                 else:
-                     print(f"DEBUG: Strip FAILED. No header found. Starts with: {generated_story[:30]}...")
+    @staticmethod
+    def _to_evaluation_result(name: str, res: Dict[str, Any]) -> EvaluationResult:
+        score = res.get("score")
+        print(f"      [Metric] {name}: {score}")
+        return EvaluationResult(key=name, score=score, comment=res.get("reasoning"))
 
-        # DEBUG: Verificar o que está sendo avaliado
-        print(f"DEBUG: Cleaned Story Start: {generated_story[:50]}...")
+    def evaluate_run(self, run: Run, example: Example = None) -> Dict[str, Any]:
+        bug_report, reference_story, generated_story = self._prepare(run, example)
 
         if not generated_story:
             return EvaluationResult(key="error", score=0, comment="No output")
 
         eval_results = []
 
-        # Lista de funções métricas
-        metric_funcs = [
-            ("tone", evaluate_tone_score),
-            ("acceptance_criteria", evaluate_acceptance_criteria_score),
-            ("user_story_format", evaluate_user_story_format_score),
-            ("completeness", evaluate_completeness_score),
-            ("f1_score", evaluate_f1_score)
-        ]
+        local_results = self._precheck(generated_story)
+        fused_results = {}
+        if self.fused:
+            fused_results = evaluate_fused_scores(
+                bug_report, generated_story, reference_story,
+                metrics=[name for name, _ in METRIC_FUNCS if name not in local_results], model=self.model_name
+            )
+        fused_results.update(local_results)
 
-        for name, func in metric_funcs:
+        for name, func in METRIC_FUNCS:
             try:
-                # Passar o modelo configurado para a função de métrica
-                res = func(bug_report, generated_story, reference_story, model=self.model_name)
-                score = res.get("score")
-                print(f"      [Metric] {name}: {score}")
-
-                eval_results.append(
-                    EvaluationResult(
-                        key=name,
-                        score=score,
-                        comment=res.get("reasoning")
-                    )
-                )
+                res = fused_results.get(name)
+                if res is None:
+                    if self.fused:
+                        print(f"      [Fused] {name} ausente na resposta, avaliando individualmente")
+                    # Passar o modelo configurado para a função de métrica
+                    res = func(bug_report, generated_story, reference_story, model=self.model_name)
+                eval_results.append(self._to_evaluation_result(name, res))
             except Exception as e:
                 print(f"      [Error] Metric {name}: {e}")
                 eval_results.append(EvaluationResult(key=name, score=0.0, comment=str(e)))
@@ -106,92 +203,320 @@ class GlobalEvaluator(RunEvaluator):
         return {"results": eval_results}
 
 
-def run_evaluation_for_prompt(prompt_name: str, dataset_name: str = "prompt-optimization-challenge-resolved-eval", model_name: str = "gemini-2.0-flash", evaluator_model: str = None) -> Dict[str, float]:
+class AsyncGlobalEvaluator(GlobalEvaluator):
+    """
+    GlobalEvaluator assíncrono: as métricas de cada exemplo rodam em paralelo
+    (asyncio.gather), limitadas por um semáforo compartilhado entre exemplos.
+    A latência por exemplo passa a ser a da chamada mais lenta ao juiz.
+    """
+
+    def __init__(self, model_name: str = "gemini-2.0-flash", fused: bool = False,
+                 max_concurrent_judges: int = 8, precheck: bool = True,
+                 normalizer: Optional[OutputNormalizer] = None):
+        """
+        Args:
+            model_name: Modelo LLM avaliador (Judge)
+            fused: Ver GlobalEvaluator
+            max_concurrent_judges: Máximo de chamadas simultâneas ao juiz (todos os exemplos)
+            precheck: Ver GlobalEvaluator
+            normalizer: Ver GlobalEvaluator
+        """
+        super().__init__(model_name=model_name, fused=fused, precheck=precheck, normalizer=normalizer)
+        self.max_concurrent_judges = max_concurrent_judges
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _limited(self, coro):
+        # Semáforo criado no primeiro uso, dentro do event loop da avaliação
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_judges)
+        async with self._semaphore:
+            return await coro
+
+    async def _ametric(self, name: str, func, bug_report: str, generated_story: str,
+                       reference_story: str) -> EvaluationResult:
+        try:
+            res = await self._limited(func(bug_report, generated_story, reference_story, model=self.model_name))
+            return self._to_evaluation_result(name, res)
+        except Exception as e:
+            print(f"      [Error] Metric {name}: {e}")
+            return EvaluationResult(key=name, score=0.0, comment=str(e))
+
+    async def aevaluate_run(self, run: Run, example: Example = None) -> Dict[str, Any]:
+        bug_report, reference_story, generated_story = self._prepare(run, example)
+
+        if not generated_story:
+            return EvaluationResult(key="error", score=0, comment="No output")
+
+        local_results = self._precheck(generated_story)
+        fused_results = {}
+        if self.fused:
+            fused_results = await self._limited(aevaluate_fused_scores(
+                bug_report, generated_story, reference_story,
+                metrics=[name for name, _ in ASYNC_METRIC_FUNCS if name not in local_results], model=self.model_name
+            ))
+        fused_results.update(local_results)
+
+        eval_results = []
+        pending = []
+        for name, func in ASYNC_METRIC_FUNCS:
+            if name in fused_results:
+                eval_results.append(self._to_evaluation_result(name, fused_results[name]))
+            else:
+                if self.fused:
+                    print(f"      [Fused] {name} ausente na resposta, avaliando individualmente")
+                pending.append(self._ametric(name, func, bug_report, generated_story, reference_story))
+
+        eval_results.extend(await asyncio.gather(*pending))
+        return {"results": eval_results}
+
+
+def run_evaluation_for_prompt(prompt_name: str, dataset_name: str = "prompt-optimization-challenge-resolved-eval", model_name: str = "gemini-2.0-flash", evaluator_model: str = None, fused: bool = False,
+                              use_cache: bool = True, refresh_cache: bool = False,
+                              use_async: bool = False, max_concurrent_judges: int = 8,
+                              local_dataset: Optional[str] = None, max_workers: Optional[int] = None,
+                              results_dir: str = "results", min_concurrency: int = 1,
+                              max_concurrency: int = 16, max_attempts: int = 3, hedge: bool = False,
+                              hedge_percentile: float = 95.0, sequential: bool = False,
+                              batch_size: int = 10, alpha: float = 0.05, seed: int = 42,
+                              run_info: Optional[Dict[str, Any]] = None,
+                              precheck: bool = True, resume: bool = False,
+                              profile: bool = False, profile_cpu: bool = False,
+                              stop_sequences: bool = True, context_cache: bool = False,
+                              batch: bool = False, batch_poll_interval_s: float = DEFAULT_POLL_INTERVAL_S) -> Dict[str, float]:
     judge_model = evaluator_model if evaluator_model else model_name
-    print(f"🚀 Iniciando Avaliação via SDK (LangSmith): {prompt_name} | Gen: {model_name} | Eval: {judge_model}")
+    judge_mode = (" (fused)" if fused else "") + (" (async)" if use_async else "")
+    engine = f"Local ({local_dataset})" if local_dataset else "SDK (LangSmith)"
+    if batch:
+        engine += " [batch]"
+    elif sequential:
+        engine += " [sequencial]"
+    print(f"🚀 Iniciando Avaliação via {engine}: {prompt_name} | Gen: {model_name} | Eval: {judge_model}{judge_mode}")
+
+    # Caches persistentes do juiz e do gerador (--no-cache / --refresh)
+    judge_cache = configure_judge_cache(enabled=use_cache, refresh=refresh_cache)
+    generation_cache = configure_generation_cache(enabled=use_cache, refresh=refresh_cache)
+
+    # Limite adaptativo (AIMD) das chamadas simultâneas ao LLM, entre --min/--max-concurrency
+    controller = configure_concurrency(min_concurrency=min_concurrency, max_concurrency=max_concurrency)
+
+    # Retry com backoff (erros transitórios) e hedging opcional das chamadas ao juiz
+    judge_call_stats = configure_judge_retries(max_attempts=max_attempts, hedge=hedge,
+                                               hedge_percentile=hedge_percentile)
 
-    # 1. Carregar Prompt (forçar UTF-8 no Windows)
+    # --context-cache: prefixo estático dos prompts do juiz como contexto em cache no provider
+    judge_context_cache = configure_judge_context_cache(enabled=context_cache)
+
+    # Tokens e latência por etapa (load_prompt, generate, judge:<métrica>, parse)
+    usage_tracker = reset_usage_tracker()
+
+    # --profile: spans das etapas em um trace Chrome/speedscope (--profile-cpu: cProfile em todas as threads)
+    trace_recorder = configure_profiling(enabled=profile)
+
+    # 1. Carregar Prompt (UTF-8, parse em memória; compilado uma vez por versão do arquivo)
     try:
-        import io, tempfile
-        src_path = f"prompts/{prompt_name}.yml"
-        with io.open(src_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yml", delete=False,
-                                         encoding="utf-8") as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
-        prompt = load_prompt(tmp_path)
-        os.unlink(tmp_path)
+        with track_stage("load_prompt"):
+            prompt = load_prompt_file(f"prompts/{prompt_name}.yml")
     except Exception as e:
         print(f"Erro ao carregar prompt: {e}")
         return {}
 
     # 2. Configurar LLM (Target - Gerador)
+    temperature = 0.0
     try:
-        llm = get_llm(model=model_name, temperature=0.0)
+        llm = get_llm(model=model_name, temperature=temperature)
+        gen_provider, gen_model = resolve_llm_provider(model_name)
     except Exception as e:
         print(f"Erro ao configurar LLM: {e}")
         return {}
 
+    # Prompts com <user_story>: a geração para na tag de fechamento (stop sequence do provider)
+    stop = stop_sequences_for(prompt.template) if stop_sequences else []
+    generator = llm.bind(stop=stop) if stop else llm
+    early_stop = EarlyStopStats(stop)
+
+    # Identifica a geração: template do prompt + provider/modelo + temperatura (+ stop, + inputs por exemplo)
+    generation_key_prefix = generation_cache_key_prefix(prompt.template, gen_provider, gen_model, temperature, stop)
+
+    # --context-cache: o prefixo estático do template (regras + few-shot) vira um contexto em cache
+    # no provider, registrado uma vez por execução; cada exemplo envia só a parte variável
+    generation_context = ContextCacheManager() if context_cache else None
+    generation_prefix = prompt_static_prefix(prompt) if generation_context is not None else ""
+
+    def generation_call(inputs: dict):
+        """(runnable, entrada, kwargs) da geração: pelo contexto em cache ou pela chain completa."""
+        if generation_prefix:
+            handle = generation_context.handle_for(llm, generation_prefix)
+            if handle is not None:
+                _, payload = split_static_prefix(prompt.format(**inputs), generation_prefix)
+                return generator, [HumanMessage(content=payload)], cached_context_kwargs(handle)
+        return prompt | generator, inputs, {}
+
+    def cache_lookup(inputs: dict):
+        if generation_cache is None:
+            return None, None
+        key = make_cache_key(*generation_key_prefix, inputs)
+        return key, generation_cache.get(key)
+
     # 3. Definir o Target (Chain ou Função)
+    # O uso da geração volta em outputs["usage"] e é somado ao do juiz no registro do exemplo
     def target_func(inputs: dict) -> dict:
-        chain = prompt | llm
-        res = chain.invoke(inputs)
-        return {"output": res.content}
-
-    # 4. Configurar LangSmith Client
-    client = Client()
+        key, cached = cache_lookup(inputs)
+        if cached is not None:
+            return {"output": cached}
+
+        with span("chain"):
+            chain, chain_input, call_kwargs = generation_call(inputs)
+        with example_scope() as usage, track_llm_call("generate") as call:
+            with concurrency_slot():
+                res = chain.invoke(chain_input, **call_kwargs)
+            call.add_response(res)
+        early_stop.record(res.content)
+
+        if generation_cache is not None:
+            generation_cache.set(key, res.content)
+        return {"output": res.content, "usage": usage}
+
+    async def atarget_func(inputs: dict) -> dict:
+        key, cached = cache_lookup(inputs)
+        if cached is not None:
+            return {"output": cached}
+
+        with span("chain"):
+            chain, chain_input, call_kwargs = generation_call(inputs)
+        with example_scope() as usage, track_llm_call("generate") as call:
+            async with aconcurrency_slot():
+                res = await chain.ainvoke(chain_input, **call_kwargs)
+            call.add_response(res)
+        early_stop.record(res.content)
+
+        if generation_cache is not None:
+            generation_cache.set(key, res.content)
+        return {"output": res.content, "usage": usage}
 
     # 5. Configurar Avaliador (Judge — pode ser modelo diferente do gerador)
-    custom_evaluator = GlobalEvaluator(model_name=judge_model)
+    # A user story é extraída da saída com a cadeia de estratégias registrada para o prompt
+    normalizer = OutputNormalizer.for_prompt(prompt_name)
+    if use_async:
+        custom_evaluator = AsyncGlobalEvaluator(model_name=judge_model, fused=fused,
+                                                max_concurrent_judges=max_concurrent_judges,
+                                                precheck=precheck, normalizer=normalizer)
+    else:
+        custom_evaluator = GlobalEvaluator(model_name=judge_model, fused=fused, precheck=precheck,
+                                           normalizer=normalizer)
 
     # 6. Executar Avaliação
     safe_model = model_name.replace(".", "-").replace(":", "")
     experiment_prefix = f"{prompt_name}-eval-{safe_model}"
 
+    # Resultados por exemplo gravados em streaming; a chave identifica o experimento para o --resume
+    dataset_ref = local_dataset or dataset_name
+    experiment_key = make_cache_key("experiment", prompt.template, gen_provider, gen_model, temperature,
+                                    judge_model, fused, dataset_ref)[:12]
+    results_path = os.path.join(results_dir, f"{experiment_prefix}-{experiment_key}.jsonl")
+
+    cpu_profiler = CpuProfiler() if profile_cpu else None
+    if cpu_profiler is not None:
+        cpu_profiler.start()
+
     try:
-        results = evaluate(
-            target_func,
-            data=dataset_name,
-            evaluators=[custom_evaluator],
-            experiment_prefix=experiment_prefix,
-            max_concurrency=4
-        )
-
-        # Iterar manualmente para recuperar feedback
-        metrics_accum = {}
-
-        iterable_results = []
-        if hasattr(results, '_results'):
-             vals = results._results
-             if isinstance(vals, dict):
-                 iterable_results = vals.values()
-             else:
-                 iterable_results = vals
-        elif hasattr(results, 'results'):
-             iterable_results = results.results
-
-        for res in iterable_results:
-            feedbacks = []
-
-            if isinstance(res, dict):
-                feedbacks = res.get('feedback') or res.get('evaluation_results', {}).get('results')
+        store = ResultsStore(results_path, resume=resume)
+        # Exemplos que falharam (erro ou sem saída) não contam como concluídos: o --resume os refaz
+        stored_records = store.records()
+        previous_records = [r for r in stored_records if not is_failed(r)]
+        done_ids = {r["example_id"] for r in previous_records}
+        if done_ids:
+            print(f"⏩ Retomando experimento {experiment_key}: {len(done_ids)} exemplos já concluídos serão pulados")
+        if len(stored_records) > len(previous_records):
+            print(f"🔁 {len(stored_records) - len(previous_records)} exemplos com falha serão avaliados de novo")
+
+        def pending_examples():
+            """Exemplos do dataset (JSONL local ou LangSmith) ainda sem resultado."""
+            if local_dataset:
+                source = iter_jsonl_examples(local_dataset)
+            else:
+                from langsmith import Client
+                source = Client().list_examples(dataset_name=dataset_name)
+            return (e for e in source if str(e.id) not in done_ids)
+
+        sequential_info = None
+        batch_jobs = None
+        if batch:
+            # Jobs batch do provider: gerações, juiz e re-ask, sem chamadas interativas
+            if fused or sequential:
+                print("⚠️  --batch avalia as métricas individualmente e o dataset inteiro (--fused/--sequential ignorados)")
+            batch_jobs = run_batch_evaluation(
+                list(pending_examples()),
+                prompt,
+                model_name,
+                judge_model,
+                store,
+                file_prefix=results_path[:-len(".jsonl")],
+                normalizer=normalizer,
+                prechecker=custom_evaluator.prechecker,
+                stop=stop,
+                early_stop=early_stop,
+                temperature=temperature,
+                poll_interval_s=batch_poll_interval_s
+            )
+        elif sequential:
+            # Teste sequencial: lotes aleatórios até todas as métricas alvo estarem decididas
+            examples = list(pending_examples())
+            results, tester = run_sequential_evaluation(
+                target_func,
+                examples,
+                custom_evaluator,
+                batch_size=batch_size,
+                max_workers=max_workers or max_concurrency,
+                alpha=alpha,
+                seed=seed,
+                output_path=results_path,
+                append=True,
+                prior_scores=[r["scores"] for r in previous_records]
+            )
+            sequential_info = {
+                "examples_used": len(previous_records) + len(results),
+                "examples_total": len(previous_records) + len(examples),
+                "decisions": {m: i.decision for m, i in tester.intervals().items()},
+            }
+            if run_info is not None:
+                run_info.update(sequential_info)
+        elif local_dataset:
+            # Modo offline: dataset lido do JSONL, nenhum round-trip ao LangSmith
+            run_local_evaluation(
+                target_func,
+                pending_examples(),
+                custom_evaluator,
+                max_workers=max_workers or max_concurrency,
+                output_path=results_path,
+                append=True
+            )
+        else:
+            # Motores do LangSmith: cada exemplo avaliado é gravado no results_path ao terminar
+            from langsmith.evaluation import evaluate, aevaluate
+            data = list(pending_examples()) if done_ids else dataset_name
+            streaming_evaluator = StreamingEvaluator(custom_evaluator, store)
+            if use_async:
+                # Entry point assíncrono do LangSmith: métricas de cada exemplo via asyncio.gather
+                asyncio.run(aevaluate(
+                    atarget_func,
+                    data=data,
+                    evaluators=[streaming_evaluator],
+                    experiment_prefix=experiment_prefix,
+                    max_concurrency=max_concurrency
+                ))
             else:
-                 if hasattr(res, 'feedback'):
-                    feedbacks = res.feedback
-                 elif hasattr(res, 'evaluation_results'):
-                    feedbacks = res.evaluation_results
-
-            if feedbacks:
-                if isinstance(feedbacks, list):
-                    for f in feedbacks:
-                        key = getattr(f, 'key', None) or (f.get('key') if isinstance(f, dict) else None)
-                        score = getattr(f, 'score', None) or (f.get('score') if isinstance(f, dict) else None)
-
-                        if key and score is not None:
-                            if key not in metrics_accum:
-                                metrics_accum[key] = []
-                            metrics_accum[key].append(score)
+                evaluate(
+                    target_func,
+                    data=data,
+                    evaluators=[streaming_evaluator],
+                    experiment_prefix=experiment_prefix,
+                    max_concurrency=max_concurrency
+                )
+
+        # Médias calculadas a partir do arquivo de resultados (inclui exemplos de execuções anteriores)
+        with span("aggregate"):
+            records = store.records()
+            metrics_accum = aggregate_scores(records)
 
         final_metrics = {}
         if not metrics_accum:
@@ -209,7 +534,123 @@ def run_evaluation_for_prompt(prompt_name: str, dataset_name: str = "prompt-opti
                 final_metrics[metric_name] = 0.0
                 print(f"  - {metric_name:<20}: N/A")
 
-        print("\n🔗 Veja os resultados detalhados no LangSmith UI.")
+        if sequential_info:
+            print(f"🔎 Teste sequencial: {sequential_info['examples_used']}/{sequential_info['examples_total']} exemplos avaliados")
+
+        if batch_jobs:
+            print("\n📦 Jobs batch:")
+            for job in batch_jobs:
+                print(f"  - {job['phase']:<8}: {job['job_id']} | {job['status']} | {job['completed']}/{job['requests']} "
+                      f"concluídas ({job['failed']} falhas) | {job['wall_s']:.1f}s"
+                      + (f" | {job['pending_examples']} exemplos pendentes (--resume)" if job['pending_examples'] else ""))
+
+        if judge_cache is not None:
+            jc = judge_cache.stats()
+            print(f"\n💾 Cache do juiz: {jc['hits']} hits | {jc['misses']} misses ({jc['hit_rate']:.0%} hit rate)")
+        if generation_cache is not None:
+            gc = generation_cache.stats()
+            print(f"💾 Cache do gerador: {gc['hits']} hits | {gc['misses']} misses ({gc['hit_rate']:.0%} hit rate)")
+
+        cc = controller.stats()
+        print(f"🎚️  Concorrência: limite final {cc['limit']} (pico {cc['peak_limit']}, faixa {cc['min_concurrency']}-{cc['max_concurrency']}) | "
+              f"{cc['increases']} aumentos | {cc['decreases']} reduções | {cc['overload_errors']} erros 429/5xx")
+
+        precheck_stats = custom_evaluator.prechecker.stats() if custom_evaluator.prechecker else {}
+        if precheck_stats:
+            print("\n🧱 Pré-checagem estrutural (juiz dispensado):")
+            for metric_name, p in precheck_stats.items():
+                print(f"  - {metric_name:<20}: {p['short_circuited']}/{p['checked']} ({p['rate']:.0%})")
+
+        call_stats = judge_call_stats.snapshot()
+        if call_stats:
+            print("\n🔁 Chamadas ao juiz por métrica:")
+            for metric_name, c in call_stats.items():
+                print(f"  - {metric_name:<26}: {c['calls']} chamadas | {c['retries']} retries | "
+                      f"{c['hedges']} hedges ({c['hedge_wins']} vencidos pela duplicata) | {c['failures']} falhas definitivas | "
+                      f"{c['invalid_responses']} respostas inválidas ({c['invalid_responses'] / max(c['calls'], 1):.1%}) | "
+                      f"{c['reasks']} re-asks | {c['parse_failures']} inválidas após o re-ask")
+
+        limiter_stats = rate_limiter_stats()
+        for limiter_key, rl in limiter_stats.items():
+            print(f"⏳ Rate limiter {limiter_key}: {rl['waits']}/{rl['acquired']} chamadas aguardaram | "
+                  f"espera total {rl['total_wait_s']:.1f}s (máx {rl['max_wait_s']:.1f}s) | {rl['tokens_used']} tokens")
+
+        stage_usage = usage_tracker.stages()
+        usage_summary = {"stages": stage_usage, "totals": usage_totals(stage_usage),
+                         "per_example": example_usage_summary(records)}
+        if stage_usage:
+            print("\n💰 Tokens e latência por etapa:")
+            for stage, u in stage_usage.items():
+                print(f"  - {stage:<32}: {u['calls']:>4} chamadas | {u['prompt_tokens'] + u['completion_tokens']:>8} tokens "
+                      f"({u['prompt_tokens']} in, {u.get('cached_tokens', 0)} do cache / {u['completion_tokens']} out) | "
+                      f"parede {u['wall_s']:.2f}s | fila {u['queue_s']:.2f}s")
+            t, pe = usage_summary["totals"], usage_summary["per_example"]
+            print(f"  Total: {t['tokens']} tokens ({t['cached_tokens']} de prompt lidos do cache) | "
+                  f"parede {t['wall_s']:.2f}s | fila {t['queue_s']:.2f}s")
+            if pe["examples"]:
+                print(f"  Por exemplo ({pe['examples']}): média {pe['avg_tokens']:.0f} tokens / {pe['avg_wall_s']:.2f}s | "
+                      f"mais caro {pe['max_example_id']} ({pe['max_tokens']} tokens)")
+        if run_info is not None:
+            run_info["usage"] = usage_summary
+
+        normalization_stats = normalizer.stats()
+        print("\n🧹 Normalização da saída: " + " | ".join(f"{name} {count}" for name, count in normalization_stats.items()))
+
+        stop_stats = early_stop.stats()
+        if stop_stats["generations"] and (stop_stats["enabled"] or stop_stats["trailing_tokens"]):
+            gen_usage = stage_usage.get("generate", {})
+            print(f"\n✂️  Stop em {CLOSE_TAG}: {stop_stats['stopped']}/{stop_stats['generations']} gerações cortadas "
+                  f"{'(ativo)' if stop_stats['enabled'] else '(desativado: --no-stop)'} | "
+                  f"{gen_usage.get('completion_tokens', 0)} tokens de completion | "
+                  f"~{stop_stats['trailing_tokens']} tokens gerados após a tag e descartados")
+
+        context_cache_stats = None
+        if context_cache:
+            gen_usage = stage_usage.get("generate", {})
+            context_cache_stats = {
+                "generator": {**generation_context.stats(), "prefix_tokens": approx_tokens(generation_prefix),
+                              "prompt_tokens": gen_usage.get("prompt_tokens", 0),
+                              "cached_tokens": gen_usage.get("cached_tokens", 0),
+                              "avg_latency_s": gen_usage["wall_s"] / gen_usage["calls"] if gen_usage.get("calls") else 0.0},
+                "judge": judge_context_cache.stats(),
+            }
+            g, j = context_cache_stats["generator"], context_cache_stats["judge"]
+            print(f"\n🗂️  Cache de contexto do gerador (prefixo ~{g['prefix_tokens']} tokens): "
+                  f"{g['created']} criados | {g['reused']} reutilizaram | {g['fallbacks']} pelo caminho normal | "
+                  f"{g['cached_tokens']}/{g['prompt_tokens']} tokens de prompt do cache | "
+                  f"latência média {g['avg_latency_s']:.2f}s por geração")
+            print(f"🗂️  Cache de contexto do juiz: {j['created']} contextos criados | "
+                  f"{j['reused']} chamadas reutilizaram | {j['fallbacks']} pelo caminho normal")
+
+        reg = get_llm_registry().stats()
+        print(f"\n♻️  Clientes LLM: {reg['hits']} reutilizados | {reg['misses']} criados ({reg['hit_rate']:.0%} hit rate)")
+        pc = get_prompt_cache().stats()
+        print(f"📄 Prompts compilados: {pc['hits']} reutilizados | {pc['misses']} parseados ({pc['entries']} em cache)")
+
+        summary_path = results_path.replace(".jsonl", ".summary.json")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump({"prompt": prompt_name, "model": model_name, "evaluator_model": judge_model,
+                       "experiment_key": experiment_key, "examples": len(records), "metrics": final_metrics,
+                       "sequential": sequential_info, "precheck": precheck_stats, "judge_calls": call_stats,
+                       "rate_limiter": limiter_stats, "usage": usage_summary, "early_stop": stop_stats,
+                       "normalization": normalization_stats, "context_cache": context_cache_stats,
+                       "batch": batch_jobs}, f, ensure_ascii=False, indent=2)
+        print(f"\n📁 Resultados por exemplo salvos em {results_path}")
+        if not local_dataset and not sequential and not batch:
+            print("🔗 Veja os resultados detalhados no LangSmith UI.")
+
+        if trace_recorder is not None:
+            trace_path = results_path.replace(".jsonl", ".trace.json")
+            trace_recorder.write(trace_path)
+            print(f"\n⏱️  Trace salvo em {trace_path} (abra em chrome://tracing, ui.perfetto.dev ou speedscope)")
+            for category, t in sorted(trace_recorder.stage_totals().items(), key=lambda item: -item[1]["total_s"]):
+                print(f"  - {category:<14}: {t['spans']:>5} spans | {t['total_s']:.2f}s somados")
+        if cpu_profiler is not None:
+            cpu_stats = cpu_profiler.stop()
+            cpu_profiler = None
+            prof_path = results_path.replace(".jsonl", ".prof")
+            cpu_stats.dump_stats(prof_path)
+            print(f"\n🔬 Perfil de CPU salvo em {prof_path}\n{top_functions(cpu_stats, limit=15)}")
         return final_metrics
 
     except Exception as e:
@@ -218,14 +659,57 @@ def run_evaluation_for_prompt(prompt_name: str, dataset_name: str = "prompt-opti
         traceback.print_exc()
         return {}
 
-def main():
+    finally:
+        if cpu_profiler is not None:
+            cpu_profiler.stop()
+        configure_profiling(enabled=False)
+        # Contextos em cache do --context-cache: apagados no provider em vez de esperar o TTL
+        for manager in (generation_context, judge_context_cache):
+            if manager is not None:
+                manager.close()
+
+def main(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(description="Rodar avaliação de prompt no LangSmith")
     parser.add_argument("--prompt", type=str, default="bug_to_user_story_v2", help="Nome do prompt (sem .yml)")
     parser.add_argument("--model", type=str, default="gemini-2.0-flash", help="Modelo LLM gerador (Target)")
     parser.add_argument("--evaluator-model", type=str, default=None, help="Modelo LLM avaliador (Judge). Se omitido, usa o mesmo do --model.")
-    args = parser.parse_args()
-
-    run_evaluation_for_prompt(args.prompt, model_name=args.model, evaluator_model=args.evaluator_model)
+    parser.add_argument("--fused", action="store_true", help="Avalia todas as métricas em uma única chamada ao juiz por exemplo")
+    parser.add_argument("--no-cache", action="store_true", help="Desativa os caches persistentes do juiz e do gerador")
+    parser.add_argument("--refresh", action="store_true", help="Ignora os caches do juiz e do gerador e regrava as respostas")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Usa o motor assíncrono (métricas de cada exemplo em paralelo)")
+    parser.add_argument("--max-concurrent-judges", type=int, default=8, help="Máximo de chamadas simultâneas ao juiz no modo --async")
+    parser.add_argument("--local", type=str, default=None, metavar="JSONL", help="Avalia offline a partir de um dataset JSONL local (sem LangSmith)")
+    parser.add_argument("--workers", type=int, default=None, help="Workers simultâneos no modo --local (padrão: --max-concurrency)")
+    parser.add_argument("--results-dir", type=str, default="results", help="Diretório dos arquivos de resultados por exemplo")
+    parser.add_argument("--min-concurrency", type=int, default=1, help="Limite mínimo de chamadas simultâneas ao LLM (controle adaptativo)")
+    parser.add_argument("--max-concurrency", type=int, default=16, help="Limite máximo de chamadas simultâneas ao LLM (controle adaptativo)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Tentativas por chamada ao juiz em erros transitórios (429/5xx/timeout)")
+    parser.add_argument("--hedge", action="store_true", help="Dispara uma chamada duplicada ao juiz quando a latência passa do percentil")
+    parser.add_argument("--hedge-percentile", type=float, default=95.0, help="Percentil de latência que dispara o hedging")
+    parser.add_argument("--sequential", action="store_true", help="Avalia em lotes aleatórios e para quando as métricas alvo estão decididas")
+    parser.add_argument("--batch-size", type=int, default=10, help="Exemplos por lote no modo --sequential")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Taxa de erro global do teste sequencial")
+    parser.add_argument("--no-precheck", action="store_true", help="Sempre consulta o juiz, mesmo para saídas estruturalmente quebradas")
+    parser.add_argument("--resume", action="store_true", help="Retoma o experimento: pula exemplos já gravados no arquivo de resultados")
+    parser.add_argument("--profile", action="store_true", help="Grava um trace (Chrome/speedscope) das etapas do pipeline em results/")
+    parser.add_argument("--profile-cpu", action="store_true", help="Grava também um perfil de CPU (cProfile, .prof) de todas as threads")
+    parser.add_argument("--no-stop", action="store_true", help=f"Não corta a geração em {CLOSE_TAG} (mede os tokens descartados após a tag)")
+    parser.add_argument("--context-cache", action="store_true", help="Registra os prefixos estáticos (template do gerador e prompts do juiz) como contexto em cache no provider (Gemini/fake)")
+    parser.add_argument("--batch", action="store_true", help="Gera e avalia via batch API do provider (jobs assíncronos, mais baratos; OpenAI ou provider local)")
+    parser.add_argument("--batch-poll-interval", type=float, default=DEFAULT_POLL_INTERVAL_S, help="Segundos entre consultas ao status dos jobs batch")
+    args = parser.parse_args(argv)
+
+    run_evaluation_for_prompt(args.prompt, model_name=args.model, evaluator_model=args.evaluator_model, fused=args.fused,
+                              use_cache=not args.no_cache, refresh_cache=args.refresh,
+                              use_async=args.use_async, max_concurrent_judges=args.max_concurrent_judges,
+                              local_dataset=args.local, max_workers=args.workers, results_dir=args.results_dir,
+                              min_concurrency=args.min_concurrency, max_concurrency=args.max_concurrency,
+                              max_attempts=args.max_attempts, hedge=args.hedge, hedge_percentile=args.hedge_percentile,
+                              sequential=args.sequential, batch_size=args.batch_size, alpha=args.alpha,
+                              precheck=not args.no_precheck, resume=args.resume,
+                              profile=args.profile, profile_cpu=args.profile_cpu,
+                              stop_sequences=not args.no_stop, context_cache=args.context_cache,
+                              batch=args.batch, batch_poll_interval_s=args.batch_poll_interval)
 
 if __name__ == "__main__":
     main()
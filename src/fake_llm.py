@@ -0,0 +1,432 @@
+"""
+Providers LLM locais para medição e reprodução determinística.
+
+Selecionados em utils.get_llm via LLM_PROVIDER:
+
+- fake:   FakeChatModel — respostas sintéticas (user story no formato do V2 ou
+          JSON de juiz), com latência, jitter e taxa de erro configuráveis.
+          Simula o cache de prefixo implícito dos providers (blocos de 128
+          tokens a partir de um mínimo, como na OpenAI) e o cache de contexto
+          explícito (create_cached_context + cached_content, como no Gemini),
+          reportando os tokens lidos do cache em usage_metadata.
+- record: RecordingChatModel — chama o provider real e grava cada par
+          requisição/resposta em um cassette JSONL.
+- replay: ReplayChatModel — responde exatamente o que foi gravado no cassette,
+          sem rede (opcionalmente reproduzindo a latência gravada).
+
+Variáveis de ambiente:
+    FAKE_LLM_LATENCY_MS, FAKE_LLM_JITTER_MS, FAKE_LLM_ERROR_RATE, FAKE_LLM_SEED,
+    FAKE_LLM_RESPONSES (JSONL com {"match": "...", "response": "..."}),
+    FAKE_LLM_PREFIX_CACHE_MIN_TOKENS (mínimo do cache de prefixo simulado; 0 desativa),
+    LLM_CASSETTE (caminho do cassette), LLM_REPLAY_TIMING (true/false)
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from cache import make_cache_key
+
+DEFAULT_CASSETTE_PATH = "cassettes/llm_cassette.jsonl"
+
+# Métricas reconhecidas no prompt do juiz fused (ver metrics.FUSED_METRIC_CRITERIA)
+_FUSED_KEY_PATTERN = re.compile(r'^\s*"(\w+)": \{', re.MULTILINE)
+
+# Granularidade do cache de prefixo simulado: 128 tokens (~4 caracteres por token)
+_PREFIX_BLOCK_CHARS = 128 * 4
+
+
+class SimulatedProviderError(Exception):
+    """Erro transitório simulado (rate limit / indisponibilidade) do FakeChatModel."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CassetteMissError(KeyError):
+    """A requisição não existe no cassette usado pelo ReplayChatModel."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa simples de tokens (~4 caracteres por token)."""
+    return max(1, len(text) // 4)
+
+
+def messages_to_records(messages: List[BaseMessage]) -> List[Dict[str, str]]:
+    """Serializa mensagens em [{"type", "content"}] (formato do cassette)."""
+    return [{"type": m.type, "content": m.content} for m in messages]
+
+
+def is_json_mode(call_kwargs: Dict[str, Any]) -> bool:
+    """JSON mode pedido na chamada, no formato de qualquer provider (ver utils.json_mode_kwargs)."""
+    if call_kwargs.get("json_mode"):
+        return True
+    if (call_kwargs.get("response_format") or {}).get("type") == "json_object":
+        return True
+    return (call_kwargs.get("generation_config") or {}).get("response_mime_type") == "application/json"
+
+
+def request_key(messages: List[BaseMessage], stop: Optional[List[str]] = None, model_name: str = "",
+                temperature: float = 0.0, json_mode: bool = False) -> str:
+    """
+    Chave de uma requisição no cassette: hash das mensagens, stop sequences,
+    modelo, temperatura e JSON mode (normalizado entre providers, para que o
+    replay de uma chamada JSON do Gemini/OpenAI encontre a gravação).
+    """
+    return make_cache_key(messages_to_records(messages), stop or [], model_name, temperature, json_mode)
+
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(str(m.content) for m in messages)
+
+
+def _apply_stop(content: str, stop: Optional[List[str]]) -> str:
+    """Corta o texto na primeira stop sequence (excluída), como os providers reais."""
+    cut = min((idx for idx in (content.find(seq) for seq in stop or []) if idx >= 0), default=-1)
+    return content[:cut] if cut >= 0 else content
+
+
+def _usage(prompt: str, completion: str, cached_tokens: int = 0) -> Dict[str, Any]:
+    input_tokens = estimate_tokens(prompt)
+    output_tokens = estimate_tokens(completion)
+    usage: Dict[str, Any] = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                             "total_tokens": input_tokens + output_tokens}
+    if cached_tokens:
+        usage["input_token_details"] = {"cache_read": cached_tokens}
+    return usage
+
+
+def _result(content: str, usage: Optional[Dict[str, Any]] = None, **metadata: Any) -> ChatResult:
+    message = AIMessage(content=content, usage_metadata=usage, response_metadata=metadata)
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _canned_user_story(prompt: str, rng: random.Random) -> str:
+    """User story sintética no formato exigido pelo prompt V2."""
+    match = re.findall(r'Bug Report: "(.*?)"', prompt, re.DOTALL)
+    bug = (match[-1] if match else prompt[-200:]).strip()
+    scenarios = rng.randint(3, 5)
+    lines = [
+        f"# Corrigir comportamento reportado: {bug[:60]}",
+        "",
+        "**Como** um cliente afetado pelo problema,",
+        "**Eu quero** que o sistema funcione conforme esperado,",
+        "**Para que** eu possa concluir minhas tarefas sem interrupções.",
+        "",
+        "## Criterios de Aceite",
+    ]
+    for i in range(1, scenarios + 1):
+        lines += [
+            "",
+            f"### Cenario {i}: Fluxo {i}",
+            "- **Dado** que estou usando a funcionalidade afetada",
+            "- **Quando** realizo a ação descrita no bug",
+            "- **Entao** o sistema deve responder corretamente",
+        ]
+    lines += ["", "## Contexto Tecnico", f"- **Problema identificado**: {bug[:120]}"]
+    return "\n".join(lines)
+
+
+def _canned_judge_response(prompt: str, rng: random.Random) -> str:
+    """JSON de juiz sintético compatível com as métricas de metrics.py."""
+    def value():
+        return round(rng.uniform(0.85, 1.0), 2)
+
+    if "CADA uma das métricas" in prompt:
+        fmt = prompt[prompt.rfind("Retorne APENAS"):]
+        payload = {}
+        for name in _FUSED_KEY_PATTERN.findall(fmt):
+            if name == "f1_score":
+                payload[name] = {"precision": value(), "recall": value(), "reasoning": "Simulado."}
+            else:
+                payload[name] = {"score": value(), "reasoning": "Simulado."}
+        return json.dumps(payload, ensure_ascii=False)
+
+    if '"precision"' in prompt:
+        return json.dumps({"precision": value(), "recall": value(), "reasoning": "Simulado."})
+    return json.dumps({"score": value(), "reasoning": "Simulado."})
+
+
+def load_canned_responses(path: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Carrega respostas pré-definidas de um JSONL ({"match": "...", "response": "..."}).
+    A primeira regra cujo `match` aparece no prompt é usada.
+    """
+    if not path:
+        return []
+    rules = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                data = json.loads(line)
+                rules.append((data["match"], data["response"]))
+    return rules
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model local e determinístico, com latência/erros simulados.
+
+    Para o mesmo prompt e seed, a sequência de respostas (e de erros) é sempre
+    a mesma, independentemente da ordem de execução entre threads.
+    """
+
+    model_name: str = "fake-chat"
+    temperature: float = 0.0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+    canned_responses: List[Tuple[str, str]] = []
+    prefix_cache_min_tokens: int = 1024  # 0 desativa o cache de prefixo/contexto simulado
+
+    _attempts: Dict[str, int]
+    _calls: Dict[str, int]
+    _lock: Any
+    _prefixes: set
+    _contexts: Dict[str, str]
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._attempts = {}
+        self._calls = {"total": 0, "judge": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._prefixes = set()
+        self._contexts = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def call_stats(self) -> Dict[str, int]:
+        """Contadores de chamadas recebidas (total, de juiz e com erro simulado)."""
+        with self._lock:
+            return dict(self._calls)
+
+    def create_cached_context(self, prefix: str, ttl_s: int = 3600) -> str:
+        """
+        Registra `prefix` como contexto em cache (equivalente ao CachedContent do Gemini).
+
+        Raises:
+            ValueError: cache desativado ou prefixo abaixo do mínimo de tokens
+        """
+        if not self.prefix_cache_min_tokens or estimate_tokens(prefix) < self.prefix_cache_min_tokens:
+            raise ValueError(f"conteúdo abaixo do mínimo de {self.prefix_cache_min_tokens} tokens para cache")
+        name = f"cachedContents/fake-{make_cache_key(self.model_name, prefix)[:16]}"
+        with self._lock:
+            self._contexts[name] = prefix
+        return name
+
+    def delete_cached_context(self, name: str):
+        """
+        Apaga um contexto criado por create_cached_context.
+
+        Raises:
+            KeyError: contexto inexistente (ou já apagado)
+        """
+        with self._lock:
+            del self._contexts[name]
+
+    def _cached_tokens(self, prompt: str) -> int:
+        """
+        Cache de prefixo implícito: tokens do maior prefixo (em blocos de 128
+        tokens) já visto em uma requisição anterior, a partir do mínimo.
+        """
+        if not self.prefix_cache_min_tokens:
+            return 0
+        block = _PREFIX_BLOCK_CHARS
+        first = max(block, self.prefix_cache_min_tokens * 4 // block * block)
+        hashes = [(end, hash(prompt[:end])) for end in range(first, len(prompt) + 1, block)]
+        with self._lock:
+            cached = max((end for end, h in hashes if h in self._prefixes), default=0)
+            self._prefixes.update(h for _, h in hashes)
+        return cached // 4
+
+    def _rng_for(self, prompt: str) -> random.Random:
+        # Uma RNG por (seed, prompt, tentativa): determinística mesmo com concorrência
+        key = make_cache_key(self.seed, self.model_name, prompt)
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        return random.Random(f"{key}:{attempt}")
+
+    def _plan(self, messages: List[BaseMessage],
+              cached_content: Optional[str] = None) -> Tuple[float, Optional[SimulatedProviderError], str, str, int]:
+        prompt = _prompt_text(messages)
+        if cached_content is not None:
+            # O contexto explícito é o início do prompt: a resposta é a mesma da chamada sem cache
+            with self._lock:
+                context = self._contexts[cached_content]
+            prompt = context + prompt
+            cached_tokens = estimate_tokens(context)
+        else:
+            cached_tokens = self._cached_tokens(prompt)
+        rng = self._rng_for(prompt)
+        delay = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        is_judge = "Retorne APENAS um objeto JSON" in prompt
+        failed = rng.random() < self.error_rate
+
+        with self._lock:
+            self._calls["total"] += 1
+            self._calls["judge"] += int(is_judge)
+            self._calls["errors"] += int(failed)
+
+        if failed:
+            status = rng.choice([429, 503])
+            return delay, SimulatedProviderError(f"Erro simulado HTTP {status}", status), prompt, "", 0
+
+        for match, response in self.canned_responses:
+            if match in prompt:
+                return delay, None, prompt, response, cached_tokens
+        if is_judge:
+            return delay, None, prompt, _canned_judge_response(prompt, rng), cached_tokens
+        return delay, None, prompt, _canned_user_story(prompt, rng), cached_tokens
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        delay, error, prompt, content, cached_tokens = self._plan(messages, kwargs.get("cached_content"))
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        content = _apply_stop(content, stop)
+        return _result(content, _usage(prompt, content, cached_tokens), model_name=self.model_name)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        delay, error, prompt, content, cached_tokens = self._plan(messages, kwargs.get("cached_content"))
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        content = _apply_stop(content, stop)
+        return _result(content, _usage(prompt, content, cached_tokens), model_name=self.model_name)
+
+
+class RecordingChatModel(BaseChatModel):
+    """
+    Encaminha as chamadas ao provider real e grava requisição/resposta no cassette.
+    """
+
+    inner: BaseChatModel
+    cassette_path: str = DEFAULT_CASSETTE_PATH
+    model_name: str = ""
+    temperature: float = 0.0
+
+    _lock: Any
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        Path(self.cassette_path).parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"record-{self.inner._llm_type}"
+
+    def _record(self, messages: List[BaseMessage], stop: Optional[List[str]], call_kwargs: Dict[str, Any],
+                message: BaseMessage, latency_s: float):
+        json_mode = is_json_mode(call_kwargs)
+        entry = {
+            "key": request_key(messages, stop, self.model_name, self.temperature, json_mode),
+            "messages": messages_to_records(messages),
+            "stop": stop or [],
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "json_mode": json_mode,
+            "response": message.content,
+            "usage": getattr(message, "usage_metadata", None),
+            "latency_s": round(latency_s, 4),
+        }
+        with self._lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._record(messages, stop, kwargs, message, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        message = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self._record(messages, stop, kwargs, message, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Responde a partir do cassette gravado pelo RecordingChatModel, sem rede.
+    """
+
+    cassette_path: str = DEFAULT_CASSETTE_PATH
+    replay_timing: bool = False
+    model_name: str = ""
+    temperature: float = 0.0
+
+    _entries: Dict[str, Dict[str, Any]]
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._entries = {}
+        with open(self.cassette_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]] = entry
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat"
+
+    def _lookup(self, messages: List[BaseMessage], stop: Optional[List[str]],
+                call_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        key = request_key(messages, stop, self.model_name, self.temperature, is_json_mode(call_kwargs))
+        entry = self._entries.get(key)
+        if entry is None:
+            raise CassetteMissError(
+                f"Requisição não encontrada no cassette {self.cassette_path}. "
+                "Grave-a novamente com LLM_PROVIDER=record."
+            )
+        return entry
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        entry = self._lookup(messages, stop, kwargs)
+        if self.replay_timing:
+            time.sleep(entry.get("latency_s", 0.0))
+        return _result(entry["response"], entry.get("usage"))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        entry = self._lookup(messages, stop, kwargs)
+        if self.replay_timing:
+            await asyncio.sleep(entry.get("latency_s", 0.0))
+        return _result(entry["response"], entry.get("usage"))
+
+
+def fake_llm_from_env(model_name: str, temperature: float = 0.0, **kwargs: Any) -> FakeChatModel:
+    """Cria um FakeChatModel configurado pelas variáveis FAKE_LLM_*."""
+    return FakeChatModel(
+        model_name=model_name,
+        temperature=temperature,
+        latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+        jitter_ms=float(os.getenv("FAKE_LLM_JITTER_MS", "0")),
+        error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+        seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        canned_responses=load_canned_responses(os.getenv("FAKE_LLM_RESPONSES")),
+        prefix_cache_min_tokens=int(os.getenv("FAKE_LLM_PREFIX_CACHE_MIN_TOKENS", "1024")),
+        **kwargs
+    )
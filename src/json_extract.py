@@ -0,0 +1,162 @@
+"""
+Extração de JSON das respostas do LLM (uma única implementação, usada por metrics e utils).
+
+As respostas do juiz chegam em formatos variados: JSON puro, bloco
+```json ... ```, raciocínio em texto seguido do objeto, ou truncadas.
+Estratégia:
+1. Caminho rápido: um único parse do trecho entre o primeiro "{" e o último
+   "}" — cobre JSON puro, cercas de markdown e texto antes/depois do objeto.
+2. Se falhar, uma varredura linear que encontra os objetos de nível superior
+   balanceados (respeitando strings e escapes) e devolve o primeiro que é
+   um JSON válido — cercas de markdown e texto ao redor são ignorados
+   naturalmente, sem replaces nem splits.
+
+O parse usa orjson quando instalado (opcional) e json da stdlib caso contrário.
+Falhas são estruturadas (JsonParseResult.error), em vez de virar um score 0.0
+silencioso: quem chama decide o que fazer (ex: registrar e pontuar como erro).
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import orjson
+
+    JSON_BACKEND = "orjson"
+    _JSON_ERRORS: Tuple[type, ...] = (orjson.JSONDecodeError,)
+
+    def _loads(text: str) -> Any:
+        return orjson.loads(text)
+except ImportError:
+    JSON_BACKEND = "json"
+    _JSON_ERRORS = (json.JSONDecodeError,)
+    _loads: Callable[[str], Any] = json.loads
+
+# Motivos de falha
+EMPTY = "empty"              # resposta vazia
+NO_OBJECT = "no_object"      # nenhum "{" na resposta
+TRUNCATED = "truncated"      # objeto aberto e nunca fechado (resposta cortada)
+INVALID_JSON = "invalid_json"  # há objetos balanceados, mas nenhum é JSON válido
+
+
+@dataclass
+class JsonParseResult:
+    """Resultado da extração: o objeto (data) ou o motivo da falha (error)."""
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    strategy: Optional[str] = None  # "direct" ou "scan"
+    detail: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+    def describe(self) -> str:
+        """Descrição legível da falha (para logs e reasoning)."""
+        return f"{self.error}: {self.detail}" if self.detail else str(self.error)
+
+
+class JsonExtractionError(ValueError):
+    """A resposta não contém um objeto JSON válido (carrega o JsonParseResult)."""
+
+    def __init__(self, result: JsonParseResult):
+        super().__init__(f"resposta sem JSON válido ({result.describe()})")
+        self.result = result
+
+
+_STRUCTURAL = re.compile(r'[{}"\\]')
+
+
+def iter_json_objects(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    Varre o texto uma vez e produz (início, fim) de cada objeto {...} de nível
+    superior balanceado. Chaves dentro de strings JSON não contam.
+
+    Só os caracteres estruturais ({, }, aspas e barra invertida) são visitados
+    (regex em C), o resto do texto é pulado. Se o último objeto não fechar,
+    produz (início, -1).
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    skip_to = -1  # posição do caractere escapado por uma barra invertida
+    for match in _STRUCTURAL.finditer(text):
+        i = match.start()
+        if i <= skip_to:
+            continue
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                skip_to = i + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif depth > 0:
+            if ch == '"':
+                in_string = True
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    yield start, i + 1
+    if depth > 0:
+        yield start, -1
+
+
+def extract_json(response_text: Optional[str]) -> JsonParseResult:
+    """
+    Extrai o primeiro objeto JSON válido de uma resposta de LLM.
+
+    Args:
+        response_text: Texto da resposta
+
+    Returns:
+        JsonParseResult com data (dict) ou error (EMPTY, NO_OBJECT, TRUNCATED, INVALID_JSON)
+    """
+    text = (response_text or "").strip()
+    if not text:
+        return JsonParseResult(error=EMPTY)
+
+    # Caminho rápido: do primeiro "{" ao último "}" (JSON puro, cercas, texto ao
+    # redor). Se isso parseia como objeto, é o primeiro objeto de nível superior.
+    first, last = text.find("{"), text.rfind("}")
+    if first == -1:
+        return JsonParseResult(error=NO_OBJECT, detail=text[:60])
+    if last > first:
+        try:
+            data = _loads(text[first:last + 1])
+            if isinstance(data, dict):
+                return JsonParseResult(data=data, strategy="direct")
+        except _JSON_ERRORS:
+            pass
+
+    last_error = ""
+    for start, end in iter_json_objects(text):
+        if end == -1:
+            return JsonParseResult(error=TRUNCATED, detail=f"objeto aberto na posição {start} não foi fechado")
+        try:
+            data = _loads(text[start:end])
+        except _JSON_ERRORS as e:
+            last_error = str(e)
+            continue
+        if isinstance(data, dict):
+            return JsonParseResult(data=data, strategy="scan")
+
+    return JsonParseResult(error=INVALID_JSON, detail=last_error)
+
+
+def extract_json_from_response(response_text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Extrai JSON de uma resposta de LLM que pode conter texto adicional.
+
+    Args:
+        response_text: Texto da resposta do LLM
+
+    Returns:
+        Dicionário extraído ou None se não encontrar JSON válido
+    """
+    return extract_json(response_text).data
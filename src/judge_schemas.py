@@ -0,0 +1,45 @@
+"""
+Schemas (pydantic) das respostas do LLM-as-Judge.
+
+Cada métrica valida o JSON do juiz contra um destes modelos: score,
+precision e recall precisam estar em [0, 1]. Uma resposta fora do schema
+não vira mais score 0.0 direto — metrics.py reenvia a pergunta uma vez,
+com o erro de validação, antes de desistir.
+"""
+
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel, Field, ValidationError
+
+
+class ScoreJudgment(BaseModel):
+    """Resposta das métricas de score único (tone, acceptance_criteria, ...)."""
+    score: float = Field(ge=0.0, le=1.0)
+    reasoning: str = ""
+
+
+class F1Judgment(BaseModel):
+    """Resposta da métrica F1-Score: precision e recall (o F1 é calculado localmente)."""
+    precision: float = Field(ge=0.0, le=1.0)
+    recall: float = Field(ge=0.0, le=1.0)
+    reasoning: str = ""
+
+
+def validate_judgment(schema: Type[BaseModel], data: Any) -> Dict[str, Any]:
+    """
+    Valida o JSON do juiz contra o schema.
+
+    Returns:
+        Dict com os campos do schema (tipos já convertidos)
+
+    Raises:
+        ValidationError: campo ausente, de tipo errado ou fora de [0, 1]
+    """
+    return schema.model_validate(data).model_dump()
+
+
+def describe_validation_error(error: Exception) -> str:
+    """Resumo curto de uma falha de validação (para o re-ask e para o reasoning)."""
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in e['loc']) or 'resposta'}: {e['msg']}" for e in error.errors())
+    return str(error)
@@ -0,0 +1,120 @@
+"""
+Registro de clientes LLM reutilizáveis.
+
+Mantém, para o processo inteiro, uma instância de cliente (ChatOpenAI,
+ChatGoogleGenerativeAI, ...) por combinação de provider, modelo, temperatura
+e parâmetros extras. Reutilizar a instância mantém o pool de conexões HTTP
+(e os handshakes TLS) aquecido entre as chamadas do gerador e dos juízes.
+
+O registro é thread-safe (a avaliação roda com max_concurrency > 1), expõe
+contadores de hit/miss e permite invalidação explícita.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+RegistryKey = Tuple[str, str, float, Tuple[Tuple[str, str], ...]]
+
+
+class LLMClientRegistry:
+    """
+    Cache thread-safe de clientes LLM indexado por
+    (provider, modelo, temperatura, parâmetros extras).
+    """
+
+    def __init__(self):
+        self._clients: Dict[RegistryKey, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float,
+                 extra_params: Optional[Dict[str, Any]] = None) -> RegistryKey:
+        """
+        Monta a chave do registro.
+
+        Args:
+            provider: Nome do provider ("google", "openai", ...)
+            model: Nome do modelo
+            temperature: Temperatura de amostragem
+            extra_params: Parâmetros extras repassados ao construtor do cliente
+
+        Returns:
+            Tupla hashable e independente da ordem dos parâmetros extras
+        """
+        extras = tuple(sorted((k, repr(v)) for k, v in (extra_params or {}).items()))
+        return (provider, model, float(temperature), extras)
+
+    def get_or_create(self, key: RegistryKey, factory: Callable[[], Any]) -> Any:
+        """
+        Retorna o cliente da chave, construindo-o com `factory` apenas no primeiro uso.
+
+        Args:
+            key: Chave gerada por make_key
+            factory: Função sem argumentos que constrói o cliente
+
+        Returns:
+            Instância do cliente (compartilhada entre threads)
+        """
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.hits += 1
+                return client
+
+            # A construção acontece sob o lock para garantir uma única
+            # instância por chave mesmo com várias threads no primeiro uso.
+            client = factory()
+            self._clients[key] = client
+            self.misses += 1
+            return client
+
+    def invalidate(self, provider: Optional[str] = None, model: Optional[str] = None) -> int:
+        """
+        Remove clientes do registro.
+
+        Sem argumentos remove todos; com provider e/ou model remove apenas
+        as entradas correspondentes.
+
+        Returns:
+            Quantidade de clientes removidos
+        """
+        with self._lock:
+            keys = [
+                k for k in self._clients
+                if (provider is None or k[0] == provider) and (model is None or k[1] == model)
+            ]
+            for k in keys:
+                del self._clients[k]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna contadores do registro.
+
+        Returns:
+            Dict com hits, misses, hit_rate e quantidade de clientes ativos
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "clients": len(self._clients),
+            }
+
+    def reset_stats(self):
+        """Zera os contadores de hit/miss sem descartar os clientes."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+_registry = LLMClientRegistry()
+
+
+def get_llm_registry() -> LLMClientRegistry:
+    """Retorna o registro global de clientes LLM do processo."""
+    return _registry
@@ -0,0 +1,186 @@
+"""
+Runner de avaliação local (offline), sem LangSmith.
+
+Lê os exemplos direto do JSONL (em streaming), executa o target (gerador)
+e o GlobalEvaluator em um pool de workers limitado e grava os resultados
+em disco. Nenhuma chamada é feita ao LangSmith: nem para buscar o dataset,
+nem para registrar runs (o tracing é desligado dentro dos workers).
+
+Os resultados têm o mesmo formato das linhas de um experimento do LangSmith
+({"run", "example", "evaluation_results"}), então a agregação de
+run_evaluation_for_prompt funciona igual para os dois caminhos.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from langsmith.run_helpers import tracing_context
+
+from cache import make_cache_key
+from profiling import span
+from usage import example_scope, merge_usage
+
+
+@dataclass
+class LocalExample:
+    """Exemplo do dataset local (mesmos atributos usados de langsmith.schemas.Example)."""
+    id: str
+    inputs: Dict[str, Any]
+    outputs: Dict[str, Any]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LocalRun:
+    """Execução do target para um exemplo (mesmos atributos usados de langsmith.schemas.Run)."""
+    outputs: Dict[str, Any]
+    error: Optional[str] = None
+
+
+def example_id_for(inputs: Dict[str, Any]) -> str:
+    """Identificador estável de um exemplo, derivado dos inputs."""
+    return make_cache_key(inputs)[:16]
+
+
+def iter_jsonl_examples(jsonl_path: str) -> Iterator[LocalExample]:
+    """
+    Lê exemplos de um JSONL linha a linha (sem carregar o arquivo inteiro).
+
+    Args:
+        jsonl_path: Caminho do dataset (formato de datasets/bug_to_user_story.jsonl)
+
+    Yields:
+        LocalExample para cada linha válida
+    """
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️  Erro na linha {i}: {e}")
+                continue
+
+            inputs = data.get("inputs", {})
+            yield LocalExample(
+                id=example_id_for(inputs),
+                inputs=inputs,
+                outputs=data.get("outputs", {}),
+                metadata=data.get("metadata", {}),
+            )
+
+
+def _evaluate_example(target: Callable[[dict], dict], evaluator, example: LocalExample) -> Dict[str, Any]:
+    """Executa target + evaluator para um exemplo, sem tracing no LangSmith."""
+    with tracing_context(enabled=False):
+        start = time.perf_counter()
+        try:
+            run = LocalRun(outputs=target(example.inputs))
+        except Exception as e:
+            print(f"❌ Erro ao gerar saída para o exemplo {example.id}: {e}")
+            run = LocalRun(outputs={"output": ""}, error=str(e))
+        generation_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with example_scope() as judge_usage:
+            evaluation = evaluator.evaluate_run(run, example)
+        judge_s = time.perf_counter() - start
+
+    # evaluate_run retorna {"results": [...]} ou um EvaluationResult isolado (sem saída)
+    if not isinstance(evaluation, dict):
+        evaluation = {"results": [evaluation]}
+
+    return {
+        "run": run,
+        "example": example,
+        "evaluation_results": evaluation,
+        "timings": {"generation_s": generation_s, "judge_s": judge_s},
+        "usage": judge_usage,
+    }
+
+
+def result_to_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converte uma linha de resultado em dict serializável em JSON.
+
+    O uso por etapa soma o da geração (outputs["usage"] do target) e o do juiz.
+    """
+    example = row["example"]
+    outputs = row["run"].outputs or {}
+    return {
+        "example_id": str(example.id),
+        "inputs": example.inputs,
+        "output": outputs.get("output"),
+        "error": row["run"].error,
+        "scores": {r.key: r.score for r in row["evaluation_results"]["results"]},
+        "reasoning": {r.key: r.comment for r in row["evaluation_results"]["results"]},
+        "timings": row["timings"],
+        "usage": merge_usage([outputs.get("usage"), row.get("usage")]),
+    }
+
+
+def run_local_evaluation(target: Callable[[dict], dict], examples: Iterable[LocalExample], evaluator,
+                         max_workers: int = 4, output_path: Optional[str] = None,
+                         append: bool = False, keep_results: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Avalia os exemplos localmente em um pool de workers limitado.
+
+    Com output_path (e sem keep_results), no máximo `max_workers * 2`
+    exemplos ficam em memória ao mesmo tempo: cada resultado vai para o
+    arquivo e é descartado, o que permite datasets grandes lidos em streaming.
+
+    Args:
+        target: Função inputs -> {"output": ...} (mesmo target usado no LangSmith)
+        examples: Exemplos (ex: iter_jsonl_examples)
+        evaluator: GlobalEvaluator (ou compatível com evaluate_run)
+        max_workers: Número de workers simultâneos
+        output_path: JSONL onde cada resultado é gravado (opcional)
+        append: Acrescenta ao JSONL existente em vez de sobrescrevê-lo
+        keep_results: Também retorna os resultados em memória (padrão: só sem output_path)
+
+    Returns:
+        Lista de resultados no formato {"run", "example", "evaluation_results", "timings", "usage"}
+        (vazia se keep_results=False: os resultados ficam apenas no arquivo)
+    """
+    if keep_results is None:
+        keep_results = output_path is None
+    results = []
+    write_lock = threading.Lock()
+    out_file = None
+    if output_path:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        out_file = open(output_path, "a" if append else "w", encoding="utf-8")
+
+    def collect(future):
+        row = future.result()
+        if keep_results:
+            results.append(row)
+        if out_file is not None:
+            with span("write_result", "serialization"), write_lock:
+                out_file.write(json.dumps(result_to_record(row), ensure_ascii=False) + "\n")
+                out_file.flush()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            in_flight = set()
+            for example in examples:
+                if len(in_flight) >= max_workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
+                in_flight.add(pool.submit(_evaluate_example, target, evaluator, example))
+
+            for future in wait(in_flight).done:
+                collect(future)
+    finally:
+        if out_file is not None:
+            out_file.close()
+
+    return results
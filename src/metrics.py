@@ -23,15 +23,45 @@ Configure o provider no arquivo .env através da variável LLM_PROVIDER.
 """
 
 import os
-import json
-import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
-from langchain_core.messages import SystemMessage, HumanMessage
-from utils import get_eval_llm
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, HumanMessage
+from utils import get_eval_llm, json_mode_kwargs, resolve_llm_provider
+from cache import SQLiteCache, make_cache_key, open_cache_from_env
+from concurrency import concurrency_slot, aconcurrency_slot
+from retry import HedgePolicy, JudgeCallStats, RetryPolicy, acall_with_retry, call_with_retry
+from usage import track_llm_call, track_stage
+from json_extract import JsonExtractionError, extract_json
+from context_cache import ContextCacheManager, cached_context_kwargs
+from judge_schemas import F1Judgment, ScoreJudgment, describe_validation_error, validate_judgment
 
 load_dotenv()
 
+DEFAULT_JUDGE_CACHE_PATH = ".cache/judge_cache.sqlite"
+
+# Layout dos prompts do juiz: prefixo estático por métrica (papel, critérios e
+# formato de saída) e, depois deste marcador, a parte variável de cada exemplo.
+# Com o prefixo idêntico entre chamadas, o cache de prefixo implícito dos
+# providers pode reaproveitá-lo; no modo explícito ele vira um contexto em cache.
+PAYLOAD_MARKER = "DADOS PARA AVALIAÇÃO:"
+
+# Cache persistente das respostas do juiz (desligado por padrão; ativado via configure_judge_cache)
+_judge_cache: Optional[SQLiteCache] = None
+
+# Retry/hedging das chamadas ao juiz (ajustados via configure_judge_retries)
+_retry_policy = RetryPolicy()
+_hedge_policy: Optional[HedgePolicy] = None
+_judge_call_stats = JudgeCallStats()
+
+# Saída JSON nativa do provider e re-ask de respostas fora do schema (ajustados via configure_judge_validation)
+_json_mode = True
+_reask = True
+
+# Cache de contexto explícito do prefixo estático (desligado por padrão; ativado via configure_judge_context_cache)
+_context_cache: Optional[ContextCacheManager] = None
+
+REASK_MESSAGE = """Sua resposta anterior não pôde ser usada: {error}.
+Responda novamente somente com o objeto JSON no formato pedido (valores numéricos entre 0.0 e 1.0), sem texto antes ou depois."""
 
 
 def get_evaluator_llm(model: Optional[str] = None):
@@ -42,89 +72,342 @@ def get_evaluator_llm(model: Optional[str] = None):
     return get_eval_llm(model=model, temperature=0)
 
 
-def extract_json_from_response(response_text: str) -> Optional[Dict[str, Any]]:
-    """
-    Tenta extrair JSON da resposta do LLM de forma robusta.
-    Suporta:
-    - JSON puro
-    - Markdown blocks (```json ... ```)
-    - Texto misturado (Reasoning + JSON)
-    """
-    text = response_text.strip()
-    
-    # 1. Tentar limpar markdown blocks
-    if "```" in text:
-        # Remover 'json' se existir
-        text = text.replace("```json", "```").replace("```JSON", "```")
-        parts = text.split("```")
-        # Geralmente o código está na parte 1 (índice ímpar se começou com texto, ou 0 se começou com ```)
-        # Vamos procurar em todas as partes por algo que pareça JSON
-        for part in parts:
-            part = part.strip()
-            if part.startswith("{") and part.endswith("}"):
-                try:
-                    return json.loads(part)
-                except:
-                    continue
-    
-    # 2. Tentar regex para encontrar o primeiro objeto JSON {...}
-    # Procura pelo primeiro '{' e vai até o último '}'
-    try:
-        start_idx = text.find("{")
-        end_idx = text.rfind("}")
-        
-        if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-            json_str = text[start_idx : end_idx + 1]
-            return json.loads(json_str)
-            
-    except Exception:
-        pass
-
-    # 3. Tentar parse direto (caso seja string limpa)
-    try:
-        return json.loads(text)
-    except:
-        pass
-        
-    # Se não conseguir extrair, retornar valores default
-    print(f"⚠️  Não foi possível extrair JSON da resposta")
-    return {"score": 0.0, "reasoning": "Erro ao processar resposta - JSON inválido"}
+def configure_judge_cache(enabled: bool = True, refresh: bool = False) -> Optional[SQLiteCache]:
+    """
+    Ativa/desativa o cache persistente das respostas do juiz.
 
+    O caminho, o TTL e o tamanho máximo vêm de JUDGE_CACHE_PATH,
+    JUDGE_CACHE_TTL_DAYS e JUDGE_CACHE_MAX_ENTRIES.
 
-def evaluate_f1_score(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    Args:
+        enabled: Se False, todas as chamadas vão ao provider
+        refresh: Se True, ignora respostas em cache mas grava as novas
+
+    Returns:
+        O cache ativo (ou None se desativado)
     """
-    Calcula F1-Score usando LLM-as-Judge.
+    global _judge_cache
+    if _judge_cache is not None:
+        _judge_cache.close()
+    _judge_cache = open_cache_from_env("JUDGE_CACHE", DEFAULT_JUDGE_CACHE_PATH, refresh=refresh) if enabled else None
+    return _judge_cache
 
-    F1-Score = 2 * (Precision * Recall) / (Precision + Recall)
+
+def get_judge_cache() -> Optional[SQLiteCache]:
+    """Retorna o cache do juiz ativo (ou None)."""
+    return _judge_cache
+
+
+def configure_judge_retries(max_attempts: int = 3, hedge: bool = False,
+                            hedge_percentile: float = 95.0) -> JudgeCallStats:
+    """
+    Configura retry e hedging das chamadas ao juiz e zera os contadores.
 
     Args:
-        question: Pergunta feita pelo usuário
-        answer: Resposta gerada pelo prompt
-        reference: Resposta esperada (ground truth)
-        model: Modelo LLM a ser usado (opcional)
+        max_attempts: Tentativas por chamada (1 = sem retry)
+        hedge: Dispara uma requisição duplicada quando a chamada demora demais
+        hedge_percentile: Percentil das latências recentes que dispara a duplicata
 
     Returns:
-        Dict com score e reasoning:
-        {
-            "score": 0.95,
-            "precision": 0.9,
-            "recall": 0.99,
-            "reasoning": "Explicação do LLM..."
-        }
+        Os contadores por métrica (retries, hedges, falhas definitivas)
     """
-    evaluator_prompt = f"""
-Você é um avaliador especializado em medir a qualidade de respostas geradas por IA.
+    global _retry_policy, _hedge_policy, _judge_call_stats
+    _retry_policy = RetryPolicy(max_attempts=max_attempts)
+    _hedge_policy = HedgePolicy(percentile=hedge_percentile) if hedge else None
+    _judge_call_stats = JudgeCallStats()
+    return _judge_call_stats
 
-Sua tarefa é calcular PRECISION e RECALL para determinar o F1-Score.
 
-PERGUNTA DO USUÁRIO:
-{question}
+def get_judge_call_stats() -> JudgeCallStats:
+    """Retorna os contadores de chamadas ao juiz por métrica."""
+    return _judge_call_stats
 
-RESPOSTA ESPERADA (Ground Truth):
-{reference}
 
-RESPOSTA GERADA PELO MODELO:
-{answer}
+def configure_judge_validation(json_mode: bool = True, reask: bool = True):
+    """
+    Configura como as respostas do juiz são pedidas e validadas.
+
+    Args:
+        json_mode: Pede saída JSON nativa ao provider (Gemini/OpenAI), quando suportado
+        reask: Reenvia a pergunta uma vez, com o erro, quando a resposta não
+               passa no schema (em vez de pontuar 0.0 direto)
+    """
+    global _json_mode, _reask
+    _json_mode = json_mode
+    _reask = reask
+
+
+def configure_judge_context_cache(enabled: bool = True) -> Optional[ContextCacheManager]:
+    """
+    Ativa/desativa o cache de contexto explícito do prefixo estático dos prompts do juiz.
+
+    Com o cache ativo e um provider com suporte (Gemini, fake), o prefixo de
+    cada métrica é registrado uma vez e as chamadas enviam só a parte variável.
+    Nos demais providers (ou prefixos recusados) a chamada usa o prompt completo.
+
+    Returns:
+        O gerenciador ativo (ou None se desativado)
+    """
+    global _context_cache
+    _context_cache = ContextCacheManager() if enabled else None
+    return _context_cache
+
+
+def split_judge_prompt(evaluator_prompt: str) -> Tuple[str, str]:
+    """
+    Separa o prompt renderizado em (prefixo estático, parte variável).
+
+    A parte variável começa no PAYLOAD_MARKER; sem o marcador, o prompt inteiro é variável.
+    """
+    idx = evaluator_prompt.find(PAYLOAD_MARKER)
+    if idx < 0:
+        return "", evaluator_prompt
+    return evaluator_prompt[:idx], evaluator_prompt[idx:]
+
+
+def _judge_messages(evaluator_prompt: str, correction: Optional[Tuple[str, str]]) -> List[BaseMessage]:
+    """Mensagens da chamada: o prompt e, no re-ask, a resposta inválida seguida do erro."""
+    messages: List[BaseMessage] = [HumanMessage(content=evaluator_prompt)]
+    if correction is not None:
+        invalid_response, error = correction
+        messages += [AIMessage(content=invalid_response), HumanMessage(content=REASK_MESSAGE.format(error=error))]
+    return messages
+
+
+def _judge_request(llm, evaluator_prompt: str,
+                   correction: Optional[Tuple[str, str]]) -> Tuple[List[BaseMessage], Dict[str, Any]]:
+    """Mensagens e parâmetros da chamada (JSON mode e, se ativo, o contexto em cache do prefixo)."""
+    call_kwargs = json_mode_kwargs(llm) if _json_mode else {}
+    prompt = evaluator_prompt
+    if _context_cache is not None:
+        prefix, payload = split_judge_prompt(evaluator_prompt)
+        handle = _context_cache.handle_for(llm, prefix) if prefix else None
+        if handle is not None:
+            prompt = payload
+            call_kwargs = {**call_kwargs, **cached_context_kwargs(handle)}
+    return _judge_messages(prompt, correction), call_kwargs
+
+
+def _judge_cache_key(evaluator_prompt: str, model: Optional[str], correction: Optional[Tuple[str, str]]) -> str:
+    provider, model_name = resolve_llm_provider(model)
+    return make_cache_key("judge", provider, model_name, evaluator_prompt, *(correction or ()))
+
+
+def _invoke_judge(evaluator_prompt: str, model: Optional[str] = None, label: str = "Judge",
+                  correction: Optional[Tuple[str, str]] = None) -> Tuple[str, Optional[str]]:
+    """
+    Envia o prompt renderizado ao LLM-as-Judge e retorna o texto da resposta.
+
+    Com o cache ativo, a resposta é reaproveitada quando o mesmo prompt já foi
+    julgado pelo mesmo provider/modelo (o juiz roda com temperatura 0). A
+    resposta nova não é gravada aqui: só depois de validada (_remember_judge_response),
+    para que uma resposta truncada ou fora do schema não seja repetida até o TTL.
+    Erros transitórios são repetidos com backoff (e, se ativo, com hedging);
+    os contadores (e o uso de tokens/latência, na etapa "judge:<label>") ficam em `label`.
+    `correction` = (resposta inválida, erro) transforma a chamada no re-ask.
+
+    Returns:
+        (texto da resposta, chave a gravar no cache se ela for válida — None se
+        o cache está desligado ou a resposta veio dele)
+    """
+    cache = _judge_cache
+    key = None
+    if cache is not None:
+        key = _judge_cache_key(evaluator_prompt, model, correction)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, None
+
+    llm = get_evaluator_llm(model=model)
+    messages, call_kwargs = _judge_request(llm, evaluator_prompt, correction)
+
+    def call():
+        with concurrency_slot():
+            return llm.invoke(messages, **call_kwargs)
+
+    with track_llm_call(f"judge:{label}") as usage:
+        response = call_with_retry(call, _retry_policy, _judge_call_stats, label, hedge=_hedge_policy)
+        usage.add_response(response)
+    return response.content, key
+
+
+async def _ainvoke_judge(evaluator_prompt: str, model: Optional[str] = None, label: str = "Judge",
+                         correction: Optional[Tuple[str, str]] = None) -> Tuple[str, Optional[str]]:
+    """
+    Versão assíncrona de _invoke_judge (usa llm.ainvoke), com o mesmo cache.
+    """
+    cache = _judge_cache
+    key = None
+    if cache is not None:
+        key = _judge_cache_key(evaluator_prompt, model, correction)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, None
+
+    llm = get_evaluator_llm(model=model)
+    messages, call_kwargs = _judge_request(llm, evaluator_prompt, correction)
+
+    async def call():
+        async with aconcurrency_slot():
+            return await llm.ainvoke(messages, **call_kwargs)
+
+    with track_llm_call(f"judge:{label}") as usage:
+        response = await acall_with_retry(call, _retry_policy, _judge_call_stats, label, hedge=_hedge_policy)
+        usage.add_response(response)
+    return response.content, key
+
+
+def _remember_judge_response(key: Optional[str], response: str):
+    """Grava no cache uma resposta do juiz já validada (key=None: nada a gravar)."""
+    cache = _judge_cache
+    if cache is not None and key is not None:
+        cache.set(key, response)
+
+
+def _parse_score_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida o JSON do juiz (ScoreJudgment) e converte no resultado padrão {score, reasoning}.
+
+    Raises:
+        ValidationError: score ausente ou fora de [0, 1]
+    """
+    judgment = validate_judgment(ScoreJudgment, result)
+
+    return {
+        "score": round(judgment["score"], 4),
+        "reasoning": judgment["reasoning"]
+    }
+
+
+def _parse_f1_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida o JSON do juiz (F1Judgment) e converte no resultado do F1-Score.
+
+    Raises:
+        ValidationError: precision/recall ausentes ou fora de [0, 1]
+    """
+    judgment = validate_judgment(F1Judgment, result)
+    precision = judgment["precision"]
+    recall = judgment["recall"]
+
+    # Calcular F1-Score
+    if (precision + recall) > 0:
+        f1_score = 2 * (precision * recall) / (precision + recall)
+    else:
+        f1_score = 0.0
+
+    return {
+        "score": round(f1_score, 4),
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "reasoning": judgment["reasoning"]
+    }
+
+
+def _error_result(parser, error: Exception) -> Dict[str, Any]:
+    """Resultado com score 0.0 usado quando a avaliação falha."""
+    result = {"score": 0.0, "reasoning": f"Erro na avaliação: {describe_validation_error(error)}"}
+    if parser is _parse_f1_result:
+        result = {"score": 0.0, "precision": 0.0, "recall": 0.0, "reasoning": result["reasoning"]}
+    return result
+
+
+def _parse_judge_json(response_text: str) -> Dict[str, Any]:
+    """
+    Extrai o objeto JSON da resposta do juiz.
+
+    Raises:
+        JsonExtractionError: se não houver JSON válido
+    """
+    parsed = extract_json(response_text)
+    if not parsed.ok:
+        raise JsonExtractionError(parsed)
+    return parsed.data
+
+
+def _validated(response: str, validate, label: str, final: bool, cache_key: Optional[str] = None):
+    """
+    Aplica `validate` (JSON -> resultado) à resposta do juiz.
+
+    Respostas inválidas (sem JSON ou fora do schema) levantam ValueError e são
+    contadas em invalid_responses; na última tentativa, também em parse_failures.
+    Só respostas válidas são gravadas no cache (em `cache_key`).
+    """
+    try:
+        with track_stage("parse"):
+            result = validate(_parse_judge_json(response))
+    except ValueError:
+        _judge_call_stats.record(label, "invalid_responses")
+        if final:
+            _judge_call_stats.record(label, "parse_failures")
+        raise
+    _remember_judge_response(cache_key, response)
+    return result
+
+
+def _judge_with_reask(evaluator_prompt: str, model: Optional[str], label: str, validate):
+    """
+    Chama o juiz e valida a resposta; se for inválida, reenvia a pergunta uma
+    única vez (re-ask) com a resposta anterior e o erro de validação.
+    """
+    response, key = _invoke_judge(evaluator_prompt, model, label)
+    try:
+        return _validated(response, validate, label, final=not _reask, cache_key=key)
+    except ValueError as e:
+        if not _reask:
+            raise
+        correction = (response, describe_validation_error(e))
+    _judge_call_stats.record(label, "reasks")
+    response, key = _invoke_judge(evaluator_prompt, model, label, correction=correction)
+    return _validated(response, validate, label, final=True, cache_key=key)
+
+
+async def _ajudge_with_reask(evaluator_prompt: str, model: Optional[str], label: str, validate):
+    """
+    Versão assíncrona de _judge_with_reask.
+    """
+    response, key = await _ainvoke_judge(evaluator_prompt, model, label)
+    try:
+        return _validated(response, validate, label, final=not _reask, cache_key=key)
+    except ValueError as e:
+        if not _reask:
+            raise
+        correction = (response, describe_validation_error(e))
+    _judge_call_stats.record(label, "reasks")
+    response, key = await _ainvoke_judge(evaluator_prompt, model, label, correction=correction)
+    return _validated(response, validate, label, final=True, cache_key=key)
+
+
+def _run_judge(evaluator_prompt: str, model: Optional[str], parser, label: str) -> Dict[str, Any]:
+    """
+    Executa uma métrica: chama o juiz, extrai o JSON e valida/converte com `parser`.
+    Só falhas definitivas (após os retries) e respostas que continuam inválidas
+    após o re-ask chegam ao except: retorna score 0.0 com o motivo no reasoning.
+    """
+    try:
+        return _judge_with_reask(evaluator_prompt, model, label, parser)
+
+    except Exception as e:
+        print(f"❌ Erro ao avaliar {label}: {describe_validation_error(e)}")
+        return _error_result(parser, e)
+
+
+async def _arun_judge(evaluator_prompt: str, model: Optional[str], parser, label: str) -> Dict[str, Any]:
+    """
+    Versão assíncrona de _run_judge.
+    """
+    try:
+        return await _ajudge_with_reask(evaluator_prompt, model, label, parser)
+
+    except Exception as e:
+        print(f"❌ Erro ao avaliar {label}: {describe_validation_error(e)}")
+        return _error_result(parser, e)
+
+
+F1_SCORE_PROMPT = """
+Você é um avaliador especializado em medir a qualidade de respostas geradas por IA.
+
+Sua tarefa é calcular PRECISION e RECALL para determinar o F1-Score.
 
 INSTRUÇÕES:
 
@@ -152,48 +435,25 @@ IMPORTANTE: Retorne APENAS um objeto JSON válido no formato:
 }}
 
 NÃO adicione nenhum texto antes ou depois do JSON.
-"""
-
-    try:
-        llm = get_evaluator_llm(model=model)
-        response = llm.invoke([HumanMessage(content=evaluator_prompt)])
-        result = extract_json_from_response(response.content)
 
-        precision = float(result.get("precision", 0.0))
-        recall = float(result.get("recall", 0.0))
+DADOS PARA AVALIAÇÃO:
 
-        # Calcular F1-Score
-        if (precision + recall) > 0:
-            f1_score = 2 * (precision * recall) / (precision + recall)
-        else:
-            f1_score = 0.0
+PERGUNTA DO USUÁRIO:
+{question}
 
-        return {
-            "score": round(f1_score, 4),
-            "precision": round(precision, 4),
-            "recall": round(recall, 4),
-            "reasoning": result.get("reasoning", "")
-        }
+RESPOSTA ESPERADA (Ground Truth):
+{reference}
 
-    except Exception as e:
-        print(f"❌ Erro ao avaliar F1-Score: {e}")
-        return {
-            "score": 0.0,
-            "precision": 0.0,
-            "recall": 0.0,
-            "reasoning": f"Erro na avaliação: {str(e)}"
-        }
+RESPOSTA GERADA PELO MODELO:
+{answer}
+"""
 
 
-def evaluate_clarity(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+def evaluate_f1_score(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
     """
-    Avalia a clareza e estrutura da resposta usando LLM-as-Judge.
+    Calcula F1-Score usando LLM-as-Judge.
 
-    Critérios:
-    - Organização e estrutura clara
-    - Linguagem simples e direta
-    - Ausência de ambiguidade
-    - Fácil de entender
+    F1-Score = 2 * (Precision * Recall) / (Precision + Recall)
 
     Args:
         question: Pergunta feita pelo usuário
@@ -204,21 +464,26 @@ def evaluate_clarity(question: str, answer: str, reference: str, model: Optional
     Returns:
         Dict com score e reasoning:
         {
-            "score": 0.92,
+            "score": 0.95,
+            "precision": 0.9,
+            "recall": 0.99,
             "reasoning": "Explicação do LLM..."
         }
     """
-    evaluator_prompt = f"""
-Você é um avaliador especializado em medir a CLAREZA de respostas geradas por IA.
+    evaluator_prompt = F1_SCORE_PROMPT.format(question=question, answer=answer, reference=reference)
+    return _run_judge(evaluator_prompt, model, _parse_f1_result, "F1-Score")
 
-PERGUNTA DO USUÁRIO:
-{question}
 
-RESPOSTA GERADA PELO MODELO:
-{answer}
+async def aevaluate_f1_score(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Versão assíncrona de evaluate_f1_score (usa ainvoke).
+    """
+    evaluator_prompt = F1_SCORE_PROMPT.format(question=question, answer=answer, reference=reference)
+    return await _arun_judge(evaluator_prompt, model, _parse_f1_result, "F1-Score")
 
-RESPOSTA ESPERADA (Referência):
-{reference}
+
+CLARITY_PROMPT = """
+Você é um avaliador especializado em medir a CLAREZA de respostas geradas por IA.
 
 INSTRUÇÕES:
 
@@ -250,36 +515,29 @@ IMPORTANTE: Retorne APENAS um objeto JSON válido no formato:
 }}
 
 NÃO adicione nenhum texto antes ou depois do JSON.
-"""
 
-    try:
-        llm = get_evaluator_llm(model=model)
-        response = llm.invoke([HumanMessage(content=evaluator_prompt)])
-        result = extract_json_from_response(response.content)
+DADOS PARA AVALIAÇÃO:
 
-        score = float(result.get("score", 0.0))
+PERGUNTA DO USUÁRIO:
+{question}
 
-        return {
-            "score": round(score, 4),
-            "reasoning": result.get("reasoning", "")
-        }
+RESPOSTA GERADA PELO MODELO:
+{answer}
 
-    except Exception as e:
-        print(f"❌ Erro ao avaliar Clarity: {e}")
-        return {
-            "score": 0.0,
-            "reasoning": f"Erro na avaliação: {str(e)}"
-        }
+RESPOSTA ESPERADA (Referência):
+{reference}
+"""
 
 
-def evaluate_precision(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+def evaluate_clarity(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
     """
-    Avalia a precisão da resposta usando LLM-as-Judge.
+    Avalia a clareza e estrutura da resposta usando LLM-as-Judge.
 
     Critérios:
-    - Ausência de informações inventadas (alucinações)
-    - Resposta focada na pergunta
-    - Informações corretas e verificáveis
+    - Organização e estrutura clara
+    - Linguagem simples e direta
+    - Ausência de ambiguidade
+    - Fácil de entender
 
     Args:
         question: Pergunta feita pelo usuário
@@ -290,22 +548,24 @@ def evaluate_precision(question: str, answer: str, reference: str, model: Option
     Returns:
         Dict com score e reasoning:
         {
-            "score": 0.98,
+            "score": 0.92,
             "reasoning": "Explicação do LLM..."
         }
     """
-    
-    evaluator_prompt = f"""
-Você é um avaliador especializado em detectar PRECISÃO e ALUCINAÇÕES em respostas de IA.
+    evaluator_prompt = CLARITY_PROMPT.format(question=question, answer=answer, reference=reference)
+    return _run_judge(evaluator_prompt, model, _parse_score_result, "Clarity")
 
-PERGUNTA DO USUÁRIO:
-{question}
 
-RESPOSTA GERADA PELO MODELO:
-{answer}
+async def aevaluate_clarity(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Versão assíncrona de evaluate_clarity (usa ainvoke).
+    """
+    evaluator_prompt = CLARITY_PROMPT.format(question=question, answer=answer, reference=reference)
+    return await _arun_judge(evaluator_prompt, model, _parse_score_result, "Clarity")
 
-RESPOSTA ESPERADA (Ground Truth):
-{reference}
+
+PRECISION_PROMPT = """
+Você é um avaliador especializado em detectar PRECISÃO e ALUCINAÇÕES em respostas de IA.
 
 INSTRUÇÕES:
 
@@ -338,58 +598,56 @@ IMPORTANTE: Retorne APENAS um objeto JSON válido no formato:
 }}
 
 NÃO adicione nenhum texto antes ou depois do JSON.
-"""
 
-    try:
-        llm = get_evaluator_llm(model=model)
-        response = llm.invoke([HumanMessage(content=evaluator_prompt)])
-        result = extract_json_from_response(response.content)
+DADOS PARA AVALIAÇÃO:
 
-        score = float(result.get("score", 0.0))
+PERGUNTA DO USUÁRIO:
+{question}
 
-        return {
-            "score": round(score, 4),
-            "reasoning": result.get("reasoning", "")
-        }
+RESPOSTA GERADA PELO MODELO:
+{answer}
 
-    except Exception as e:
-        print(f"❌ Erro ao avaliar Precision: {e}")
-        return {
-            "score": 0.0,
-            "reasoning": f"Erro na avaliação: {str(e)}"
-        }
+RESPOSTA ESPERADA (Ground Truth):
+{reference}
+"""
 
 
-def evaluate_tone_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+def evaluate_precision(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
     """
-    Avalia o tom da user story (profissional e empático).
+    Avalia a precisão da resposta usando LLM-as-Judge.
 
-    Critérios específicos para Bug to User Story:
-    - Tom profissional mas não excessivamente técnico
-    - Empatia com o usuário afetado pelo bug
-    - Foco em valor de negócio, não apenas correção técnica
-    - Linguagem positiva (o que o usuário QUER fazer, não só o que não funciona)
+    Critérios:
+    - Ausência de informações inventadas (alucinações)
+    - Resposta focada na pergunta
+    - Informações corretas e verificáveis
 
     Args:
-        bug_report: Descrição do bug original
-        user_story: User story gerada pelo prompt
-        reference: User story esperada (ground truth)
+        question: Pergunta feita pelo usuário
+        answer: Resposta gerada pelo prompt
+        reference: Resposta esperada (ground truth)
         model: Modelo LLM a ser usado (opcional)
 
     Returns:
-        Dict com score e reasoning
+        Dict com score e reasoning:
+        {
+            "score": 0.98,
+            "reasoning": "Explicação do LLM..."
+        }
     """
-    evaluator_prompt = f"""
-Você é um avaliador especializado em User Stories ágeis.
+    evaluator_prompt = PRECISION_PROMPT.format(question=question, answer=answer, reference=reference)
+    return _run_judge(evaluator_prompt, model, _parse_score_result, "Precision")
 
-BUG REPORT ORIGINAL:
-{bug_report}
 
-USER STORY GERADA:
-{user_story}
+async def aevaluate_precision(question: str, answer: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Versão assíncrona de evaluate_precision (usa ainvoke).
+    """
+    evaluator_prompt = PRECISION_PROMPT.format(question=question, answer=answer, reference=reference)
+    return await _arun_judge(evaluator_prompt, model, _parse_score_result, "Precision")
 
-USER STORY ESPERADA (Referência):
-{reference}
+
+TONE_PROMPT = """
+Você é um avaliador especializado em User Stories ágeis.
 
 INSTRUÇÕES:
 
@@ -424,38 +682,29 @@ IMPORTANTE: Retorne APENAS um objeto JSON válido no formato:
 }}
 
 NÃO adicione nenhum texto antes ou depois do JSON.
-"""
 
-    try:
-        llm = get_evaluator_llm(model=model)
-        response = llm.invoke([HumanMessage(content=evaluator_prompt)])
-        result = extract_json_from_response(response.content)
+DADOS PARA AVALIAÇÃO:
 
-        score = float(result.get("score", 0.0))
+BUG REPORT ORIGINAL:
+{bug_report}
 
-        return {
-            "score": round(score, 4),
-            "reasoning": result.get("reasoning", "")
-        }
+USER STORY GERADA:
+{user_story}
 
-    except Exception as e:
-        print(f"❌ Erro ao avaliar Tone Score: {e}")
-        return {
-            "score": 0.0,
-            "reasoning": f"Erro na avaliação: {str(e)}"
-        }
+USER STORY ESPERADA (Referência):
+{reference}
+"""
 
 
-def evaluate_acceptance_criteria_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+def evaluate_tone_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
     """
-    Avalia a qualidade dos critérios de aceitação.
+    Avalia o tom da user story (profissional e empático).
 
-    Critérios específicos:
-    - Usa formato Given-When-Then ou similar estruturado
-    - Critérios são específicos e testáveis
-    - Quantidade adequada (3-7 critérios idealmente)
-    - Cobertura completa do bug e solução
-    - Incluem cenários de edge case quando relevante
+    Critérios específicos para Bug to User Story:
+    - Tom profissional mas não excessivamente técnico
+    - Empatia com o usuário afetado pelo bug
+    - Foco em valor de negócio, não apenas correção técnica
+    - Linguagem positiva (o que o usuário QUER fazer, não só o que não funciona)
 
     Args:
         bug_report: Descrição do bug original
@@ -466,17 +715,20 @@ def evaluate_acceptance_criteria_score(bug_report: str, user_story: str, referen
     Returns:
         Dict com score e reasoning
     """
-    evaluator_prompt = f"""
-Você é um avaliador especializado em Critérios de Aceitação de User Stories.
+    evaluator_prompt = TONE_PROMPT.format(bug_report=bug_report, user_story=user_story, reference=reference)
+    return _run_judge(evaluator_prompt, model, _parse_score_result, "Tone Score")
 
-BUG REPORT ORIGINAL:
-{bug_report}
 
-USER STORY GERADA:
-{user_story}
+async def aevaluate_tone_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Versão assíncrona de evaluate_tone_score (usa ainvoke).
+    """
+    evaluator_prompt = TONE_PROMPT.format(bug_report=bug_report, user_story=user_story, reference=reference)
+    return await _arun_judge(evaluator_prompt, model, _parse_score_result, "Tone Score")
 
-USER STORY ESPERADA (Referência):
-{reference}
+
+ACCEPTANCE_CRITERIA_PROMPT = """
+Você é um avaliador especializado em Critérios de Aceitação de User Stories.
 
 INSTRUÇÕES:
 
@@ -513,37 +765,30 @@ IMPORTANTE: Retorne APENAS um objeto JSON válido no formato:
 }}
 
 NÃO adicione nenhum texto antes ou depois do JSON.
-"""
 
-    try:
-        llm = get_evaluator_llm(model=model)
-        response = llm.invoke([HumanMessage(content=evaluator_prompt)])
-        result = extract_json_from_response(response.content)
+DADOS PARA AVALIAÇÃO:
 
-        score = float(result.get("score", 0.0))
+BUG REPORT ORIGINAL:
+{bug_report}
 
-        return {
-            "score": round(score, 4),
-            "reasoning": result.get("reasoning", "")
-        }
+USER STORY GERADA:
+{user_story}
 
-    except Exception as e:
-        print(f"❌ Erro ao avaliar Acceptance Criteria Score: {e}")
-        return {
-            "score": 0.0,
-            "reasoning": f"Erro na avaliação: {str(e)}"
-        }
+USER STORY ESPERADA (Referência):
+{reference}
+"""
 
 
-def evaluate_user_story_format_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+def evaluate_acceptance_criteria_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
     """
-    Avalia se a user story segue o formato padrão correto.
+    Avalia a qualidade dos critérios de aceitação.
 
-    Formato esperado:
-    - "Como um [tipo de usuário]"
-    - "Eu quero [ação/funcionalidade]"
-    - "Para que [benefício/valor]"
-    - Critérios de Aceitação claramente separados
+    Critérios específicos:
+    - Usa formato Given-When-Then ou similar estruturado
+    - Critérios são específicos e testáveis
+    - Quantidade adequada (3-7 critérios idealmente)
+    - Cobertura completa do bug e solução
+    - Incluem cenários de edge case quando relevante
 
     Args:
         bug_report: Descrição do bug original
@@ -554,17 +799,20 @@ def evaluate_user_story_format_score(bug_report: str, user_story: str, reference
     Returns:
         Dict com score e reasoning
     """
-    evaluator_prompt = f"""
-Você é um avaliador especializado em formato de User Stories ágeis.
+    evaluator_prompt = ACCEPTANCE_CRITERIA_PROMPT.format(bug_report=bug_report, user_story=user_story, reference=reference)
+    return _run_judge(evaluator_prompt, model, _parse_score_result, "Acceptance Criteria Score")
 
-BUG REPORT ORIGINAL:
-{bug_report}
 
-USER STORY GERADA:
-{user_story}
+async def aevaluate_acceptance_criteria_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Versão assíncrona de evaluate_acceptance_criteria_score (usa ainvoke).
+    """
+    evaluator_prompt = ACCEPTANCE_CRITERIA_PROMPT.format(bug_report=bug_report, user_story=user_story, reference=reference)
+    return await _arun_judge(evaluator_prompt, model, _parse_score_result, "Acceptance Criteria Score")
 
-USER STORY ESPERADA (Referência):
-{reference}
+
+USER_STORY_FORMAT_PROMPT = """
+Você é um avaliador especializado em formato de User Stories ágeis.
 
 INSTRUÇÕES:
 
@@ -604,36 +852,29 @@ IMPORTANTE: Retorne APENAS um objeto JSON válido no formato:
 }}
 
 NÃO adicione nenhum texto antes ou depois do JSON.
-"""
 
-    try:
-        llm = get_evaluator_llm(model=model)
-        response = llm.invoke([HumanMessage(content=evaluator_prompt)])
-        result = extract_json_from_response(response.content)
+DADOS PARA AVALIAÇÃO:
 
-        score = float(result.get("score", 0.0))
+BUG REPORT ORIGINAL:
+{bug_report}
 
-        return {
-            "score": round(score, 4),
-            "reasoning": result.get("reasoning", "")
-        }
+USER STORY GERADA:
+{user_story}
 
-    except Exception as e:
-        print(f"❌ Erro ao avaliar User Story Format Score: {e}")
-        return {
-            "score": 0.0,
-            "reasoning": f"Erro na avaliação: {str(e)}"
-        }
+USER STORY ESPERADA (Referência):
+{reference}
+"""
 
 
-def evaluate_completeness_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+def evaluate_user_story_format_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
     """
-    Avalia a completude da user story em relação ao bug.
+    Avalia se a user story segue o formato padrão correto.
 
-    Critérios específicos baseados na complexidade do bug:
-    - Bugs simples: cobre o problema básico
-    - Bugs médios: inclui contexto técnico relevante
-    - Bugs complexos: aborda múltiplos aspectos, impacto, tasks técnicas
+    Formato esperado:
+    - "Como um [tipo de usuário]"
+    - "Eu quero [ação/funcionalidade]"
+    - "Para que [benefício/valor]"
+    - Critérios de Aceitação claramente separados
 
     Args:
         bug_report: Descrição do bug original
@@ -644,17 +885,20 @@ def evaluate_completeness_score(bug_report: str, user_story: str, reference: str
     Returns:
         Dict com score e reasoning
     """
-    evaluator_prompt = f"""
-Você é um avaliador especializado em completude de User Stories derivadas de bugs.
+    evaluator_prompt = USER_STORY_FORMAT_PROMPT.format(bug_report=bug_report, user_story=user_story, reference=reference)
+    return _run_judge(evaluator_prompt, model, _parse_score_result, "User Story Format Score")
 
-BUG REPORT ORIGINAL:
-{bug_report}
 
-USER STORY GERADA:
-{user_story}
+async def aevaluate_user_story_format_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Versão assíncrona de evaluate_user_story_format_score (usa ainvoke).
+    """
+    evaluator_prompt = USER_STORY_FORMAT_PROMPT.format(bug_report=bug_report, user_story=user_story, reference=reference)
+    return await _arun_judge(evaluator_prompt, model, _parse_score_result, "User Story Format Score")
 
-USER STORY ESPERADA (Referência):
-{reference}
+
+COMPLETENESS_PROMPT = """
+Você é um avaliador especializado em completude de User Stories derivadas de bugs.
 
 INSTRUÇÕES:
 
@@ -705,23 +949,262 @@ Retorne APENAS um objeto JSON válido no formato:
 }}
 
 NÃO adicione nenhum texto antes ou depois do JSON.
+
+DADOS PARA AVALIAÇÃO:
+
+BUG REPORT ORIGINAL:
+{bug_report}
+
+USER STORY GERADA:
+{user_story}
+
+USER STORY ESPERADA (Referência):
+{reference}
 """
 
+
+def evaluate_completeness_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Avalia a completude da user story em relação ao bug.
+
+    Critérios específicos baseados na complexidade do bug:
+    - Bugs simples: cobre o problema básico
+    - Bugs médios: inclui contexto técnico relevante
+    - Bugs complexos: aborda múltiplos aspectos, impacto, tasks técnicas
+
+    Args:
+        bug_report: Descrição do bug original
+        user_story: User story gerada pelo prompt
+        reference: User story esperada (ground truth)
+        model: Modelo LLM a ser usado (opcional)
+
+    Returns:
+        Dict com score e reasoning
+    """
+    evaluator_prompt = COMPLETENESS_PROMPT.format(bug_report=bug_report, user_story=user_story, reference=reference)
+    return _run_judge(evaluator_prompt, model, _parse_score_result, "Completeness Score")
+
+
+async def aevaluate_completeness_score(bug_report: str, user_story: str, reference: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Versão assíncrona de evaluate_completeness_score (usa ainvoke).
+    """
+    evaluator_prompt = COMPLETENESS_PROMPT.format(bug_report=bug_report, user_story=user_story, reference=reference)
+    return await _arun_judge(evaluator_prompt, model, _parse_score_result, "Completeness Score")
+
+
+# Critérios resumidos de cada métrica para o modo "fused" (uma única chamada
+# ao juiz avaliando várias métricas). Os nomes seguem as chaves usadas no
+# GlobalEvaluator para que os resultados no LangSmith não mudem.
+FUSED_METRIC_CRITERIA = {
+    "tone": """TONE (score 0.0 a 1.0) — média de:
+   - PROFISSIONALISMO: linguagem profissional, adequada a documentação ágil
+   - EMPATIA COM USUÁRIO: compreende o impacto do bug e foca na necessidade do usuário
+   - FOCO EM VALOR: articula o valor de negócio, não apenas "consertar o bug"
+   - LINGUAGEM POSITIVA: tom construtivo, orientado a solução""",
+    "acceptance_criteria": """ACCEPTANCE_CRITERIA (score 0.0 a 1.0) — média de:
+   - FORMATO ESTRUTURADO: Given-When-Then (Dado/Quando/Então) ou similar, critérios separados
+   - ESPECIFICIDADE E TESTABILIDADE: critérios mensuráveis, sem termos vagos
+   - QUANTIDADE ADEQUADA: idealmente 3-7 critérios para bugs simples/médios
+   - COBERTURA COMPLETA: sucesso, erro e edge cases relevantes do bug""",
+    "user_story_format": """USER_STORY_FORMAT (score 0.0 a 1.0) — média de:
+   - TEMPLATE PADRÃO: "Como um [usuário], eu quero [ação], para que [benefício]"
+   - IDENTIFICAÇÃO DE PERSONA: persona específica e relevante (não só "usuário")
+   - AÇÃO CLARA: ação específica e relacionada ao bug
+   - BENEFÍCIO ARTICULADO: benefício real conectado ao valor de negócio
+   - SEPARAÇÃO DE SEÇÕES: critérios de aceitação em seção própria""",
+    "completeness": """COMPLETENESS (score 0.0 a 1.0) — média de:
+   - COBERTURA DO PROBLEMA: todos os aspectos do bug são abordados
+   - CONTEXTO TÉCNICO: preserva logs, endpoints e dados técnicos relevantes
+   - IMPACTO E SEVERIDADE: documenta impacto quando o bug o menciona
+   - TASKS TÉCNICAS: breakdown apenas para bugs complexos (não penalizar em bugs simples)
+   - INFORMAÇÕES ADICIONAIS: steps to reproduce, ambiente e contexto de negócio
+   Bugs SIMPLES podem ter score alto sem muitos detalhes; compare com a referência.""",
+    "f1_score": """F1_SCORE (retorne precision e recall, NÃO retorne score):
+   - PRECISION (0.0 a 1.0): fração das informações geradas que são CORRETAS e RELEVANTES
+   - RECALL (0.0 a 1.0): fração das informações da referência PRESENTES na resposta gerada""",
+}
+
+
+def _fused_output_format(metrics: list) -> str:
+    """Monta o exemplo de JSON esperado para as métricas selecionadas."""
+    entries = []
+    for name in metrics:
+        if name == "f1_score":
+            entries.append(f'  "{name}": {{"precision": <0.0 a 1.0>, "recall": <0.0 a 1.0>, "reasoning": "<1 frase>"}}')
+        else:
+            entries.append(f'  "{name}": {{"score": <0.0 a 1.0>, "reasoning": "<1 frase>"}}')
+    return "{\n" + ",\n".join(entries) + "\n}"
+
+
+def _parse_fused_entry(name: str, entry: Any) -> Optional[Dict[str, Any]]:
+    """
+    Converte a entrada de uma métrica da resposta fused no mesmo formato
+    retornado pela função individual. Retorna None se algum campo faltar.
+    """
+    if not isinstance(entry, dict):
+        return None
     try:
-        llm = get_evaluator_llm(model=model)
-        response = llm.invoke([HumanMessage(content=evaluator_prompt)])
-        result = extract_json_from_response(response.content)
+        # Mesmos schemas (e o mesmo cálculo do F1) das métricas individuais
+        return _parse_f1_result(entry) if name == "f1_score" else _parse_score_result(entry)
+    except ValueError:
+        return None
 
-        score = float(result.get("score", 0.0))
 
-        return {
-            "score": round(score, 4),
-            "reasoning": result.get("reasoning", "")
-        }
+def _build_fused_prompt(bug_report: str, user_story: str, reference: str, metrics: list) -> str:
+    """Monta o prompt do juiz fused para as métricas selecionadas."""
+    unknown = [m for m in metrics if m not in FUSED_METRIC_CRITERIA]
+    if unknown:
+        raise ValueError(f"Métricas sem suporte ao modo fused: {unknown}")
+
+    criteria = "\n\n".join(f"{i}. {FUSED_METRIC_CRITERIA[m]}" for i, m in enumerate(metrics, 1))
+
+    return f"""
+Você é um avaliador especializado em User Stories ágeis derivadas de bugs.
+
+INSTRUÇÕES:
+
+Avalie a user story gerada em CADA uma das métricas abaixo, de forma independente:
+
+{criteria}
+
+IMPORTANTE: Retorne APENAS um objeto JSON válido no formato:
+{_fused_output_format(metrics)}
 
+NÃO adicione nenhum texto antes ou depois do JSON.
+
+{PAYLOAD_MARKER}
+
+BUG REPORT ORIGINAL:
+{bug_report}
+
+USER STORY GERADA:
+{user_story}
+
+USER STORY ESPERADA (Referência):
+{reference}
+"""
+
+
+def _parse_fused_result(result: Dict[str, Any], metrics: list) -> Dict[str, Dict[str, Any]]:
+    """Mantém apenas as métricas com todos os campos válidos na resposta fused."""
+    parsed = {}
+    for name in metrics:
+        entry = _parse_fused_entry(name, result.get(name))
+        if entry is not None:
+            parsed[name] = entry
+    return parsed
+
+
+def _fused_validator(metrics: list, partial: Dict[str, Dict[str, Any]]):
+    """
+    Validador da resposta fused: acumula em `partial` as métricas válidas de
+    cada tentativa e levanta ValueError (o que dispara o re-ask) enquanto faltar alguma.
+    """
+    def validate(result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        partial.update(_parse_fused_result(result, metrics))
+        missing = [name for name in metrics if name not in partial]
+        if missing:
+            raise ValueError(f"métricas ausentes ou fora do schema: {', '.join(missing)}")
+        return partial
+    return validate
+
+
+def evaluate_fused_scores(bug_report: str, user_story: str, reference: str, metrics: list,
+                          model: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Avalia várias métricas em UMA única chamada ao LLM-as-Judge.
+
+    O bug report, a user story gerada e a referência são enviados uma vez só,
+    seguidos dos critérios de cada métrica selecionada.
+
+    Args:
+        bug_report: Descrição do bug original
+        user_story: User story gerada pelo prompt
+        reference: User story esperada (ground truth)
+        metrics: Nomes das métricas (chaves de FUSED_METRIC_CRITERIA)
+        model: Modelo LLM a ser usado (opcional)
+
+    Returns:
+        Dict {métrica: resultado} no mesmo formato das funções individuais.
+        Métricas ausentes ou inválidas na resposta (mesmo após o re-ask) NÃO
+        aparecem no dict, para que o chamador faça fallback para a função individual.
+    """
+    evaluator_prompt = _build_fused_prompt(bug_report, user_story, reference, metrics)
+    partial: Dict[str, Dict[str, Any]] = {}
+
+    try:
+        return _judge_with_reask(evaluator_prompt, model, "Fused", _fused_validator(metrics, partial))
     except Exception as e:
-        print(f"❌ Erro ao avaliar Completeness Score: {e}")
-        return {
-            "score": 0.0,
-            "reasoning": f"Erro na avaliação: {str(e)}"
-        }
+        print(f"❌ Erro ao avaliar métricas (fused): {describe_validation_error(e)}")
+        return partial
+
+
+async def aevaluate_fused_scores(bug_report: str, user_story: str, reference: str, metrics: list,
+                                 model: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Versão assíncrona de evaluate_fused_scores (usa ainvoke).
+    """
+    evaluator_prompt = _build_fused_prompt(bug_report, user_story, reference, metrics)
+    partial: Dict[str, Dict[str, Any]] = {}
+
+    try:
+        return await _ajudge_with_reask(evaluator_prompt, model, "Fused", _fused_validator(metrics, partial))
+    except Exception as e:
+        print(f"❌ Erro ao avaliar métricas (fused): {describe_validation_error(e)}")
+        return partial
+
+
+# --- Modo batch (--batch): prompts montados sem chamar o juiz, respostas validadas ao fim do job ---
+
+# Métricas do GlobalEvaluator: (template, parser, label) — os mesmos das funções evaluate_*
+BATCH_JUDGE_METRICS = {
+    "tone": (TONE_PROMPT, _parse_score_result, "Tone Score"),
+    "acceptance_criteria": (ACCEPTANCE_CRITERIA_PROMPT, _parse_score_result, "Acceptance Criteria Score"),
+    "user_story_format": (USER_STORY_FORMAT_PROMPT, _parse_score_result, "User Story Format Score"),
+    "completeness": (COMPLETENESS_PROMPT, _parse_score_result, "Completeness Score"),
+    "f1_score": (F1_SCORE_PROMPT, _parse_f1_result, "F1-Score"),
+}
+
+
+def batch_judge_messages(metric: str, bug_report: str, user_story: str, reference: str,
+                         correction: Optional[Tuple[str, str]] = None) -> List[BaseMessage]:
+    """
+    Mensagens da requisição ao juiz de uma métrica (com a correção do re-ask, se houver).
+
+    O F1-Score usa question/answer; as demais métricas, bug_report/user_story.
+    """
+    template = BATCH_JUDGE_METRICS[metric][0]
+    evaluator_prompt = template.format(question=bug_report, answer=user_story, bug_report=bug_report,
+                                       user_story=user_story, reference=reference)
+    return _judge_messages(evaluator_prompt, correction)
+
+
+def parse_batch_judgment(metric: str, response: Optional[str], error: Optional[str] = None,
+                         reasked: bool = False) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """
+    Valida a resposta do juiz vinda do job batch (contada como no caminho interativo).
+
+    Args:
+        metric: Chave de BATCH_JUDGE_METRICS
+        response: Conteúdo da resposta (None se a requisição falhou)
+        error: Erro da requisição no job, se houver
+        reasked: Se a resposta já é a do re-ask
+
+    Returns:
+        (resultado, None) se válida; (None, correção) se inválida e cabe um re-ask
+        (a correção vai para batch_judge_messages na próxima rodada); ou
+        (resultado com score 0.0, None) se falhou ou continua inválida
+    """
+    _, parser, label = BATCH_JUDGE_METRICS[metric]
+    _judge_call_stats.record(label, "calls")
+    if error is not None:
+        _judge_call_stats.record(label, "failures")
+        return _error_result(parser, RuntimeError(error)), None
+    try:
+        return _validated(response or "", parser, label, final=reasked or not _reask), None
+    except ValueError as e:
+        if reasked or not _reask:
+            return _error_result(parser, e), None
+        _judge_call_stats.record(label, "reasks")
+        return None, (response or "", describe_validation_error(e))
@@ -0,0 +1,170 @@
+"""
+Normalização da saída do gerador antes dos juízes.
+
+Substitui o "Smart Parsing" inline de evaluate.py: remove o raciocínio
+(Chain of Thought) e o texto ao redor da user story, com uma estratégia
+por formato de saída:
+
+- xml_tag:         conteúdo de <user_story>...</user_story> (a tag de
+                   fechamento é opcional: a stop sequence a remove)
+- markdown_header: tudo a partir do primeiro título markdown ("# " / "## ")
+- raw:             o texto como veio
+
+Cada prompt usa uma cadeia de estratégias (a primeira que reconhece a saída
+vence), registrada por versão de prompt com register_prompt_strategies (v1 e
+v2 registrados abaixo); sem registro vale DEFAULT_CHAIN, que reproduz o
+comportamento anterior. Os
+padrões são compilados uma vez, a saída pode chegar em pedaços (streaming) e
+o resultado de cada normalização é contado por estratégia, em vez de prints.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+OPEN_TAG = "<user_story>"
+CLOSE_TAG = "</user_story>"
+
+_XML_RE = re.compile(r"<user_story>(.*?)(?:</user_story>|$)", re.DOTALL)
+# Primeiro "# " ou "## " (o que vier antes): um "## Titulo" continua H2 para os juízes
+_HEADER_RE = re.compile(r"##? ")
+
+EMPTY = "empty"          # saída vazia/None
+UNMATCHED = "unmatched"  # nenhuma estratégia da cadeia reconheceu o texto (volta inalterado)
+
+
+@dataclass
+class NormalizedOutput:
+    """Saída normalizada e a estratégia que a produziu (ou EMPTY / UNMATCHED)."""
+    text: Optional[str]
+    strategy: str
+
+
+def _xml_tag(text: str) -> Optional[str]:
+    if OPEN_TAG not in text:
+        return None
+    match = _XML_RE.search(text)
+    return match.group(1).strip() if match else None
+
+
+def _markdown_header(text: str) -> Optional[str]:
+    match = _HEADER_RE.search(text)
+    return text[match.start():].strip() if match else None
+
+
+def _raw(text: str) -> Optional[str]:
+    return text
+
+
+# nome -> função (texto -> texto normalizado, ou None se o formato não se aplica)
+STRATEGIES = {
+    "xml_tag": _xml_tag,
+    "markdown_header": _markdown_header,
+    "raw": _raw,
+}
+
+DEFAULT_CHAIN: Tuple[str, ...] = ("xml_tag", "markdown_header", "raw")
+
+_prompt_strategies: Dict[str, Tuple[str, ...]] = {}
+
+
+def register_prompt_strategies(prompt_name: str, *strategies: str):
+    """
+    Registra a cadeia de estratégias de uma versão de prompt (ex: "bug_to_user_story_v3").
+
+    Raises:
+        ValueError: estratégia desconhecida
+    """
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown or not strategies:
+        raise ValueError(f"Estratégias de normalização inválidas: {unknown or 'nenhuma'}")
+    _prompt_strategies[prompt_name] = tuple(strategies)
+
+
+def strategies_for_prompt(prompt_name: Optional[str]) -> Tuple[str, ...]:
+    """Cadeia registrada para o prompt (DEFAULT_CHAIN se não houver registro)."""
+    return _prompt_strategies.get(prompt_name, DEFAULT_CHAIN)
+
+
+# v2 pede o título direto em markdown, mas modelos às vezes ainda envolvem a story em
+# <user_story>; o v1 (baseline) não pede tags, então só o título markdown é procurado
+register_prompt_strategies("bug_to_user_story_v2", "xml_tag", "markdown_header", "raw")
+register_prompt_strategies("bug_to_user_story_v1", "markdown_header", "raw")
+
+
+class OutputNormalizer:
+    """Aplica a cadeia de estratégias e conta os resultados (thread-safe)."""
+
+    def __init__(self, strategies: Sequence[str] = DEFAULT_CHAIN):
+        unknown = [name for name in strategies if name not in STRATEGIES]
+        if unknown:
+            raise ValueError(f"Estratégias de normalização desconhecidas: {unknown}")
+        self.strategies = tuple(strategies)
+        self._counts: Dict[str, int] = dict.fromkeys(self.strategies + (EMPTY, UNMATCHED), 0)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_prompt(cls, prompt_name: Optional[str]) -> "OutputNormalizer":
+        """Normalizer com a cadeia registrada para a versão do prompt."""
+        return cls(strategies_for_prompt(prompt_name))
+
+    def normalize(self, text: Optional[str]) -> NormalizedOutput:
+        """
+        Normaliza uma saída completa.
+
+        Returns:
+            NormalizedOutput; se nenhuma estratégia reconhecer o texto, ele volta inalterado
+        """
+        result = NormalizedOutput(text, EMPTY)
+        if text:
+            for name in self.strategies:
+                normalized = STRATEGIES[name](text)
+                if normalized is not None:
+                    result = NormalizedOutput(normalized, name)
+                    break
+            else:
+                result = NormalizedOutput(text, UNMATCHED)
+        with self._lock:
+            self._counts[result.strategy] += 1
+        return result
+
+    def stream(self) -> "NormalizerStream":
+        """Acumulador para uma geração em streaming (ver NormalizerStream)."""
+        return NormalizerStream(self)
+
+    def stats(self) -> Dict[str, int]:
+        """Contagem de saídas por estratégia que as normalizou (e EMPTY / UNMATCHED)."""
+        with self._lock:
+            return dict(self._counts)
+
+
+class NormalizerStream:
+    """
+    Recebe a saída em pedaços. feed() retorna True quando a user story está
+    completa (tag de fechamento recebida): o chamador pode encerrar o stream.
+    Só o trecho novo (mais a borda do anterior) é examinado a cada pedaço.
+    """
+
+    def __init__(self, normalizer: OutputNormalizer):
+        self.normalizer = normalizer
+        self._chunks: List[str] = []
+        self._tail = ""
+        self.complete = False
+
+    def feed(self, chunk: str) -> bool:
+        if self.complete or not chunk:
+            return self.complete
+        self._chunks.append(chunk)
+        window = self._tail + chunk
+        if "xml_tag" in self.normalizer.strategies and CLOSE_TAG in window:
+            self.complete = True
+        self._tail = window[-(len(CLOSE_TAG) - 1):]
+        return self.complete
+
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def finish(self) -> NormalizedOutput:
+        """Normaliza (e conta) a saída acumulada."""
+        return self.normalizer.normalize(self.text())
@@ -0,0 +1,150 @@
+"""
+Pré-checagem determinística (regras + regex) antes do LLM-as-Judge.
+
+Boa parte do que as métricas user_story_format e acceptance_criteria
+perguntam ao juiz é verificável mecanicamente: presença de
+"Como / Eu quero / Para que", cenários Dado/Quando/Então, cabeçalhos markdown.
+
+Quando a saída viola uma regra estrutural grave (ex: não tem o template de
+user story, ou não tem nenhum critério de aceite), a métrica é pontuada
+localmente e a chamada ao juiz é evitada. Nos demais casos a métrica segue
+para o juiz normalmente. A taxa de short-circuit é contabilizada por métrica.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Score máximo atribuído localmente: uma saída que falha uma regra grave nunca atinge a meta
+HARD_FAIL_MAX_SCORE = 0.5
+
+# Tamanho mínimo (caracteres) de uma user story minimamente completa
+MIN_STORY_LENGTH = 40
+
+# Faixa de cenários exigida pelo prompt v2
+MIN_SCENARIOS = 3
+MAX_SCENARIOS = 7
+
+_FLAGS = re.IGNORECASE | re.MULTILINE
+COMO_RE = re.compile(r"(?:^|[\s*_])como\b[\s*_]", _FLAGS)
+EU_QUERO_RE = re.compile(r"\beu\s+quero\b", _FLAGS)
+PARA_QUE_RE = re.compile(r"\bpara\s+que\b", _FLAGS)
+TITLE_RE = re.compile(r"^#\s+\S", _FLAGS)
+SECTION_RE = re.compile(r"^#{2,3}\s+\S", _FLAGS)
+CRITERIA_HEADER_RE = re.compile(r"^[#\s*_]*crit[eé]rios?\s+de\s+aceit", _FLAGS)
+SCENARIO_RE = re.compile(r"^#{2,4}\s*(?:\*\*)?cen[aá]rio\b", _FLAGS)
+DADO_RE = re.compile(r"^[\s>*-]*(?:\*\*)?dado\b", _FLAGS)
+QUANDO_RE = re.compile(r"^[\s>*-]*(?:\*\*)?quando\b", _FLAGS)
+ENTAO_RE = re.compile(r"^[\s>*-]*(?:\*\*)?ent[aã]o\b", _FLAGS)
+
+
+@dataclass
+class PrecheckResult:
+    """Resultado das regras de uma métrica para uma saída."""
+    metric: str
+    checks: Dict[str, bool]
+    hard_failures: List[str] = field(default_factory=list)
+
+    @property
+    def short_circuit(self) -> bool:
+        """True se a métrica deve ser pontuada localmente (sem juiz)."""
+        return bool(self.hard_failures)
+
+    def to_metric_result(self) -> Dict[str, Any]:
+        """Score local no formato das funções de métrica ({"score", "reasoning"})."""
+        passed = sum(self.checks.values())
+        score = round(min(HARD_FAIL_MAX_SCORE, passed / len(self.checks) * HARD_FAIL_MAX_SCORE), 2)
+        failed = [name for name, ok in self.checks.items() if not ok]
+        return {
+            "score": score,
+            "reasoning": f"Pré-checagem estrutural (sem juiz): {'; '.join(self.hard_failures)}. "
+                         f"Verificações que falharam: {', '.join(failed)}.",
+        }
+
+
+def check_user_story_format(story: str) -> PrecheckResult:
+    """Regras do template "Como / Eu quero / Para que" e dos cabeçalhos markdown."""
+    checks = {
+        "como": bool(COMO_RE.search(story)),
+        "eu_quero": bool(EU_QUERO_RE.search(story)),
+        "para_que": bool(PARA_QUE_RE.search(story)),
+        "titulo": bool(TITLE_RE.search(story)),
+        "secoes": bool(SECTION_RE.search(story)),
+    }
+    hard_failures = []
+    if len(story.strip()) < MIN_STORY_LENGTH:
+        hard_failures.append("saída curta demais para uma user story")
+    template_clauses = checks["como"] + checks["eu_quero"] + checks["para_que"]
+    if template_clauses < 2:
+        hard_failures.append(f"template Como/Eu quero/Para que ausente ({template_clauses}/3 cláusulas)")
+    return PrecheckResult("user_story_format", checks, hard_failures)
+
+
+def check_acceptance_criteria(story: str) -> PrecheckResult:
+    """Regras dos critérios de aceite: seção, cenários e passos Dado/Quando/Então."""
+    scenarios = len(SCENARIO_RE.findall(story))
+    steps = {
+        "dado": len(DADO_RE.findall(story)),
+        "quando": len(QUANDO_RE.findall(story)),
+        "entao": len(ENTAO_RE.findall(story)),
+    }
+    checks = {
+        "secao_criterios": bool(CRITERIA_HEADER_RE.search(story)),
+        "passos_gherkin": all(steps.values()),
+        "quantidade_cenarios": MIN_SCENARIOS <= scenarios <= MAX_SCENARIOS,
+    }
+    hard_failures = []
+    if len(story.strip()) < MIN_STORY_LENGTH:
+        hard_failures.append("saída curta demais para conter critérios de aceite")
+    if not checks["secao_criterios"] and not any(steps.values()):
+        hard_failures.append("nenhum critério de aceite (sem seção e sem Dado/Quando/Então)")
+    return PrecheckResult("acceptance_criteria", checks, hard_failures)
+
+
+PRECHECKS: Dict[str, Callable[[str], PrecheckResult]] = {
+    "user_story_format": check_user_story_format,
+    "acceptance_criteria": check_acceptance_criteria,
+}
+
+
+class Prechecker:
+    """
+    Aplica as pré-checagens e conta, por métrica, quantas saídas foram
+    verificadas e quantas dispensaram o juiz (thread-safe).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {m: {"checked": 0, "short_circuited": 0} for m in PRECHECKS}
+
+    def run(self, story: str, metrics: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Executa as regras das métricas pedidas.
+
+        Returns:
+            {métrica: resultado local} apenas para as métricas que dispensam o juiz
+        """
+        local_results = {}
+        for metric in metrics or list(PRECHECKS):
+            if metric not in PRECHECKS:
+                continue
+            result = PRECHECKS[metric](story)
+            with self._lock:
+                self._counts[metric]["checked"] += 1
+                if result.short_circuit:
+                    self._counts[metric]["short_circuited"] += 1
+            if result.short_circuit:
+                local_results[metric] = result.to_metric_result()
+        return local_results
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            {métrica: {checked, short_circuited, rate}}
+        """
+        with self._lock:
+            return {
+                metric: {**counts, "rate": counts["short_circuited"] / counts["checked"] if counts["checked"] else 0.0}
+                for metric, counts in self._counts.items()
+            }
@@ -0,0 +1,168 @@
+"""
+Modo de profiling da avaliação (--profile / --profile-cpu).
+
+Com --profile, as etapas quentes do pipeline viram spans de tempo gravados em
+um JSON no formato Chrome Trace (abre em chrome://tracing, Perfetto ou
+speedscope): carregar o prompt, montar a chain, gerar, cada chamada ao juiz,
+extrair o JSON, gravar o resultado e agregar. As esperas por slot de
+concorrência e pelo rate limiter também viram spans, então dá para ver, sob
+max_concurrency, se o tempo vai para o provider, para o limiter ou para a
+serialização.
+
+Cada thread (workers do runner local) e cada task asyncio (--async) ganha uma
+linha própria no trace. Com --profile-cpu, um cProfile roda em todas as
+threads e o resultado é salvo em .prof (abre com snakeviz ou pstats).
+"""
+
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+
+class TraceRecorder:
+    """Coleta spans como eventos "X" (complete) do formato Chrome Trace (thread-safe)."""
+
+    def __init__(self):
+        self._events: List[Dict[str, Any]] = []
+        self._lanes: Dict[Any, int] = {}
+        self._lane_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+        self.pid = os.getpid()
+
+    def _lane(self) -> int:
+        """Linha do trace: a task asyncio atual ou, fora do event loop, a thread atual."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        # O nome entra na chave: ident/id de uma thread ou task encerrada podem ser reaproveitados
+        key, name = (("task", id(task), task.get_name()), task.get_name()) if task is not None else \
+            (("thread", threading.get_ident(), threading.current_thread().name), threading.current_thread().name)
+        with self._lock:
+            if key not in self._lanes:
+                lane = len(self._lanes) + 1
+                self._lanes[key] = lane
+                self._lane_names[lane] = name
+            return self._lanes[key]
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any):
+        """Mede o bloco e grava um evento com nome, categoria e argumentos."""
+        lane = self._lane()
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end_ns = time.perf_counter_ns()
+            event = {"name": name, "cat": category, "ph": "X", "pid": self.pid, "tid": lane,
+                     "ts": (start_ns - self._origin_ns) / 1000, "dur": (end_ns - start_ns) / 1000}
+            if args:
+                event["args"] = args
+            with self._lock:
+                self._events.append(event)
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Eventos gravados, precedidos dos metadados com o nome de cada linha."""
+        with self._lock:
+            metadata = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": lane, "args": {"name": name}}
+                        for lane, name in self._lane_names.items()]
+            return metadata + list(self._events)
+
+    def write(self, path: str):
+        """Salva o trace em JSON (Chrome Trace / speedscope)."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+            {categoria: {spans, total_s}} (tempo somado de todos os spans da categoria)
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for event in self._events:
+                entry = totals.setdefault(event["cat"], {"spans": 0, "total_s": 0.0})
+                entry["spans"] += 1
+                entry["total_s"] += event["dur"] / 1e6
+        return totals
+
+
+class CpuProfiler:
+    """cProfile em todas as threads: a thread atual e as criadas enquanto estiver ativo."""
+
+    def __init__(self):
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _new_profile(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        return profile
+
+    def _thread_hook(self, *_):
+        # Executado no primeiro evento de cada nova thread: troca o hook pelo cProfile da thread
+        sys.setprofile(None)
+        self._new_profile().enable()
+
+    def start(self):
+        threading.setprofile(self._thread_hook)
+        self._main = self._new_profile()
+        self._main.enable()
+
+    def stop(self) -> pstats.Stats:
+        """Para o profiling e retorna as estatísticas somadas de todas as threads."""
+        self._main.disable()
+        threading.setprofile(None)
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+# Recorder ativo (None = profiling desligado; spans viram no-op)
+_recorder: Optional[TraceRecorder] = None
+
+
+def configure_profiling(enabled: bool = True) -> Optional[TraceRecorder]:
+    """
+    Ativa (ou desativa) a gravação de spans.
+
+    Returns:
+        O recorder ativo (ou None se desativado)
+    """
+    global _recorder
+    _recorder = TraceRecorder() if enabled else None
+    return _recorder
+
+
+def get_trace_recorder() -> Optional[TraceRecorder]:
+    """Retorna o recorder ativo (ou None)."""
+    return _recorder
+
+
+def span(name: str, category: Optional[str] = None, **args: Any):
+    """Span do recorder ativo (no-op se o profiling estiver desligado)."""
+    recorder = _recorder
+    if recorder is None:
+        return nullcontext()
+    return recorder.span(name, category or name, **args)
+
+
+def top_functions(stats: pstats.Stats, limit: int = 20) -> str:
+    """Texto com as `limit` funções de maior tempo acumulado."""
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
@@ -0,0 +1,119 @@
+"""
+Carregamento de prompts YAML com cache em memória.
+
+Substitui o caminho antigo (ler o YAML, regravar em um arquivo temporário,
+chamar langchain_core.prompts.load_prompt e apagar o arquivo): o YAML é
+parseado direto da memória, com o loader C da libyaml quando disponível
+(CSafeLoader), e o PromptTemplate compilado fica em cache.
+
+A chave do cache é caminho + mtime + hash do conteúdo: editar o arquivo
+invalida a entrada, e um toque sem mudança de conteúdo só custa a leitura.
+Usado por evaluate.py, push_prompts.py e pelos testes.
+"""
+
+import copy
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+import yaml
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.prompts.loading import load_prompt_from_config
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML sem libyaml: loader em Python puro
+    from yaml import SafeLoader as YamlLoader
+
+
+def parse_yaml(text: str) -> Any:
+    """Parseia YAML de uma string com o loader mais rápido disponível (seguro)."""
+    return yaml.load(text, Loader=YamlLoader)
+
+
+class PromptCache:
+    """Cache thread-safe de prompts compilados (config + PromptTemplate) por arquivo."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, int, str], Tuple[Dict[str, Any], BasePromptTemplate]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, path: str) -> Tuple[Dict[str, Any], BasePromptTemplate]:
+        abs_path = os.path.abspath(path)
+        mtime_ns = os.stat(abs_path).st_mtime_ns
+        with open(abs_path, "rb") as f:
+            raw = f.read()
+        key = (abs_path, mtime_ns, hashlib.sha256(raw).hexdigest())
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        config = parse_yaml(raw.decode("utf-8"))
+        prompt = load_prompt_from_config(copy.deepcopy(config))
+        with self._lock:
+            # Versões antigas do mesmo arquivo saem do cache
+            for old_key in [k for k in self._entries if k[0] == abs_path]:
+                del self._entries[old_key]
+            self._entries[key] = (config, prompt)
+        return config, prompt
+
+    def get_prompt(self, path: str) -> BasePromptTemplate:
+        """PromptTemplate compilado do arquivo (compartilhado: não modifique o objeto)."""
+        return self._load(path)[1]
+
+    def get_config(self, path: str) -> Dict[str, Any]:
+        """Conteúdo bruto do YAML (cópia, pode ser modificada)."""
+        return copy.deepcopy(self._load(path)[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna contadores de uso do cache.
+
+        Returns:
+            Dict com hits, misses, hit_rate e entries
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+_prompt_cache = PromptCache()
+
+
+def get_prompt_cache() -> PromptCache:
+    """Retorna o cache global de prompts."""
+    return _prompt_cache
+
+
+def load_prompt_file(path: str) -> BasePromptTemplate:
+    """
+    Carrega um prompt YAML (formato do langchain load_prompt) usando o cache global.
+
+    Args:
+        path: Caminho do arquivo (ex: prompts/bug_to_user_story_v2.yml)
+
+    Returns:
+        PromptTemplate compilado
+    """
+    return _prompt_cache.get_prompt(path)
+
+
+def load_prompt_config(path: str) -> Dict[str, Any]:
+    """Conteúdo bruto do YAML do prompt (metadados como tags e techniques), via cache global."""
+    return _prompt_cache.get_config(path)
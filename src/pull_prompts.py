@@ -11,9 +11,10 @@ SIMPLIFICADO: Usa serialização nativa do LangChain para extrair prompts.
 
 import os
 import sys
+import argparse
 from pathlib import Path
+from typing import List, Optional
 from dotenv import load_dotenv
-from langchain import hub
 from utils import save_yaml, check_env_vars, print_section_header
 
 load_dotenv()
@@ -44,6 +45,8 @@ def pull_prompts_from_langsmith():
         print(f"Puxando prompt: {repo}...")
 
         try:
+            from langchain import hub  # importado só aqui: carrega o cliente do Hub
+
             # 1. Pull do Hub
             # Isso retorna um objeto ChatPromptTemplate
             prompt_object = hub.pull(repo)
@@ -77,8 +80,9 @@ def pull_prompts_from_langsmith():
                 print("   Verifique se o nome do repositório está correto.")
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Função principal"""
+    argparse.ArgumentParser(description="Puxar prompts do LangSmith Prompt Hub").parse_args(argv)
     pull_prompts_from_langsmith()
 
 
@@ -5,9 +5,10 @@ Requer LANGCHAIN_API_KEY configurada.
 
 import os
 import sys
+import argparse
+from typing import List, Optional
 from dotenv import load_dotenv
-from langchain import hub
-from langchain_core.prompts import load_prompt
+from prompt_loader import load_prompt_file
 
 load_dotenv()
 
@@ -21,7 +22,8 @@ def push_prompt():
 
     print(f"📦 Carregando prompt de {prompt_path}...")
     try:
-        prompt = load_prompt(prompt_path)
+        prompt = load_prompt_file(prompt_path)
+        from langchain import hub  # importado só aqui: carrega o cliente do Hub
         
         print(f"🚀 Enviando para LangSmith Hub: {repo_handle}...")
         # Nota: Isso requer que a chave LANGCHAIN_API_KEY tenha permissão de escrita
@@ -34,5 +36,10 @@ def push_prompt():
     except Exception as e:
         print(f"❌ Erro ao enviar prompt: {e}")
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None):
+    argparse.ArgumentParser(description="Enviar o prompt v2 para o LangSmith Hub").parse_args(argv)
     push_prompt()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Rate limiter compartilhado por provider/modelo (token bucket).
+
+O gerador (target_func) e os juízes usam o mesmo provider; sem coordenação,
+uma rajada de chamadas do juiz esgota a cota e trava a geração. Aqui cada
+par (provider, modelo) tem um único ProviderRateLimiter, com dois baldes:
+- requisições por minuto (RPM): uma ficha por chamada, retirada antes da chamada;
+- tokens por minuto (TPM): o uso real (usage_metadata) é debitado após a
+  resposta; enquanto o saldo estiver negativo, novas chamadas aguardam.
+
+Os clientes criados por get_llm/get_eval_llm recebem o limiter via o campo
+`rate_limiter` do BaseChatModel, e um callback que debita os tokens usados.
+
+Configuração (variáveis de ambiente, 0 = sem limite):
+- LLM_RATE_LIMIT_RPM / LLM_RATE_LIMIT_TPM: padrão para todos os modelos
+- LLM_RATE_LIMITS: JSON com limites por modelo, ex:
+  {"gemini-2.0-flash": {"rpm": 15, "tpm": 1000000}}
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from profiling import span
+from usage import add_queue_wait
+
+
+class TokenBucket:
+    """
+    Balde de fichas com reposição contínua. O saldo pode ficar negativo
+    (débito posterior do TPM); não é thread-safe (o limiter serializa o acesso).
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def time_until(self, amount: float) -> float:
+        """Segundos até o saldo alcançar `amount` (0 se já alcançou)."""
+        missing = amount - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+
+class ProviderRateLimiter(BaseRateLimiter):
+    """
+    Limiter RPM/TPM de um par provider/modelo, compatível com o campo
+    `rate_limiter` dos chat models do LangChain. Registra o tempo de espera.
+    """
+
+    def __init__(self, key: Tuple[str, str], rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 burst_seconds: float = 10.0):
+        """
+        Args:
+            key: (provider, modelo)
+            rpm: Requisições por minuto (None = sem limite)
+            tpm: Tokens por minuto (None = sem limite)
+            burst_seconds: Tamanho do balde, em segundos de cota (rajada máxima)
+        """
+        self.key = key
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = TokenBucket(rpm, burst_seconds) if rpm else None
+        self._tokens = TokenBucket(tpm, burst_seconds) if tpm else None
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.waits = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.tokens_used = 0
+
+    def _try_acquire(self) -> float:
+        """Retira uma ficha de requisição se possível; senão retorna o tempo de espera."""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self._requests is not None:
+                self._requests.refill(now)
+                wait = self._requests.time_until(1)
+            if self._tokens is not None:
+                self._tokens.refill(now)
+                wait = max(wait, self._tokens.time_until(0))
+            if wait <= 0 and self._requests is not None:
+                self._requests.consume(1)
+            return wait
+
+    def _record_acquired(self, waited_s: float):
+        add_queue_wait(waited_s)
+        with self._lock:
+            self.acquired += 1
+            if waited_s > 0:
+                self.waits += 1
+                self.total_wait_s += waited_s
+                self.max_wait_s = max(self.max_wait_s, waited_s)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        start = None
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                self._record_acquired(time.perf_counter() - start if start is not None else 0.0)
+                return True
+            if not blocking:
+                return False
+            start = start if start is not None else time.perf_counter()
+            with span("wait:rate_limiter", "queue"):
+                time.sleep(wait)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        start = None
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                self._record_acquired(time.perf_counter() - start if start is not None else 0.0)
+                return True
+            if not blocking:
+                return False
+            start = start if start is not None else time.perf_counter()
+            with span("wait:rate_limiter", "queue"):
+                await asyncio.sleep(wait)
+
+    def record_usage(self, tokens: int):
+        """Debita do balde de TPM os tokens efetivamente usados por uma chamada."""
+        with self._lock:
+            self.tokens_used += tokens
+            if self._tokens is not None:
+                self._tokens.refill(time.monotonic())
+                self._tokens.consume(tokens)
+
+    def usage_callback(self) -> "RateLimitUsageCallback":
+        """Callback que debita o uso de tokens ao fim de cada chamada."""
+        return RateLimitUsageCallback(self)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do limiter.
+
+        Returns:
+            Dict com rpm, tpm, acquired, waits, total_wait_s, max_wait_s e tokens_used
+        """
+        with self._lock:
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "total_wait_s": self.total_wait_s,
+                "max_wait_s": self.max_wait_s,
+                "tokens_used": self.tokens_used,
+            }
+
+
+def usage_tokens(response: LLMResult) -> int:
+    """Total de tokens de uma resposta (usage_metadata ou llm_output.token_usage)."""
+    total = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                total += usage.get("total_tokens", 0)
+    if not total and response.llm_output:
+        total = (response.llm_output.get("token_usage") or {}).get("total_tokens", 0)
+    return total
+
+
+class RateLimitUsageCallback(BaseCallbackHandler):
+    """Debita no limiter os tokens de cada resposta do LLM."""
+
+    def __init__(self, limiter: ProviderRateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.limiter.record_usage(usage_tokens(response))
+
+
+_limiters: Dict[Tuple[str, str], Optional[ProviderRateLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limits_for(model_name: str) -> Tuple[float, float]:
+    """Lê RPM/TPM do modelo (LLM_RATE_LIMITS) ou os padrões (LLM_RATE_LIMIT_RPM/TPM)."""
+    rpm = float(os.getenv("LLM_RATE_LIMIT_RPM", "0"))
+    tpm = float(os.getenv("LLM_RATE_LIMIT_TPM", "0"))
+    overrides = json.loads(os.getenv("LLM_RATE_LIMITS", "{}") or "{}")
+    if model_name in overrides:
+        rpm = float(overrides[model_name].get("rpm", rpm))
+        tpm = float(overrides[model_name].get("tpm", tpm))
+    return rpm, tpm
+
+
+def get_rate_limiter(provider: str, model_name: str) -> Optional[ProviderRateLimiter]:
+    """
+    Retorna o limiter compartilhado de (provider, modelo), criando-o no primeiro uso.
+
+    Returns:
+        ProviderRateLimiter, ou None se não há limite configurado para o modelo
+    """
+    key = (provider, model_name)
+    with _limiters_lock:
+        if key not in _limiters:
+            rpm, tpm = _limits_for(model_name)
+            _limiters[key] = ProviderRateLimiter(key, rpm=rpm or None, tpm=tpm or None) if (rpm or tpm) else None
+        return _limiters[key]
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Contadores de todos os limiters ativos.
+
+    Returns:
+        Dict "provider/modelo" -> stats()
+    """
+    with _limiters_lock:
+        limiters = [limiter for limiter in _limiters.values() if limiter is not None]
+    return {f"{limiter.key[0]}/{limiter.key[1]}": limiter.stats() for limiter in limiters}
+
+
+def reset_rate_limiters():
+    """Descarta todos os limiters (a configuração é relida no próximo uso)."""
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,141 @@
+"""
+Arquivo de resultados por exemplo (JSONL) com retomada após falha.
+
+Cada exemplo avaliado vira uma linha (geração, scores por métrica, reasoning
+e tempos), gravada assim que o exemplo termina. O arquivo é identificado pela
+chave do experimento (prompt + gerador + juiz + dataset): com --resume, os
+exemplos já presentes no arquivo são pulados e a execução continua de onde
+parou, sem pagar de novo pelo trabalho concluído. Exemplos que falharam
+(erro na geração ou sem saída para o juiz) não contam como concluídos: são
+tentados de novo, e a nova linha substitui a anterior.
+
+Uma linha truncada (processo morto no meio da escrita) é ignorada na leitura.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+from langsmith.evaluation import RunEvaluator
+
+from local_runner import result_to_record
+from profiling import span
+from usage import example_scope
+
+
+def is_failed(record: Dict[str, Any]) -> bool:
+    """True se o exemplo falhou (erro na geração ou pseudo-score "error") e deve ser refeito no --resume."""
+    return bool(record.get("error")) or "error" in record.get("scores", {})
+
+
+class ResultsStore:
+    """JSONL de resultados de um experimento, com escrita incremental thread-safe."""
+
+    def __init__(self, path: str, resume: bool = False):
+        """
+        Args:
+            path: Caminho do JSONL (diretórios são criados se necessário)
+            resume: Se True, mantém os resultados existentes; se False, começa do zero
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        if not resume:
+            open(path, "w", encoding="utf-8").close()
+        elif Path(path).exists():
+            self._drop_partial_line()
+
+    def _drop_partial_line(self):
+        """Remove a linha final incompleta (sem \\n), para que o próximo append não a continue."""
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        Lê os resultados gravados (um por exemplo; o mais recente vence).
+
+        Returns:
+            Lista de registros no formato de local_runner.result_to_record
+        """
+        latest: Dict[str, Dict[str, Any]] = {}
+        if not Path(self.path).exists():
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                latest[record["example_id"]] = record
+        return list(latest.values())
+
+    def completed_ids(self) -> Set[str]:
+        """IDs dos exemplos que já têm resultado (sem falha) no arquivo."""
+        return {record["example_id"] for record in self.records() if not is_failed(record)}
+
+    def append(self, record: Dict[str, Any]):
+        """Grava o resultado de um exemplo (flush imediato)."""
+        with span("write_result", "serialization"):
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                    f.flush()
+
+
+class StreamingEvaluator(RunEvaluator):
+    """
+    Envolve o GlobalEvaluator nos motores do LangSmith (evaluate/aevaluate):
+    grava o resultado de cada exemplo no ResultsStore assim que é avaliado.
+    """
+
+    def __init__(self, evaluator, store: ResultsStore):
+        self.evaluator = evaluator
+        self.store = store
+
+    def _record(self, run, example, evaluation, judge_s: float, usage: Dict[str, Dict[str, float]]):
+        if not isinstance(evaluation, dict):
+            evaluation = {"results": [evaluation]}
+        generation_s = None
+        if getattr(run, "start_time", None) and getattr(run, "end_time", None):
+            generation_s = (run.end_time - run.start_time).total_seconds()
+        self.store.append(result_to_record({
+            "run": run,
+            "example": example,
+            "evaluation_results": evaluation,
+            "timings": {"generation_s": generation_s, "judge_s": judge_s},
+            "usage": usage,
+        }))
+
+    def evaluate_run(self, run, example=None):
+        start = time.perf_counter()
+        with example_scope() as usage:
+            evaluation = self.evaluator.evaluate_run(run, example)
+        self._record(run, example, evaluation, time.perf_counter() - start, usage)
+        return evaluation
+
+    async def aevaluate_run(self, run, example=None):
+        start = time.perf_counter()
+        with example_scope() as usage:
+            evaluation = await self.evaluator.aevaluate_run(run, example)
+        self._record(run, example, evaluation, time.perf_counter() - start, usage)
+        return evaluation
+
+
+def aggregate_scores(records: List[Dict[str, Any]]) -> Dict[str, List[float]]:
+    """
+    Agrupa os scores de todos os exemplos por métrica.
+
+    Returns:
+        {métrica: [scores]} (o pseudo-score "error" de exemplos sem saída é ignorado)
+    """
+    scores: Dict[str, List[float]] = {}
+    for record in records:
+        for metric, score in record.get("scores", {}).items():
+            if metric != "error" and score is not None:
+                scores.setdefault(metric, []).append(score)
+    return scores
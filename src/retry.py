@@ -0,0 +1,286 @@
+"""
+Retry com backoff exponencial + jitter e requisições "hedged" para as chamadas ao juiz.
+
+Sem isso, um único timeout transitório vira score 0.0 (pelo except genérico
+das métricas), distorce a média e desperdiça a geração que o precedeu.
+
+- Retry: apenas erros transitórios (classificados por concurrency.classify_error)
+  são repetidos, com atraso base por tipo de erro (rate limit espera mais).
+  Erros definitivos (ex: requisição inválida) falham na hora.
+- Hedging (opcional): se a chamada passar do percentil p (ex: p95) das
+  latências recentes, dispara uma duplicata e usa a primeira resposta.
+  O tempo conta a partir do início da chamada (não da fila do pool), e a
+  perdedora é cancelada: se ainda não começou, nem chega a chamar o LLM.
+
+Os contadores (chamadas, retries, hedges, falhas definitivas) são mantidos
+por métrica em JudgeCallStats.
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from concurrency import classify_error, get_concurrency_controller
+from profiling import span
+
+# Atraso base (segundos) por tipo de erro transitório; tipos ausentes não são repetidos
+DEFAULT_BASE_DELAYS = {"rate_limit": 2.0, "server": 1.0, "timeout": 0.5, "connection": 0.5}
+
+
+@dataclass
+class RetryPolicy:
+    """Política de retry: número de tentativas e backoff por tipo de erro."""
+    max_attempts: int = 3
+    base_delays: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_BASE_DELAYS))
+    max_delay_s: float = 30.0
+
+    def delay_for(self, kind: str, attempt: int) -> Optional[float]:
+        """
+        Atraso antes da próxima tentativa, ou None se o erro não deve ser repetido.
+
+        Backoff exponencial (base * 2^(tentativa-1), limitado a max_delay_s)
+        com jitter: o atraso é sorteado entre metade e o valor cheio.
+        """
+        if attempt >= self.max_attempts or kind not in self.base_delays:
+            return None
+        cap = min(self.max_delay_s, self.base_delays[kind] * 2 ** (attempt - 1))
+        return random.uniform(cap / 2, cap)
+
+
+class HedgePolicy:
+    """
+    Decide quando disparar uma requisição duplicada: após o percentil
+    `percentile` das últimas latências de sucesso da mesma métrica.
+    """
+
+    def __init__(self, percentile: float = 95.0, min_samples: int = 20, window: int = 500):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, metric: str, latency_s: float):
+        with self._lock:
+            self._latencies.setdefault(metric, deque(maxlen=self.window)).append(latency_s)
+
+    def threshold(self, metric: str) -> Optional[float]:
+        """Latência a partir da qual a duplicata é disparada (None enquanto há poucas amostras)."""
+        with self._lock:
+            samples = sorted(self._latencies.get(metric, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return samples[index]
+
+
+class JudgeCallStats:
+    """Contadores thread-safe por métrica: calls, retries, hedges, hedge_wins, failures,
+    invalid_responses, reasks, parse_failures."""
+
+    FIELDS = ("calls", "retries", "hedges", "hedge_wins", "failures", "invalid_responses", "reasks", "parse_failures")
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, metric: str, counter: str, amount: int = 1):
+        with self._lock:
+            counts = self._counts.setdefault(metric, dict.fromkeys(self.FIELDS, 0))
+            counts[counter] += amount
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Cópia dos contadores: {métrica: {calls, retries, ..., parse_failures}}."""
+        with self._lock:
+            return {metric: dict(counts) for metric, counts in self._counts.items()}
+
+
+# Threads do pool de hedging sem controlador de concorrência ativo
+DEFAULT_HEDGE_WORKERS = 32
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_size = 0
+_hedge_executor_lock = threading.Lock()
+
+
+class HedgeSuperseded(Exception):
+    """A duplicata (ou a original) ainda não tinha começado quando a outra respondeu."""
+
+
+def _submit(fn: Callable[[], Any]):
+    """
+    Executa fn em uma thread do pool de hedging, preservando o contexto (tracing).
+
+    O pool tem o tamanho do limite máximo de concorrência: threads além dele
+    só ficariam bloqueadas esperando um slot.
+    """
+    global _hedge_executor, _hedge_executor_size
+    controller = get_concurrency_controller()
+    size = controller.max_concurrency if controller is not None else DEFAULT_HEDGE_WORKERS
+    with _hedge_executor_lock:
+        if _hedge_executor is None or _hedge_executor_size != size:
+            if _hedge_executor is not None:
+                _hedge_executor.shutdown(wait=False)
+            _hedge_executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="judge-hedge")
+            _hedge_executor_size = size
+        executor = _hedge_executor
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn)
+
+
+def _call_hedged(fn: Callable[[], Any], hedge: HedgePolicy, stats: JudgeCallStats, metric: str) -> Any:
+    threshold = hedge.threshold(metric)
+    if threshold is None:
+        start = time.perf_counter()
+        result = fn()
+        hedge.record(metric, time.perf_counter() - start)
+        return result
+
+    settled = threading.Event()  # uma das chamadas já respondeu: a outra não precisa começar
+    started = threading.Event()
+    start_times = []
+
+    def run(is_primary: bool):
+        if settled.is_set():
+            raise HedgeSuperseded()
+        if is_primary:
+            start_times.append(time.perf_counter())
+            started.set()
+        result = fn()
+        settled.set()  # na própria thread: a próxima tarefa do pool já vê a resposta
+        return result
+
+    primary = _submit(lambda: run(True))
+    # O tempo na fila do pool não conta como latência: o timer começa quando a chamada começa
+    started.wait()
+    start = start_times[0]
+    done, _ = wait([primary], timeout=max(0.0, threshold - (time.perf_counter() - start)))
+    if done:
+        result = primary.result()
+        hedge.record(metric, time.perf_counter() - start)
+        return result
+
+    stats.record(metric, "hedges")
+    backup = _submit(lambda: run(False))
+    pending = {primary, backup}
+    error = None
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        stats.record(metric, "hedge_wins")
+                    hedge.record(metric, time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        # A perdedora que ainda não começou é cancelada (não chama o LLM nem ocupa slot);
+        # uma que já está em andamento libera o slot ao terminar e o resultado é descartado
+        settled.set()
+        for future in pending:
+            future.cancel()
+
+
+async def _acall_hedged(afn: Callable[[], Awaitable[Any]], hedge: HedgePolicy,
+                        stats: JudgeCallStats, metric: str) -> Any:
+    start = time.perf_counter()
+    threshold = hedge.threshold(metric)
+    if threshold is None:
+        result = await afn()
+        hedge.record(metric, time.perf_counter() - start)
+        return result
+
+    primary = asyncio.ensure_future(afn())
+    done, _ = await asyncio.wait({primary}, timeout=threshold)
+    if done:
+        result = primary.result()
+        hedge.record(metric, time.perf_counter() - start)
+        return result
+
+    stats.record(metric, "hedges")
+    backup = asyncio.ensure_future(afn())
+    pending = {primary, backup}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is backup:
+                        stats.record(metric, "hedge_wins")
+                    hedge.record(metric, time.perf_counter() - start)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # A requisição perdedora é cancelada (libera o slot de concorrência)
+        for task in pending:
+            task.cancel()
+
+
+def call_with_retry(fn: Callable[[], Any], policy: RetryPolicy, stats: JudgeCallStats, metric: str,
+                    hedge: Optional[HedgePolicy] = None, sleep: Callable[[float], None] = time.sleep) -> Any:
+    """
+    Executa fn com retry (erros transitórios) e, opcionalmente, hedging.
+
+    Args:
+        fn: Chamada ao LLM (sem argumentos)
+        policy: Política de retry
+        stats: Contadores por métrica
+        metric: Nome da métrica (para os contadores e logs)
+        hedge: Política de hedging (None = desativado)
+        sleep: Função de espera (substituível em testes)
+
+    Returns:
+        O resultado de fn
+
+    Raises:
+        A última exceção, se o erro for definitivo ou as tentativas se esgotarem
+    """
+    stats.record(metric, "calls")
+    attempt = 1
+    while True:
+        try:
+            return _call_hedged(fn, hedge, stats, metric) if hedge is not None else fn()
+        except Exception as e:
+            kind = classify_error(e)
+            delay = policy.delay_for(kind, attempt)
+            if delay is None:
+                stats.record(metric, "failures")
+                raise
+            stats.record(metric, "retries")
+            print(f"🔁 {metric}: tentativa {attempt} falhou ({kind}), nova tentativa em {delay:.1f}s")
+            with span("retry_backoff", "retry", metric=metric, kind=kind):
+                sleep(delay)
+            attempt += 1
+
+
+async def acall_with_retry(afn: Callable[[], Awaitable[Any]], policy: RetryPolicy, stats: JudgeCallStats,
+                           metric: str, hedge: Optional[HedgePolicy] = None) -> Any:
+    """
+    Versão assíncrona de call_with_retry (afn retorna uma coroutine).
+    """
+    stats.record(metric, "calls")
+    attempt = 1
+    while True:
+        try:
+            return await (_acall_hedged(afn, hedge, stats, metric) if hedge is not None else afn())
+        except Exception as e:
+            kind = classify_error(e)
+            delay = policy.delay_for(kind, attempt)
+            if delay is None:
+                stats.record(metric, "failures")
+                raise
+            stats.record(metric, "retries")
+            print(f"🔁 {metric}: tentativa {attempt} falhou ({kind}), nova tentativa em {delay:.1f}s")
+            with span("retry_backoff", "retry", metric=metric, kind=kind):
+                await asyncio.sleep(delay)
+            attempt += 1
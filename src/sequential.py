@@ -0,0 +1,163 @@
+"""
+Teste sequencial (early stopping) da avaliação de um prompt.
+
+Em vez de avaliar o dataset inteiro, os exemplos são avaliados em lotes
+aleatórios; após cada lote, um intervalo de confiança é calculado para cada
+métrica alvo. A avaliação para quando todas as métricas estão decididas:
+intervalo inteiro acima da meta (aprovada) ou inteiro abaixo (reprovada).
+
+Como o intervalo é olhado várias vezes (uma por lote) e para várias métricas,
+o nível de significância é dividido entre olhadas e métricas (Bonferroni),
+o que mantém a taxa de erro global <= alpha.
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from statistics import NormalDist, mean, stdev
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from local_runner import run_local_evaluation
+
+# Métricas e meta usadas pelo compare_prompts (critério de aprovação do desafio)
+TARGET_METRICS = ("tone", "acceptance_criteria", "user_story_format", "completeness")
+TARGET_THRESHOLD = 0.9
+
+DECISION_ICONS = {"pass": "✅", "fail": "❌", "undecided": "…"}
+
+
+@dataclass
+class MetricInterval:
+    """Intervalo de confiança de uma métrica após uma olhada."""
+    metric: str
+    n: int
+    mean: float
+    low: float
+    high: float
+    decision: str  # "pass", "fail" ou "undecided"
+
+
+class SequentialTester:
+    """
+    Acumula os scores por métrica e decide cada uma contra a meta.
+
+    O intervalo usa a aproximação normal (média ± z·s/√n), com o desvio
+    padrão limitado por baixo em `min_std` para que poucos scores idênticos
+    não produzam um intervalo de largura zero.
+    """
+
+    def __init__(self, target_metrics: Sequence[str] = TARGET_METRICS, threshold: float = TARGET_THRESHOLD,
+                 alpha: float = 0.05, max_looks: int = 10, min_examples: int = 10, min_std: float = 0.05):
+        """
+        Args:
+            target_metrics: Métricas que precisam ser decididas
+            threshold: Meta de cada métrica
+            alpha: Taxa de erro global (entre todas as olhadas e métricas)
+            max_looks: Número máximo de olhadas (lotes) planejadas
+            min_examples: Mínimo de exemplos antes de qualquer decisão
+            min_std: Piso do desvio padrão amostral
+        """
+        self.target_metrics = list(target_metrics)
+        self.threshold = threshold
+        self.alpha = alpha
+        self.max_looks = max(1, max_looks)
+        self.min_examples = min_examples
+        self.min_std = min_std
+        self.z = NormalDist().inv_cdf(1 - alpha / (2 * self.max_looks * len(self.target_metrics)))
+        self.scores: Dict[str, List[float]] = {m: [] for m in self.target_metrics}
+
+    def add(self, scores: Dict[str, float]):
+        """Registra os scores de um exemplo (métricas fora do alvo são ignoradas)."""
+        for metric in self.target_metrics:
+            if scores.get(metric) is not None:
+                self.scores[metric].append(float(scores[metric]))
+
+    def interval(self, metric: str) -> MetricInterval:
+        values = self.scores[metric]
+        n = len(values)
+        if n == 0:
+            return MetricInterval(metric, 0, 0.0, 0.0, 1.0, "undecided")
+
+        avg = mean(values)
+        std = max(stdev(values) if n > 1 else 0.0, self.min_std)
+        half_width = self.z * std / math.sqrt(n)
+        low, high = max(0.0, avg - half_width), min(1.0, avg + half_width)
+
+        decision = "undecided"
+        if n >= self.min_examples:
+            if low >= self.threshold:
+                decision = "pass"
+            elif high < self.threshold:
+                decision = "fail"
+        return MetricInterval(metric, n, avg, low, high, decision)
+
+    def intervals(self) -> Dict[str, MetricInterval]:
+        return {metric: self.interval(metric) for metric in self.target_metrics}
+
+    def decided(self) -> bool:
+        """True quando todas as métricas alvo foram aprovadas ou reprovadas."""
+        return all(i.decision != "undecided" for i in self.intervals().values())
+
+
+def _row_scores(row: Dict[str, Any]) -> Dict[str, float]:
+    return {r.key: r.score for r in row["evaluation_results"]["results"]}
+
+
+def run_sequential_evaluation(target: Callable[[dict], dict], examples: Iterable[Any], evaluator,
+                              batch_size: int = 10, max_workers: int = 4, alpha: float = 0.05,
+                              seed: int = 42, target_metrics: Sequence[str] = TARGET_METRICS,
+                              threshold: float = TARGET_THRESHOLD,
+                              output_path: Optional[str] = None, append: bool = False,
+                              prior_scores: Iterable[Dict[str, float]] = ()) -> Tuple[List[Dict[str, Any]], SequentialTester]:
+    """
+    Avalia os exemplos em lotes aleatórios até todas as métricas alvo estarem decididas.
+
+    Args:
+        target: Função inputs -> {"output": ...}
+        examples: Exemplos (LocalExample ou langsmith Example)
+        evaluator: GlobalEvaluator (ou compatível com evaluate_run)
+        batch_size: Exemplos por lote (uma olhada por lote)
+        max_workers: Workers simultâneos em cada lote
+        alpha: Taxa de erro global do teste
+        seed: Semente do embaralhamento (reprodutível)
+        target_metrics: Métricas que precisam ser decididas
+        threshold: Meta de cada métrica
+        output_path: JSONL onde os resultados são gravados (opcional)
+        append: Acrescenta ao JSONL existente já no primeiro lote
+        prior_scores: Scores de exemplos já avaliados (retomada), contados no teste
+
+    Returns:
+        (resultados no formato de run_local_evaluation, tester com os intervalos finais)
+    """
+    pool = list(examples)
+    random.Random(seed).shuffle(pool)
+    batches = [pool[i:i + batch_size] for i in range(0, len(pool), batch_size)]
+    prior_scores = list(prior_scores)
+    tester = SequentialTester(target_metrics, threshold, alpha=alpha, max_looks=max(1, len(batches)),
+                              min_examples=min(batch_size, len(pool) + len(prior_scores)))
+    for scores in prior_scores:
+        tester.add(scores)
+
+    if prior_scores and tester.decided():
+        print(f"⏹️  Todas as métricas já estavam decididas pelos {len(prior_scores)} exemplos anteriores.")
+        return [], tester
+
+    results = []
+    for look, batch in enumerate(batches, 1):
+        rows = run_local_evaluation(target, batch, evaluator, max_workers=max_workers,
+                                    output_path=output_path, append=append or look > 1, keep_results=True)
+        for row in rows:
+            tester.add(_row_scores(row))
+        results.extend(rows)
+
+        summary = " | ".join(
+            f"{i.metric} {i.mean:.3f} [{i.low:.3f}, {i.high:.3f}] {DECISION_ICONS[i.decision]}"
+            for i in tester.intervals().values()
+        )
+        print(f"🔎 Lote {look}/{len(batches)} ({len(results)}/{len(pool)} exemplos): {summary}")
+
+        if tester.decided():
+            print(f"⏹️  Todas as métricas decididas com {len(results)} de {len(pool)} exemplos.")
+            break
+
+    return results, tester
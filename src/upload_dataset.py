@@ -9,8 +9,8 @@ import json
 import os
 import sys
 import argparse
+from typing import List, Optional
 from dotenv import load_dotenv
-from langsmith import Client
 
 load_dotenv()
 
@@ -54,6 +54,7 @@ def upload_dataset(
     print(f"📄 {len(examples)} exemplos carregados de {jsonl_path}")
 
     # 3. Conectar ao LangSmith
+    from langsmith import Client
     client = Client()
 
     # 4. Verificar se dataset existe
@@ -126,10 +127,14 @@ def upload_dataset(
         print(f"✅ Dataset '{dataset_name}' atualizado com sucesso!")
 
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(description="Upload dataset para LangSmith")
     parser.add_argument("--force", action="store_true", help="Deletar e recriar dataset")
     parser.add_argument("--dataset", type=str, default="prompt-optimization-challenge-resolved-eval")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     upload_dataset(force_recreate=args.force, dataset_name=args.dataset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Contabilidade de tokens e latência por etapa, métrica e exemplo.
+
+Cada chamada ao LLM registra tokens de prompt/completion (usage_metadata da
+resposta), quantos dos tokens de prompt vieram do cache de prefixo/contexto
+do provider (input_token_details.cache_read), o tempo de parede e o tempo em fila (espera por um slot de
+concorrência ou pelo rate limiter). As etapas sem LLM (carregar o prompt,
+parse das respostas) registram apenas o tempo de parede.
+
+Etapas usadas na avaliação:
+- load_prompt: leitura e compilação do YAML do prompt
+- generate: geração da user story (target_func)
+- judge:<métrica>: chamada ao juiz de cada métrica (ou judge:Fused)
+- parse: limpeza da user story e extração do JSON das respostas do juiz
+
+Com --profile, cada etapa também vira um span no trace (ver profiling).
+
+Os totais por etapa ficam no UsageTracker global; os de cada exemplo são
+coletados com example_scope() e gravados no arquivo de resultados (a geração
+volta nos outputs do target, pois no LangSmith target e juiz rodam em
+contextos diferentes).
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from profiling import span
+
+STAGE_FIELDS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "wall_s", "queue_s")
+
+
+@dataclass
+class CallUsage:
+    """Uso de uma chamada em andamento (preenchido pela chamada e pelas filas)."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    queue_s: float = 0.0
+
+    def add_response(self, response: Any):
+        """Soma os tokens de uma resposta do LLM (AIMessage.usage_metadata)."""
+        usage = getattr(response, "usage_metadata", None) or {}
+        self.prompt_tokens += usage.get("input_tokens", 0)
+        self.completion_tokens += usage.get("output_tokens", 0)
+        self.cached_tokens += (usage.get("input_token_details") or {}).get("cache_read") or 0
+
+
+# Chamada em andamento (recebe o tempo em fila) e acumulador do exemplo atual
+_current_call: contextvars.ContextVar[Optional[CallUsage]] = contextvars.ContextVar("usage_call", default=None)
+_current_example: contextvars.ContextVar[Optional[Dict[str, Dict[str, float]]]] = \
+    contextvars.ContextVar("usage_example", default=None)
+
+
+def _add(stages: Dict[str, Dict[str, float]], stage: str, values: Dict[str, float]):
+    counts = stages.setdefault(stage, dict.fromkeys(STAGE_FIELDS, 0))
+    for name in STAGE_FIELDS:
+        counts[name] += values.get(name, 0)
+
+
+def merge_usage(usages: Iterable[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """Soma vários dicts {etapa: contadores} em um só."""
+    merged: Dict[str, Dict[str, float]] = {}
+    for usage in usages:
+        for stage, values in (usage or {}).items():
+            _add(merged, stage, values)
+    return merged
+
+
+def usage_totals(stages: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Soma os contadores de todas as etapas (tokens = prompt + completion)."""
+    totals = dict.fromkeys(STAGE_FIELDS, 0)
+    for values in stages.values():
+        for name in STAGE_FIELDS:
+            totals[name] += values.get(name, 0)
+    totals["tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+    return totals
+
+
+class UsageTracker:
+    """Acumula os contadores por etapa (thread-safe)."""
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+               wall_s: float = 0.0, queue_s: float = 0.0, cached_tokens: int = 0):
+        """Registra uma chamada da etapa (também no exemplo atual, se houver um)."""
+        values = {"calls": 1, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "cached_tokens": cached_tokens, "wall_s": wall_s, "queue_s": queue_s}
+        with self._lock:
+            _add(self._stages, stage, values)
+        example = _current_example.get()
+        if example is not None:
+            _add(example, stage, values)
+
+    def stages(self) -> Dict[str, Dict[str, float]]:
+        """Cópia dos contadores: {etapa: {calls, prompt_tokens, completion_tokens, cached_tokens, wall_s, queue_s}}."""
+        with self._lock:
+            return {stage: dict(values) for stage, values in self._stages.items()}
+
+
+# Tracker usado pelo gerador e pelo juiz (reiniciado a cada avaliação via reset_usage_tracker)
+_tracker = UsageTracker()
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Retorna o tracker ativo."""
+    return _tracker
+
+
+def reset_usage_tracker() -> UsageTracker:
+    """Começa uma nova contabilidade (ex: uma por prompt avaliado)."""
+    global _tracker
+    _tracker = UsageTracker()
+    return _tracker
+
+
+def add_queue_wait(seconds: float):
+    """Soma tempo em fila à chamada em andamento (chamado pelo controle de concorrência e pelo rate limiter)."""
+    call = _current_call.get()
+    if call is not None and seconds > 0:
+        call.queue_s += seconds
+
+
+@contextmanager
+def track_llm_call(stage: str) -> Iterator[CallUsage]:
+    """
+    Mede uma chamada ao LLM (incluindo retries). Quem chama informa a resposta
+    com call.add_response(response); o tempo em fila é somado automaticamente.
+    """
+    call = CallUsage()
+    token = _current_call.set(call)
+    start = time.perf_counter()
+    try:
+        with span(stage, stage.split(":")[0]):
+            yield call
+    finally:
+        _current_call.reset(token)
+        _tracker.record(stage, call.prompt_tokens, call.completion_tokens,
+                        wall_s=time.perf_counter() - start, queue_s=call.queue_s, cached_tokens=call.cached_tokens)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Mede o tempo de parede de uma etapa sem LLM (ex: load_prompt, parse)."""
+    start = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    finally:
+        _tracker.record(stage, wall_s=time.perf_counter() - start)
+
+
+@contextmanager
+def example_scope() -> Iterator[Dict[str, Dict[str, float]]]:
+    """
+    Coleta o uso das chamadas feitas dentro do bloco (ex: avaliação de um exemplo).
+
+    Yields:
+        Dict {etapa: contadores}, preenchido até o fim do bloco
+    """
+    usage: Dict[str, Dict[str, float]] = {}
+    token = _current_example.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_example.reset(token)
+
+
+def example_usage_summary(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Resume o uso por exemplo a partir dos registros do arquivo de resultados.
+
+    Returns:
+        Dict com examples, avg_tokens, avg_wall_s, max_tokens e max_example_id
+        (wall = geração + juiz de cada exemplo)
+    """
+    per_example = []
+    for record in records:
+        timings = record.get("timings") or {}
+        wall_s = (timings.get("generation_s") or 0.0) + (timings.get("judge_s") or 0.0)
+        per_example.append((usage_totals(record.get("usage") or {})["tokens"], wall_s, record["example_id"]))
+    if not per_example:
+        return {"examples": 0, "avg_tokens": 0.0, "avg_wall_s": 0.0, "max_tokens": 0, "max_example_id": None}
+
+    max_tokens, _, max_example_id = max(per_example)
+    return {
+        "examples": len(per_example),
+        "avg_tokens": sum(t for t, _, _ in per_example) / len(per_example),
+        "avg_wall_s": sum(w for _, w, _ in per_example) / len(per_example),
+        "max_tokens": max_tokens,
+        "max_example_id": max_example_id,
+    }
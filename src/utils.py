@@ -4,13 +4,31 @@ Funções auxiliares para o projeto de otimização de prompts.
 
 import os
 import yaml
-import json
-from typing import Dict, Any, Optional
+import importlib.util
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
+from llm_registry import LLMClientRegistry, get_llm_registry
+from rate_limiter import get_rate_limiter
+from json_extract import extract_json_from_response
+
+# API pública; extract_json_from_response é reexportado (a implementação única fica em json_extract)
+__all__ = [
+    "load_yaml", "save_yaml", "check_env_vars", "format_score", "print_section_header",
+    "extract_json_from_response", "resolve_llm_provider", "get_llm", "get_eval_llm", "json_mode_kwargs",
+]
 
 load_dotenv()
 
+_PROVIDER_LABELS = {
+    "google": "Google",
+    "openai": "OpenAI",
+    "fake": "Fake (simulado)",
+    "replay": "Replay (cassette)",
+    "record": "Record (cassette)",
+}
+
 
 def load_yaml(file_path: str) -> Optional[Dict[str, Any]]:
     """
@@ -117,98 +135,67 @@ def print_section_header(title: str, char: str = "=", width: int = 50):
     print(char * width + "\n")
 
 
-def extract_json_from_response(response_text: str) -> Optional[Dict[str, Any]]:
+@lru_cache(maxsize=None)
+def _provider_library_available(module_name: str, package_name: str) -> bool:
+    """
+    Verifica (uma única vez por processo) se a biblioteca do provider está instalada.
     """
-    Extrai JSON de uma resposta de LLM que pode conter texto adicional.
+    if importlib.util.find_spec(module_name) is None:
+        print(f"⚠️  Biblioteca {package_name} não encontrada.")
+        return False
+    return True
 
-    Args:
-        response_text: Texto da resposta do LLM
 
-    Returns:
-        Dicionário extraído ou None se não encontrar JSON válido
-    """
-    try:
-        return json.loads(response_text)
-    except json.JSONDecodeError:
-        # Tentar encontrar JSON no meio do texto
-        # Procura pelo primeiro '{' e pelo último '}'
-        start = response_text.find('{')
-        end = response_text.rfind('}') + 1
-
-        if start != -1 and end > start:
-            try:
-                json_str = response_text[start:end]
-                return json.loads(json_str)
-            except json.JSONDecodeError:
-                pass
-                
-        # Tentar consertar JSONs mal formatados comuns (ex: markdown code blocks)
-        if "```json" in response_text:
-            try:
-                json_str = response_text.split("```json")[1].split("```")[0].strip()
-                return json.loads(json_str)
-            except:
-                pass
-
-    return None
-
-
-def get_llm(model: Optional[str] = None, temperature: float = 0.0):
+def resolve_llm_provider(model: Optional[str] = None) -> Tuple[str, str]:
     """
-    Retorna uma instância de LLM configurada baseada no provider.
-    Prioriza configuração do .env ou defaults do Google GenAI.
-    Retorna uma instância de LLM com fallback automático de providers.
-    Ordem de preferência:
+    Resolve provider e nome do modelo sem instanciar o cliente.
+
+    LLM_PROVIDER=fake|replay|record seleciona os providers locais de
+    fake_llm (simulação, reprodução e gravação de cassette). Caso contrário,
+    ordem de preferência:
     1. Google (GEMINI_API_KEY ou GOOGLE_API_KEY)
     2. OpenAI (OPENAI_API_KEY)
+
+    Args:
+        model: Modelo solicitado (opcional, senão LLM_MODEL ou default do provider)
+
+    Returns:
+        Tupla (provider, model_name)
     """
+    local_provider = os.getenv('LLM_PROVIDER', '').lower()
+    if local_provider in ("fake", "replay"):
+        return local_provider, model or os.getenv('LLM_MODEL', 'fake-chat')
+    if local_provider == "record":
+        # Grava as chamadas do provider real resolvido normalmente
+        return "record", _resolve_remote_provider(model)[1]
+
+    return _resolve_remote_provider(model)
+
+
+def _resolve_remote_provider(model: Optional[str] = None) -> Tuple[str, str]:
+    """Resolve o provider remoto (Google ou OpenAI) a partir das chaves do .env."""
     # 1. Tentar Google Gemini primeiro (Preferência do User)
-    google_key = os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')
-    openai_key = os.getenv('OPENAI_API_KEY')
-    
-    # Se o usuário forçou um provider via env, respeitar (mas cair no fallback se falhar setup?)
     # A regra do usuário foi: "Se a chave da Google estiver configurada, ela é a default."
-    
-    if google_key:
-        try:
-            from langchain_google_genai import ChatGoogleGenerativeAI
-            default_model = 'gemini-2.0-flash'
-            model_name = model or os.getenv('LLM_MODEL', default_model)
-            
-            # Ajuste para garantir que não estamos usando modelo OpenAI com Google
-            if "gpt" in model_name:
-                model_name = default_model
-
-            print(f"🤖 Usando Provider: Google | Modelo: {model_name}")
-            return ChatGoogleGenerativeAI(
-                model=model_name,
-                temperature=temperature,
-                google_api_key=google_key
-            )
-        except ImportError:
-            print("⚠️  Biblioteca langchain-google-genai não encontrada.")
-            pass # Tentar OpenAI
+    if (os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY')) and \
+            _provider_library_available("langchain_google_genai", "langchain-google-genai"):
+        default_model = 'gemini-2.0-flash'
+        model_name = model or os.getenv('LLM_MODEL', default_model)
+
+        # Ajuste para garantir que não estamos usando modelo OpenAI com Google
+        if "gpt" in model_name:
+            model_name = default_model
+        return "google", model_name
 
     # 2. Se não tem Google ou falhou, tentar OpenAI
-    if openai_key:
-        try:
-            from langchain_openai import ChatOpenAI
-            default_model = 'gpt-4o'
-            model_name = model or os.getenv('LLM_MODEL', default_model)
-
-            # Ajuste para garantir que não estamos usando modelo Gemini com OpenAI
-            if "gemini" in model_name:
-                model_name = default_model
-
-            print(f"🤖 Usando Provider: OpenAI | Modelo: {model_name}")
-            return ChatOpenAI(
-                model=model_name,
-                temperature=temperature,
-                api_key=openai_key
-            )
-        except ImportError:
-            print("⚠️  Biblioteca langchain-openai não encontrada.")
-            pass
+    if os.getenv('OPENAI_API_KEY') and \
+            _provider_library_available("langchain_openai", "langchain-openai"):
+        default_model = 'gpt-4o'
+        model_name = model or os.getenv('LLM_MODEL', default_model)
+
+        # Ajuste para garantir que não estamos usando modelo Gemini com OpenAI
+        if "gemini" in model_name:
+            model_name = default_model
+        return "openai", model_name
 
     # 3. Se chegou aqui, não tem chaves configuradas
     raise ValueError(
@@ -219,11 +206,114 @@ def get_llm(model: Optional[str] = None, temperature: float = 0.0):
     )
 
 
-def get_eval_llm(model: Optional[str] = None, temperature: float = 0.0):
+def _create_llm(provider: str, model_name: str, temperature: float, **llm_kwargs):
+    """
+    Instancia o cliente do provider. Chamado apenas em cache miss do registro.
+    """
+    print(f"🤖 Usando Provider: {_PROVIDER_LABELS[provider]} | Modelo: {model_name}")
+
+    if provider not in ("replay", "record"):
+        # Gerador e juiz do mesmo provider/modelo compartilham o mesmo orçamento RPM/TPM
+        limiter = get_rate_limiter(provider, model_name)
+        if limiter is not None:
+            llm_kwargs.setdefault("rate_limiter", limiter)
+            llm_kwargs.setdefault("callbacks", [limiter.usage_callback()])
+
+    if provider == "fake":
+        from fake_llm import fake_llm_from_env
+        return fake_llm_from_env(model_name, temperature=temperature, **llm_kwargs)
+
+    if provider == "replay":
+        from fake_llm import ReplayChatModel, DEFAULT_CASSETTE_PATH
+        return ReplayChatModel(
+            model_name=model_name,
+            temperature=temperature,
+            cassette_path=os.getenv('LLM_CASSETTE', DEFAULT_CASSETTE_PATH),
+            replay_timing=os.getenv('LLM_REPLAY_TIMING', 'false').lower() == 'true',
+            **llm_kwargs
+        )
+
+    if provider == "record":
+        from fake_llm import RecordingChatModel, DEFAULT_CASSETTE_PATH
+        remote_provider, _ = _resolve_remote_provider(model_name)
+        return RecordingChatModel(
+            inner=_create_llm(remote_provider, model_name, temperature, **llm_kwargs),
+            model_name=model_name,
+            temperature=temperature,
+            cassette_path=os.getenv('LLM_CASSETTE', DEFAULT_CASSETTE_PATH),
+        )
+
+    if provider == "google":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=model_name,
+            temperature=temperature,
+            google_api_key=os.getenv('GOOGLE_API_KEY') or os.getenv('GEMINI_API_KEY'),
+            **llm_kwargs
+        )
+
+    if provider == "openai":
+        import httpx
+        from langchain_openai import ChatOpenAI
+        # Pool de conexões keep-alive compartilhado por todas as chamadas deste cliente
+        max_connections = int(os.getenv('LLM_HTTP_MAX_CONNECTIONS', '20'))
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections)
+        llm_kwargs.setdefault("http_client", httpx.Client(limits=limits))
+        llm_kwargs.setdefault("http_async_client", httpx.AsyncClient(limits=limits))
+        return ChatOpenAI(
+            model=model_name,
+            temperature=temperature,
+            api_key=os.getenv('OPENAI_API_KEY'),
+            **llm_kwargs
+        )
+
+    raise ValueError(f"❌ Provider desconhecido: {provider}")
+
+
+def get_llm(model: Optional[str] = None, temperature: float = 0.0, **llm_kwargs):
+    """
+    Retorna uma instância de LLM configurada baseada no provider.
+    Prioriza configuração do .env ou defaults do Google GenAI.
+    Retorna uma instância de LLM com fallback automático de providers.
+    Ordem de preferência:
+    1. Google (GEMINI_API_KEY ou GOOGLE_API_KEY)
+    2. OpenAI (OPENAI_API_KEY)
+
+    As instâncias são reaproveitadas pelo registro global (ver llm_registry),
+    indexadas por (provider, modelo, temperatura, llm_kwargs).
+    """
+    provider, model_name = resolve_llm_provider(model)
+    key = LLMClientRegistry.make_key(provider, model_name, temperature, llm_kwargs)
+    return get_llm_registry().get_or_create(
+        key, lambda: _create_llm(provider, model_name, temperature, **llm_kwargs)
+    )
+
+
+def get_eval_llm(model: Optional[str] = None, temperature: float = 0.0, **llm_kwargs):
     """
     Retorna LLM auto-configurado para avaliação.
     """
     # Para avaliação, geralmente queremos modelos mais robustos.
     # Se estivermos no Google -> gemini-2.0-flash (ou o solicitado)
     # Se OpenAI -> gpt-4o
-    return get_llm(model=model, temperature=temperature)
+    return get_llm(model=model, temperature=temperature, **llm_kwargs)
+
+
+# Parâmetros de chamada que pedem saída JSON nativa ao provider (JSON mode),
+# por tipo de cliente. O fake já responde JSON; o replay só usa o flag para
+# achar no cassette a gravação feita em JSON mode.
+_JSON_MODE_CALL_KWARGS = {
+    "chat-google-generative-ai": {"generation_config": {"response_mime_type": "application/json"}},
+    "openai-chat": {"response_format": {"type": "json_object"}},
+    "replay-chat": {"json_mode": True},
+}
+
+
+def json_mode_kwargs(llm) -> Dict[str, Any]:
+    """
+    Parâmetros extras de invoke/ainvoke que ativam a saída JSON nativa do
+    cliente `llm` (vazio quando o provider não suporta).
+    """
+    llm = getattr(llm, "inner", llm)  # RecordingChatModel repassa os parâmetros ao provider real
+    return _JSON_MODE_CALL_KWARGS.get(getattr(llm, "_llm_type", None), {})
@@ -3,12 +3,44 @@ Conftest.py — Geração automática de test_report.md após execução do pyte
 
 Sempre que `pytest tests/` for executado, um relatório Markdown será gerado
 na raiz do projeto com o resultado de todos os testes agrupados por critério.
+
+Também define as fixtures compartilhadas das avaliações offline (provider
+simulado e recortes do dataset do repositório).
 """
 
 import os
+import sys
 import pytest
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+PROJECT_ROOT = os.path.join(os.path.dirname(__file__), '..')
+DATASET_PATH = os.path.join(PROJECT_ROOT, "datasets", "bug_to_user_story.jsonl")
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """Provider simulado (LLM_PROVIDER=fake, sem erros) com a raiz do projeto como diretório de trabalho."""
+    from llm_registry import get_llm_registry
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setenv("FAKE_LLM_ERROR_RATE", "0")
+    monkeypatch.chdir(PROJECT_ROOT)
+    get_llm_registry().invalidate()
+    yield
+    get_llm_registry().invalidate()
+
+
+@pytest.fixture
+def dataset_head(tmp_path):
+    """Fábrica: grava as primeiras `n` linhas do dataset do repositório em um JSONL temporário."""
+    def make(n: int) -> str:
+        dataset = tmp_path / "dataset.jsonl"
+        with open(DATASET_PATH, encoding="utf-8") as f:
+            dataset.write_text("".join(f.readlines()[:n]), encoding="utf-8")
+        return str(dataset)
+    return make
+
 
 # Armazena resultados dos testes
 class TestReportData:
@@ -0,0 +1,147 @@
+"""
+Testes do modo batch (src/batch_runner.py) com o backend local.
+"""
+
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from langchain_core.messages import AIMessage, HumanMessage
+import batch_runner
+import metrics
+from batch_runner import BatchRequest, LocalBatchBackend, parse_output_line, run_batch_job, write_batch_file
+from llm_registry import get_llm_registry
+
+PROJECT_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+STORY = "# Corrigir login\n\n**Como** um cliente, **Eu quero** entrar, **Para que** eu compre."
+
+
+class StubBatchLLM:
+    """Cliente simulado: user story na geração; no juiz, JSON inválido até o re-ask (ou válido com valid=True)."""
+
+    def __init__(self, valid: bool = False):
+        self.valid = valid
+        self.calls = []
+
+    def invoke(self, messages, stop=None):
+        self.calls.append(messages)
+        content = messages[0].content
+        if "Retorne APENAS" not in content:
+            text = STORY
+        elif len(messages) == 1 and not self.valid:
+            text = '{"score": 9, "precision": 9, "recall": 9, "reasoning": "escala errada"}'
+        else:
+            text = '{"score": 0.9, "precision": 0.9, "recall": 0.9, "reasoning": "ok"}'
+        return AIMessage(content=text, usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+
+
+class TestBatchFiles:
+    """Verifica o formato dos arquivos e o ciclo submit/poll/results do backend local."""
+
+    def test_local_job_round_trip(self, tmp_path):
+        requests = [BatchRequest("a", [HumanMessage(content="Bug Report: login")], {"temperature": 0.0}),
+                    BatchRequest("b", [HumanMessage(content="Bug Report: checkout")])]
+        path = write_batch_file(str(tmp_path / "in.jsonl"), requests, "stub-model")
+        line = json.loads(open(path, encoding="utf-8").readline())
+        assert line["url"] == "/v1/chat/completions" and line["body"]["messages"][0]["role"] == "user"
+
+        results, stats = run_batch_job(LocalBatchBackend(StubBatchLLM()), path, requests, "stub-model",
+                                       "generate", poll_interval_s=0.01)
+        assert results["a"].content == STORY and results["b"].usage["prompt_tokens"] == 10
+        assert (stats["status"], stats["completed"], stats["failed"]) == ("completed", 2, 0)
+
+    def test_error_line_becomes_failed_result(self):
+        custom_id, result = parse_output_line(json.dumps(
+            {"custom_id": "x", "response": {"status_code": 429, "body": {}}, "error": None}))
+        assert custom_id == "x" and result.content is None and "429" in result.error
+
+    def test_google_provider_has_no_batch_backend(self, monkeypatch):
+        monkeypatch.setattr(batch_runner, "resolve_llm_provider", lambda model=None: ("google", "gemini-2.0-flash"))
+        with pytest.raises(ValueError):
+            batch_runner.batch_backend_for("gemini-2.0-flash")
+
+
+class TestBatchEvaluation:
+    """Avaliação --batch ponta a ponta: mesmas médias do modo interativo e re-ask em job extra."""
+
+    @pytest.fixture
+    def dataset(self, dataset_head):
+        return dataset_head(3)
+
+    def test_batch_matches_interactive_averages(self, fake_provider, dataset, tmp_path):
+        import evaluate
+        interactive = evaluate.run_evaluation_for_prompt("bug_to_user_story_v2", use_cache=False, local_dataset=dataset,
+                                                         results_dir=str(tmp_path / "interactive"))
+        get_llm_registry().invalidate()
+        batch = evaluate.run_evaluation_for_prompt("bug_to_user_story_v2", use_cache=False, local_dataset=dataset,
+                                                   results_dir=str(tmp_path / "batch"), batch=True,
+                                                   batch_poll_interval_s=0.01)
+        assert batch == pytest.approx(interactive)
+        (summary,) = (tmp_path / "batch").glob("*.summary.json")
+        jobs = json.loads(summary.read_text(encoding="utf-8"))["batch"]
+        assert [job["phase"] for job in jobs] == ["generate", "judge"]
+        assert jobs[1]["requests"] == 3 * len(metrics.BATCH_JUDGE_METRICS)
+
+    def test_invalid_judgments_are_reasked_in_a_second_job(self, monkeypatch, tmp_path):
+        from local_runner import iter_jsonl_examples
+        from output_normalizer import OutputNormalizer
+        from langchain_core.prompts import PromptTemplate
+        from results_store import ResultsStore
+
+        llm = StubBatchLLM()
+        monkeypatch.setattr(batch_runner, "batch_backend_for",
+                            lambda model, temperature=0.0: (LocalBatchBackend(llm), "stub-model"))
+        metrics.configure_judge_validation(json_mode=True, reask=True)
+        stats = metrics.configure_judge_retries(max_attempts=1)
+        store = ResultsStore(str(tmp_path / "results.jsonl"))
+        examples = list(iter_jsonl_examples(os.path.join(PROJECT_ROOT, "datasets", "bug_to_user_story.jsonl")))[:2]
+
+        jobs = batch_runner.run_batch_evaluation(
+            examples, PromptTemplate.from_template("Converta: {bug_report}"), "stub", "stub", store,
+            file_prefix=str(tmp_path / "run"), normalizer=OutputNormalizer(), poll_interval_s=0.01)
+
+        assert [job["phase"] for job in jobs] == ["generate", "judge", "reask"]
+        records = store.records()
+        assert all(r["scores"]["tone"] == 0.9 for r in records)
+        assert stats.snapshot()["Tone Score"]["reasks"] == 2
+
+    def test_expired_judge_job_leaves_examples_pending(self, monkeypatch, tmp_path):
+        from local_runner import iter_jsonl_examples
+        from output_normalizer import OutputNormalizer
+        from langchain_core.prompts import PromptTemplate
+        from results_store import ResultsStore
+
+        class ExpiringJudgeBackend(LocalBatchBackend):
+            """Backend local cujo job do juiz expira sem responder o segundo exemplo."""
+
+            def _is_judge(self, job_id):
+                return self._jobs[job_id]["input_path"].endswith(".batch-judge.jsonl")
+
+            def poll(self, job_id):
+                state = super().poll(job_id)
+                if state["status"] == "completed" and self._is_judge(job_id):
+                    state["status"] = "expired"
+                return state
+
+            def results(self, job_id):
+                results = super().results(job_id)
+                if self._is_judge(job_id):
+                    results = {k: v for k, v in results.items() if not k.startswith("judge-1-")}
+                return results
+
+        llm = StubBatchLLM(valid=True)
+        monkeypatch.setattr(batch_runner, "batch_backend_for",
+                            lambda model, temperature=0.0: (ExpiringJudgeBackend(llm), "stub-model"))
+        store = ResultsStore(str(tmp_path / "results.jsonl"))
+        examples = list(iter_jsonl_examples(os.path.join(PROJECT_ROOT, "datasets", "bug_to_user_story.jsonl")))[:2]
+
+        jobs = batch_runner.run_batch_evaluation(
+            examples, PromptTemplate.from_template("Converta: {bug_report}"), "stub", "stub", store,
+            file_prefix=str(tmp_path / "run"), normalizer=OutputNormalizer(), poll_interval_s=0.01)
+
+        assert (jobs[1]["status"], jobs[1]["pending_examples"]) == ("expired", 1)
+        assert [r["example_id"] for r in store.records()] == [str(examples[0].id)]
@@ -0,0 +1,64 @@
+"""
+Testes de fumaça do benchmark do pipeline (benchmarks/bench_pipeline.py).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import bench_json_extract
+import bench_pipeline
+
+
+class TestBenchPipeline:
+    """Verifica as estatísticas e um cenário pequeno executado no próprio processo."""
+
+    def test_percentile_interpolates(self):
+        values = [0.1, 0.2, 0.3, 0.4]
+        assert bench_pipeline.percentile(values, 50) == 0.25
+        assert bench_pipeline.percentile(values, 100) == 0.4
+        assert bench_pipeline.percentile([], 95) == 0.0
+
+    def test_make_dataset_generates_unique_inputs(self, tmp_path):
+        path = tmp_path / "dataset.jsonl"
+        bench_pipeline.make_dataset(30, str(path))
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 30
+        assert len(set(lines)) == 30
+
+    def test_scenario_reports_throughput_and_latency(self, monkeypatch):
+        monkeypatch.setenv("LLM_PROVIDER", "fake")
+        monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+        monkeypatch.setenv("FAKE_LLM_JITTER_MS", "0")
+        monkeypatch.setenv("FAKE_LLM_ERROR_RATE", "0")
+        result = bench_pipeline.run_scenario("metric_functions", {"size": 5, "concurrency": 2})
+        assert result["judge_calls_per_s"] > 0
+        assert result["p95_ms"] >= result["p50_ms"]
+        assert "peak_rss_mb" in result
+
+
+class TestBenchJsonExtract:
+    """Verifica o micro-benchmark da extração de JSON com o corpus de respostas do juiz."""
+
+    def test_new_extractor_parses_at_least_what_legacy_did(self):
+        corpus = bench_json_extract.load_corpus(bench_json_extract.DEFAULT_CORPUS)
+        report = bench_json_extract.run(corpus, iterations=20)
+        categories = report["categories"]
+        assert categories["all"]["responses"] == len(corpus)
+        assert all(r["new_parsed"] >= r["legacy_parsed"] for r in categories.values())
+        assert categories["truncated"]["new_parsed"] == 0
+
+    def test_corpus_from_recorded_cassette(self, tmp_path):
+        from langchain_core.messages import HumanMessage
+        from fake_llm import FakeChatModel, RecordingChatModel
+
+        cassette = tmp_path / "cassette.jsonl"
+        recorder = RecordingChatModel(inner=FakeChatModel(seed=1), cassette_path=str(cassette))
+        recorder.invoke([HumanMessage(content='Avalie o tom.\nRetorne APENAS um objeto JSON válido no formato: {"score": 0.0}')])
+        recorder.invoke([HumanMessage(content='Bug Report: "Login falha"')])
+
+        corpus = bench_json_extract.load_cassette_corpus(cassette)
+        assert len(corpus) == 1
+        assert corpus[0]["category"] == bench_json_extract.categorize(corpus[0]["response"])
+        assert bench_json_extract.run(corpus, iterations=5)["categories"]["all"]["new_parsed"] == 1
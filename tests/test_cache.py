@@ -0,0 +1,53 @@
+"""
+Testes do cache persistente SQLite (src/cache.py).
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cache import SQLiteCache, make_cache_key
+
+
+class TestSQLiteCache:
+    """Verifica persistência, TTL, limite de entradas e modo refresh."""
+
+    def test_key_is_content_addressed(self):
+        assert make_cache_key("judge", "google", "m", "p") == make_cache_key("judge", "google", "m", "p")
+        assert make_cache_key("judge", "google", "m", "p") != make_cache_key("judge", "openai", "m", "p")
+
+    def test_roundtrip_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "c.sqlite")
+        SQLiteCache(path).set("k", {"score": 1.0})
+        cache = SQLiteCache(path)
+        assert cache.get("k") == {"score": 1.0}
+        assert cache.stats()["hits"] == 1
+
+    def test_expired_entry_is_a_miss(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / "c.sqlite"), ttl_seconds=0.01)
+        cache.set("k", "v")
+        time.sleep(0.05)
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_max_entries_evicts_least_recently_used(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / "c.sqlite"), max_entries=2)
+        cache.set("a", 1)
+        time.sleep(0.01)
+        cache.set("b", 2)
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+
+    def test_refresh_skips_reads_but_writes(self, tmp_path):
+        path = str(tmp_path / "c.sqlite")
+        SQLiteCache(path).set("k", "old")
+        cache = SQLiteCache(path, refresh=True)
+        assert cache.get("k") is None
+        cache.set("k", "new")
+        assert SQLiteCache(path).get("k") == "new"
@@ -0,0 +1,49 @@
+"""
+Testes do ponto de entrada único (python -m src) e dos imports sob demanda.
+"""
+
+import os
+import sys
+import subprocess
+import pytest
+
+PROJECT_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def run_python(code: str) -> str:
+    """Executa código em um interpretador novo (sys.modules limpo) na raiz do projeto."""
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+class TestCli:
+    """Verifica o caminho rápido (--version/--help) e o despacho dos comandos."""
+
+    def test_version_fast_path_skips_heavy_imports(self):
+        out = run_python(
+            "import sys; from src.__main__ import main; main(['--version']); "
+            "print(sorted(m for m in ('langchain_core', 'langsmith', 'langchain_openai', 'evaluate') if m in sys.modules))"
+        )
+        assert "mba-ia-pull-evaluation-prompt" in out
+        assert "Inicialização" in out
+        assert out.strip().endswith("[]")
+
+    def test_help_lists_commands(self):
+        out = run_python("from src.__main__ import main; main(['--help'])")
+        for command in ("evaluate", "compare", "pull", "push", "upload"):
+            assert command in out
+        assert "Inicialização" in out
+
+    @pytest.mark.parametrize("command", ["evaluate", "compare", "pull", "push", "upload"])
+    def test_each_command_has_main(self, command):
+        out = run_python(f"from src.__main__ import main; main(['{command}', '--help'])")
+        assert f"python -m src {command}" in out
+
+    def test_evaluate_does_not_import_unused_providers(self):
+        out = run_python(
+            "import sys; sys.path.insert(0, 'src'); import evaluate; "
+            "print(sorted(m for m in ('langchain.hub', 'langchain_openai', 'langchain_google_genai') if m in sys.modules))"
+        )
+        assert out.strip() == "[]"
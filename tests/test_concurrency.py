@@ -0,0 +1,121 @@
+"""
+Testes do controle adaptativo de concorrência (src/concurrency.py).
+"""
+
+import os
+import sys
+import asyncio
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from concurrency import AdaptiveConcurrencyController, classify_error
+from fake_llm import SimulatedProviderError
+
+
+def complete(controller, calls, error=None, latency_s=0.01):
+    for _ in range(calls):
+        controller.acquire()
+        controller.release(latency_s, error)
+
+
+class TestClassifyError:
+    """Verifica a classificação de erros do provider."""
+
+    def test_uses_status_code(self):
+        assert classify_error(SimulatedProviderError("x", 429)) == "rate_limit"
+        assert classify_error(SimulatedProviderError("x", 503)) == "server"
+
+    def test_falls_back_to_message(self):
+        assert classify_error(RuntimeError("429 Resource has been exhausted")) == "rate_limit"
+        assert classify_error(RuntimeError("The model is overloaded")) == "server"
+        assert classify_error(ValueError("JSON inválido")) == "other"
+
+    def test_client_errors_are_not_transient(self):
+        assert classify_error(SimulatedProviderError("503 no texto, mas HTTP 400", 400)) == "other"
+        for message in ("max_tokens: 15000", "payload size 5032 bytes", "quota project not set",
+                        "connection field missing"):
+            assert classify_error(RuntimeError(message)) == "other", message
+
+    def test_prefers_exception_type(self):
+        class RateLimitError(Exception):
+            pass
+
+        class APITimeoutError(ConnectionError):
+            pass
+
+        assert classify_error(RateLimitError("mensagem qualquer")) == "rate_limit"
+        assert classify_error(APITimeoutError("Request failed")) == "timeout"
+        assert classify_error(TimeoutError()) == "timeout"
+
+
+class TestAdaptiveConcurrency:
+    """Verifica o ajuste AIMD do limite e o bloqueio dos slots."""
+
+    def test_additive_increase_after_healthy_window(self):
+        controller = AdaptiveConcurrencyController(1, 8, initial_concurrency=2, verbose=False)
+        complete(controller, 2)
+        assert controller.limit == 3
+        complete(controller, 3)
+        assert controller.limit == 4
+
+    def test_multiplicative_decrease_on_rate_limit(self):
+        controller = AdaptiveConcurrencyController(1, 16, initial_concurrency=8, verbose=False)
+        complete(controller, 3, error=SimulatedProviderError("Rate limit", 429))
+        # várias 429 na mesma rajada contam como uma única redução (cooldown)
+        assert controller.limit == 4
+        assert controller.stats()["overload_errors"] == 3
+
+    def test_respects_bounds(self):
+        controller = AdaptiveConcurrencyController(2, 3, initial_concurrency=3, cooldown_s=0, verbose=False)
+        complete(controller, 30)
+        assert controller.limit == 3
+        complete(controller, 5, error=SimulatedProviderError("Service unavailable", 503))
+        assert controller.limit == 2
+
+    def test_holds_when_latency_degrades(self):
+        controller = AdaptiveConcurrencyController(1, 16, initial_concurrency=2, verbose=False)
+        complete(controller, 2, latency_s=0.01)
+        complete(controller, 20, latency_s=1.0)
+        assert controller.limit == 3
+
+    def test_other_errors_do_not_shrink_but_stop_growth(self):
+        controller = AdaptiveConcurrencyController(1, 16, initial_concurrency=4, verbose=False)
+        complete(controller, 4, error=ValueError("resposta inválida"))
+        assert controller.limit == 4
+
+    def test_slot_blocks_beyond_limit(self):
+        controller = AdaptiveConcurrencyController(1, 2, initial_concurrency=2, verbose=False)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def call():
+            with controller.slot():
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.02)
+                with lock:
+                    active.pop()
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert max(peak) <= 2
+
+    def test_async_slot_records_errors(self):
+        controller = AdaptiveConcurrencyController(1, 8, initial_concurrency=4, verbose=False)
+
+        async def failing():
+            async with controller.aslot():
+                raise SimulatedProviderError("Rate limit", 429)
+
+        with pytest.raises(SimulatedProviderError):
+            asyncio.run(failing())
+        assert controller.limit == 2
+        assert controller.in_flight == 0
@@ -0,0 +1,101 @@
+"""
+Testes do cache de contexto do prefixo estático do gerador (src/context_cache.py).
+"""
+
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from langchain_core.prompts import PromptTemplate
+from context_cache import ContextCacheManager, prompt_static_prefix, split_static_prefix
+from fake_llm import FakeChatModel
+from llm_registry import get_llm_registry
+from prompt_loader import load_prompt_file
+
+PROJECT_ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+class TestStaticPrefix:
+    """Verifica a separação do template em prefixo estático e parte variável."""
+
+    def test_v2_prefix_holds_rules_and_examples(self):
+        prompt = load_prompt_file(os.path.join(PROJECT_ROOT, "prompts", "bug_to_user_story_v2.yml"))
+        prefix = prompt_static_prefix(prompt)
+        text = prompt.format(bug_report="Erro 500 no checkout")
+        assert "REGRAS CRITICAS" in prefix and "{bug_report}" not in prefix
+        assert split_static_prefix(text, prefix) == (prefix, 'Bug Report: "Erro 500 no checkout"\n')
+
+    def test_template_starting_with_variable_has_no_prefix(self):
+        prompt = PromptTemplate.from_template("{bug_report}\nConverta em user story.")
+        assert prompt_static_prefix(prompt) == ""
+        assert split_static_prefix("qualquer texto", "") == ("", "qualquer texto")
+
+    def test_context_is_created_once_per_client_and_prefix(self):
+        manager = ContextCacheManager()
+        llm = FakeChatModel(prefix_cache_min_tokens=8)
+        first = manager.handle_for(llm, "prefixo estático " * 10)
+        assert manager.handle_for(llm, "prefixo estático " * 10) == first
+        assert manager.handle_for(FakeChatModel(prefix_cache_min_tokens=10_000), "curto") is None
+        assert manager.stats() == {"created": 1, "reused": 1, "fallbacks": 1}
+
+    def test_close_deletes_created_contexts(self):
+        manager = ContextCacheManager()
+        llm = FakeChatModel(prefix_cache_min_tokens=8)
+        handle = manager.handle_for(llm, "prefixo estático " * 10)
+        assert handle in llm._contexts
+        assert manager.close() == 1
+        assert llm._contexts == {}
+        assert manager.close() == 0
+
+
+class TestGenerationContextCache:
+    """Avaliação offline com --context-cache: mesmas gerações, prefixo registrado uma vez."""
+
+    @pytest.fixture
+    def offline_run(self, fake_provider, dataset_head, tmp_path):
+        import evaluate
+
+        dataset = dataset_head(4)
+
+        def run(context_cache):
+            get_llm_registry().invalidate()
+            results_dir = tmp_path / ("context" if context_cache else "plain")
+            evaluate.run_evaluation_for_prompt("bug_to_user_story_v2", use_cache=False, local_dataset=dataset,
+                                               results_dir=str(results_dir), context_cache=context_cache)
+            (summary,) = results_dir.glob("*.summary.json")
+            (results,) = results_dir.glob("*-eval-*.jsonl")
+            records = [json.loads(line) for line in results.read_text(encoding="utf-8").splitlines()]
+            return json.loads(summary.read_text(encoding="utf-8")), records
+
+        return run
+
+    def test_prefix_is_registered_once_per_run(self, offline_run):
+        summary, records = offline_run(context_cache=True)
+        generator = summary["context_cache"]["generator"]
+        assert (generator["created"], generator["reused"], generator["fallbacks"]) == (1, 3, 0)
+        assert generator["cached_tokens"] >= 4 * generator["prefix_tokens"] * 0.9
+
+        baseline, baseline_records = offline_run(context_cache=False)
+        assert baseline["context_cache"] is None
+        outputs = lambda rs: sorted((r["example_id"], r["output"]) for r in rs)
+        assert outputs(records) == outputs(baseline_records)
+
+    def test_run_deletes_its_contexts(self, offline_run, monkeypatch):
+        created, deleted = [], []
+        original_create, original_delete = FakeChatModel.create_cached_context, FakeChatModel.delete_cached_context
+
+        def create(self, prefix, ttl_s=3600):
+            created.append(original_create(self, prefix, ttl_s=ttl_s))
+            return created[-1]
+
+        def delete(self, name):
+            original_delete(self, name)
+            deleted.append(name)
+
+        monkeypatch.setattr(FakeChatModel, "create_cached_context", create)
+        monkeypatch.setattr(FakeChatModel, "delete_cached_context", delete)
+        offline_run(context_cache=True)
+        assert created and sorted(deleted) == sorted(created)
@@ -0,0 +1,76 @@
+"""
+Testes do corte da geração em </user_story> (src/early_stop.py).
+"""
+
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from early_stop import CLOSE_TAG, EarlyStopStats, stop_sequences_for
+
+STORY = "<user_story>\n# Corrigir login\n\n**Como** um cliente, **Eu quero** entrar, **Para que** eu compre.\n"
+TRAILING = "\n\nExplicação: escolhi esta persona porque o bug afeta clientes. " * 20
+
+
+class TestEarlyStopStats:
+    """Verifica a escolha das stop sequences e a contagem das gerações."""
+
+    def test_only_prompts_with_the_tag_get_stop_sequences(self):
+        assert stop_sequences_for("Responda em <user_story>...</user_story>") == [CLOSE_TAG]
+        assert stop_sequences_for("# Titulo da User Story") == []
+
+    def test_counts_stopped_generations_and_trailing_tokens(self):
+        stats = EarlyStopStats([CLOSE_TAG])
+        stats.record(STORY)
+        stats.record(STORY + CLOSE_TAG + TRAILING)
+        stats.record("# Sem tags")
+        result = stats.stats()
+        assert (result["generations"], result["stopped"]) == (3, 1)
+        assert result["trailing_tokens"] == len(TRAILING.strip()) // 4
+
+
+class TestStopSequencesInEvaluation:
+    """Geração com tags no provider simulado: cortada na tag e ainda extraída para os juízes."""
+
+    @pytest.fixture
+    def tagged_run(self, fake_provider, dataset_head, monkeypatch, tmp_path):
+        from langchain_core.prompts import PromptTemplate
+        import evaluate
+
+        responses = tmp_path / "responses.jsonl"
+        responses.write_text(json.dumps({"match": "RESPONDA_COM_TAGS", "response": STORY + CLOSE_TAG + TRAILING}) + "\n")
+        dataset = dataset_head(3)
+
+        monkeypatch.setenv("FAKE_LLM_RESPONSES", str(responses))
+        template = PromptTemplate.from_template("RESPONDA_COM_TAGS em <user_story>...</user_story>\n{bug_report}")
+        monkeypatch.setattr(evaluate, "load_prompt_file", lambda path: template)
+
+        def run(stop_sequences):
+            results_dir = tmp_path / ("stop" if stop_sequences else "no-stop")
+            evaluate.run_evaluation_for_prompt("tagged", use_cache=False, local_dataset=dataset,
+                                               results_dir=str(results_dir), stop_sequences=stop_sequences)
+            (summary,) = results_dir.glob("*.summary.json")
+            (results,) = results_dir.glob("*-eval-*.jsonl")
+            records = [json.loads(line) for line in results.read_text(encoding="utf-8").splitlines()]
+            return json.loads(summary.read_text(encoding="utf-8")), records
+
+        return run
+
+    def test_generation_stops_at_closing_tag(self, tagged_run):
+        summary, records = tagged_run(stop_sequences=True)
+        assert summary["early_stop"] == {"enabled": True, "generations": 3, "stopped": 3, "trailing_tokens": 0}
+        assert all("Explicação" not in r["output"] and CLOSE_TAG not in r["output"] for r in records)
+
+        baseline, _ = tagged_run(stop_sequences=False)
+        assert baseline["early_stop"]["stopped"] == 0
+        assert baseline["early_stop"]["trailing_tokens"] > 0
+        generated = lambda s: s["usage"]["stages"]["generate"]["completion_tokens"]
+        assert generated(summary) < generated(baseline)
+
+    def test_unclosed_tag_is_still_extracted(self):
+        from evaluate import clean_generated_story
+        assert clean_generated_story(STORY).startswith("# Corrigir login")
+        assert clean_generated_story(STORY + CLOSE_TAG + TRAILING).endswith("eu compre.")
@@ -0,0 +1,137 @@
+"""
+Testes do GlobalEvaluator (src/evaluate.py) com métricas simuladas.
+"""
+
+import os
+import sys
+import time
+import asyncio
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import evaluate
+
+
+def make_run_and_example(output="# Titulo\n\n**Como** cliente, **Eu quero** comprar, **Para que** receba."):
+    run = SimpleNamespace(outputs={"output": output})
+    example = SimpleNamespace(inputs={"bug_report": "bug"}, outputs={"reference": "ref"})
+    return run, example
+
+
+class TestAsyncGlobalEvaluator:
+    """Verifica que as métricas de um exemplo rodam em paralelo no modo assíncrono."""
+
+    def test_metrics_run_concurrently(self, monkeypatch):
+        async def slow_metric(bug_report, user_story, reference, model=None):
+            await asyncio.sleep(0.1)
+            return {"score": 1.0, "reasoning": "ok"}
+
+        monkeypatch.setattr(evaluate, "ASYNC_METRIC_FUNCS", [(f"m{i}", slow_metric) for i in range(5)])
+        evaluator = evaluate.AsyncGlobalEvaluator(model_name="stub", max_concurrent_judges=5)
+        run, example = make_run_and_example()
+
+        start = time.perf_counter()
+        result = asyncio.run(evaluator.aevaluate_run(run, example))
+        elapsed = time.perf_counter() - start
+
+        assert [r.key for r in result["results"]] == [f"m{i}" for i in range(5)]
+        assert elapsed < 0.3
+
+    def test_semaphore_limits_concurrent_judges(self, monkeypatch):
+        active = {"now": 0, "max": 0}
+
+        async def tracked_metric(bug_report, user_story, reference, model=None):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            return {"score": 1.0, "reasoning": "ok"}
+
+        monkeypatch.setattr(evaluate, "ASYNC_METRIC_FUNCS", [(f"m{i}", tracked_metric) for i in range(5)])
+        evaluator = evaluate.AsyncGlobalEvaluator(model_name="stub", max_concurrent_judges=2)
+        asyncio.run(evaluator.aevaluate_run(*make_run_and_example()))
+        assert active["max"] == 2
+
+
+class TestPrecheck:
+    """Verifica que saídas estruturalmente quebradas não chegam ao juiz."""
+
+    def test_broken_output_skips_judge(self, monkeypatch):
+        judged = []
+
+        def metric(name):
+            def func(bug_report, user_story, reference, model=None):
+                judged.append(name)
+                return {"score": 1.0, "reasoning": "ok"}
+            return func
+
+        names = ["tone", "acceptance_criteria", "user_story_format"]
+        monkeypatch.setattr(evaluate, "METRIC_FUNCS", [(n, metric(n)) for n in names])
+        evaluator = evaluate.GlobalEvaluator(model_name="stub")
+        result = evaluator.evaluate_run(*make_run_and_example("Desculpe, não consigo ajudar com isso."))
+
+        assert judged == ["tone"]
+        scores = {r.key: r.score for r in result["results"]}
+        assert scores["tone"] == 1.0
+        assert scores["user_story_format"] < 0.9
+        assert evaluator.prechecker.stats()["acceptance_criteria"]["short_circuited"] == 1
+
+    def test_precheck_can_be_disabled(self, monkeypatch):
+        judged = []
+
+        def func(bug_report, user_story, reference, model=None):
+            judged.append(1)
+            return {"score": 1.0, "reasoning": "ok"}
+
+        monkeypatch.setattr(evaluate, "METRIC_FUNCS", [("user_story_format", func)])
+        evaluator = evaluate.GlobalEvaluator(model_name="stub", precheck=False)
+        evaluator.evaluate_run(*make_run_and_example("Desculpe, não consigo ajudar com isso."))
+        assert judged == [1]
+
+
+class TestGenerationCache:
+    """Cache persistente das gerações: a segunda execução do mesmo prompt não chama o gerador."""
+
+    def test_second_run_makes_no_generate_calls(self, fake_provider, dataset_head, monkeypatch, tmp_path):
+        import json
+
+        dataset = dataset_head(3)
+        monkeypatch.setenv("GENERATION_CACHE_PATH", str(tmp_path / "generation.sqlite"))
+        monkeypatch.setenv("JUDGE_CACHE_PATH", str(tmp_path / "judge.sqlite"))
+
+        def run(name):
+            results_dir = tmp_path / name
+            evaluate.run_evaluation_for_prompt("bug_to_user_story_v2", local_dataset=dataset,
+                                               results_dir=str(results_dir))
+            (summary,) = results_dir.glob("*.summary.json")
+            (results,) = results_dir.glob("*-eval-*.jsonl")
+            outputs = {json.loads(line)["example_id"]: json.loads(line)["output"]
+                       for line in results.read_text(encoding="utf-8").splitlines()}
+            return json.loads(summary.read_text(encoding="utf-8"))["usage"]["stages"], outputs
+
+        try:
+            first_stages, first_outputs = run("first")
+            second_stages, second_outputs = run("second")
+        finally:
+            evaluate.configure_generation_cache(enabled=False)
+
+        assert first_stages["generate"]["calls"] == 3
+        assert second_stages.get("generate", {}).get("calls", 0) == 0
+        assert second_outputs == first_outputs
+
+    def test_key_changes_with_template_model_and_stop(self):
+        base = evaluate.generation_cache_key_prefix("Template {bug_report}", "fake", "fake-model", 0.0,
+                                                    ["</user_story>"])
+        variants = [
+            evaluate.generation_cache_key_prefix("Outro template {bug_report}", "fake", "fake-model", 0.0,
+                                                 ["</user_story>"]),
+            evaluate.generation_cache_key_prefix("Template {bug_report}", "fake", "outro-modelo", 0.0,
+                                                 ["</user_story>"]),
+            evaluate.generation_cache_key_prefix("Template {bug_report}", "fake", "fake-model", 0.0, []),
+            evaluate.generation_cache_key_prefix("Template {bug_report}", "fake", "fake-model", 0.0, ["FIM"]),
+        ]
+        keys = {evaluate.make_cache_key(*prefix, {"bug_report": "bug"}) for prefix in [base] + variants}
+        assert len(keys) == 5
+        assert base == evaluate.generation_cache_key_prefix("Template {bug_report}", "fake", "fake-model", 0.0,
+                                                            ["</user_story>"])
@@ -0,0 +1,89 @@
+"""
+Testes dos providers locais (src/fake_llm.py) e da avaliação offline ponta a ponta.
+"""
+
+import os
+import sys
+import json
+import pytest
+from langchain_core.messages import HumanMessage
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fake_llm import (
+    FakeChatModel, RecordingChatModel, ReplayChatModel,
+    SimulatedProviderError, CassetteMissError
+)
+import utils
+
+
+class TestFakeChatModel:
+    """Verifica determinismo, respostas sintéticas e erros simulados."""
+
+    def test_same_seed_gives_same_responses(self):
+        prompt = [HumanMessage(content='Bug Report: "Erro 500 no checkout"')]
+        first = FakeChatModel(seed=7).invoke(prompt).content
+        second = FakeChatModel(seed=7).invoke(prompt).content
+        assert first == second
+        assert first.startswith("# ") and "**Como**" in first
+
+    def test_judge_prompt_gets_json(self):
+        content = FakeChatModel().invoke([HumanMessage(content='Retorne APENAS um objeto JSON "precision"')]).content
+        assert set(json.loads(content)) == {"precision", "recall", "reasoning"}
+
+    def test_reports_usage_metadata(self):
+        message = FakeChatModel().invoke([HumanMessage(content="x" * 400)])
+        assert message.usage_metadata["input_tokens"] == 100
+
+    def test_error_rate_raises_simulated_errors(self):
+        with pytest.raises(SimulatedProviderError) as exc:
+            FakeChatModel(error_rate=1.0).invoke([HumanMessage(content="oi")])
+        assert exc.value.status_code in (429, 503)
+
+
+class TestCassette:
+    """Verifica gravação e reprodução exata via cassette."""
+
+    def test_record_then_replay(self, tmp_path):
+        cassette = str(tmp_path / "cassette.jsonl")
+        prompt = [HumanMessage(content='Bug Report: "Login falha"')]
+        recorded = RecordingChatModel(inner=FakeChatModel(seed=3), cassette_path=cassette).invoke(prompt)
+        replayed = ReplayChatModel(cassette_path=cassette).invoke(prompt)
+        assert replayed.content == recorded.content
+
+    def test_key_separates_model_and_json_mode(self, tmp_path):
+        cassette = str(tmp_path / "cassette.jsonl")
+        prompt = [HumanMessage(content='Avalie. Retorne APENAS um objeto JSON')]
+        RecordingChatModel(inner=FakeChatModel(seed=3), cassette_path=cassette, model_name="gpt-4o").invoke(
+            prompt, response_format={"type": "json_object"})
+        replay = ReplayChatModel(cassette_path=cassette, model_name="gpt-4o")
+        assert replay.invoke(prompt, json_mode=True).content
+        with pytest.raises(CassetteMissError):
+            replay.invoke(prompt)
+        with pytest.raises(CassetteMissError):
+            ReplayChatModel(cassette_path=cassette, model_name="gemini-2.0-flash").invoke(prompt, json_mode=True)
+
+    def test_replay_miss_raises(self, tmp_path):
+        cassette = tmp_path / "cassette.jsonl"
+        cassette.write_text("", encoding="utf-8")
+        with pytest.raises(CassetteMissError):
+            ReplayChatModel(cassette_path=str(cassette)).invoke([HumanMessage(content="nunca gravado")])
+
+
+class TestFakeProviderSelection:
+    """Verifica LLM_PROVIDER=fake em utils.get_llm e o pipeline offline completo."""
+
+    def test_get_llm_returns_fake_model(self, fake_provider):
+        assert isinstance(utils.get_llm(), FakeChatModel)
+        assert utils.resolve_llm_provider("gemini-2.0-flash") == ("fake", "gemini-2.0-flash")
+
+    def test_local_evaluation_runs_offline(self, fake_provider, tmp_path):
+        import evaluate
+        scores = evaluate.run_evaluation_for_prompt(
+            "bug_to_user_story_v2",
+            use_cache=False,
+            local_dataset="datasets/bug_to_user_story.jsonl",
+            results_dir=str(tmp_path),
+        )
+        assert set(scores) == {"tone", "acceptance_criteria", "user_story_format", "completeness", "f1_score"}
+        assert all(0.85 <= v <= 1.0 for v in scores.values())
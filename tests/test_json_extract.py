@@ -0,0 +1,53 @@
+"""
+Testes da extração de JSON das respostas do juiz (src/json_extract.py).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from json_extract import (
+    EMPTY, INVALID_JSON, NO_OBJECT, TRUNCATED,
+    extract_json, extract_json_from_response, iter_json_objects,
+)
+
+
+class TestExtractJson:
+    """Verifica os formatos de resposta suportados e as falhas estruturadas."""
+
+    def test_clean_json_uses_fast_path(self):
+        result = extract_json('  {"score": 0.9, "reasoning": "ok"}\n')
+        assert result.ok
+        assert result.data == {"score": 0.9, "reasoning": "ok"}
+        assert result.strategy == "direct"
+
+    def test_markdown_fence_and_surrounding_text(self):
+        text = 'Segue a avaliação:\n```json\n{"precision": 0.9, "recall": 0.8}\n```\nFim.'
+        assert extract_json_from_response(text) == {"precision": 0.9, "recall": 0.8}
+
+    def test_braces_inside_strings_are_ignored(self):
+        text = 'Nota: {"score": 0.7, "reasoning": "usa {role} e \\"}\\" no texto"} e {outra coisa}'
+        result = extract_json(text)
+        assert result.data == {"score": 0.7, "reasoning": 'usa {role} e "}" no texto'}
+        assert result.strategy == "scan"
+
+    def test_first_valid_object_wins(self):
+        text = 'Formato: {score: X}. Resposta: {"score": 0.5} e depois {"score": 0.1}'
+        assert extract_json(text).data == {"score": 0.5}
+
+    def test_nested_fused_response(self):
+        text = '```json\n{"tone": {"score": 0.9}, "f1_score": {"precision": 1.0, "recall": 0.5}}\n```'
+        assert extract_json(text).data["f1_score"] == {"precision": 1.0, "recall": 0.5}
+
+    def test_failures_are_structured(self):
+        assert extract_json("").error == EMPTY
+        assert extract_json(None).error == EMPTY
+        assert extract_json("Score: 0.9").error == NO_OBJECT
+        assert extract_json('{"score": 0.9, "reasoning": "cortad').error == TRUNCATED
+        assert extract_json("{score: 0.9}").error == INVALID_JSON
+        assert extract_json_from_response("sem json") is None
+
+    def test_iter_json_objects_spans(self):
+        text = 'a {"x": {"y": 1}} b {"z": "}"} c {'
+        assert list(iter_json_objects(text)) == [(2, 17), (20, 30), (33, -1)]
@@ -0,0 +1,83 @@
+"""
+Testes do registro de clientes LLM (src/llm_registry.py) e de sua
+integração com utils.get_llm.
+"""
+
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_registry import LLMClientRegistry, get_llm_registry
+import utils
+
+
+class TestLLMClientRegistry:
+    """Verifica hit/miss, thread-safety e invalidação do registro."""
+
+    def test_key_ignores_extra_params_order(self):
+        k1 = LLMClientRegistry.make_key("openai", "gpt-4o", 0, {"a": 1, "b": 2})
+        k2 = LLMClientRegistry.make_key("openai", "gpt-4o", 0.0, {"b": 2, "a": 1})
+        assert k1 == k2
+
+    def test_reuses_client_for_same_key(self):
+        registry = LLMClientRegistry()
+        key = registry.make_key("openai", "gpt-4o", 0.0)
+        first = registry.get_or_create(key, object)
+        second = registry.get_or_create(key, object)
+        assert first is second
+        assert registry.stats()["hits"] == 1
+        assert registry.stats()["misses"] == 1
+
+    def test_concurrent_first_use_builds_once(self):
+        registry = LLMClientRegistry()
+        key = registry.make_key("google", "gemini-2.0-flash", 0.0)
+        built = []
+
+        def factory():
+            built.append(1)
+            return object()
+
+        threads = [threading.Thread(target=registry.get_or_create, args=(key, factory)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(built) == 1
+        assert registry.stats()["hits"] == 7
+
+    def test_invalidate_by_provider(self):
+        registry = LLMClientRegistry()
+        registry.get_or_create(registry.make_key("openai", "gpt-4o", 0.0), object)
+        registry.get_or_create(registry.make_key("google", "gemini-2.0-flash", 0.0), object)
+        assert registry.invalidate(provider="openai") == 1
+        assert registry.stats()["clients"] == 1
+        assert registry.invalidate() == 1
+
+
+class TestGetLLMRegistry:
+    """Verifica que utils.get_llm devolve clientes reaproveitados."""
+
+    @pytest.fixture(autouse=True)
+    def openai_env(self, monkeypatch):
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+        monkeypatch.delenv("LLM_MODEL", raising=False)
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        get_llm_registry().invalidate()
+        yield
+        get_llm_registry().invalidate()
+
+    def test_same_params_return_same_client(self):
+        assert utils.get_llm(model="gpt-4o-mini") is utils.get_eval_llm(model="gpt-4o-mini")
+
+    def test_different_temperature_returns_new_client(self):
+        assert utils.get_llm(model="gpt-4o-mini", temperature=0.0) is not \
+            utils.get_llm(model="gpt-4o-mini", temperature=0.7)
+
+    def test_resolve_provider_without_keys_raises(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY")
+        with pytest.raises(ValueError):
+            utils.resolve_llm_provider()
@@ -0,0 +1,71 @@
+"""
+Testes do runner de avaliação local (src/local_runner.py).
+"""
+
+import os
+import sys
+import json
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from langsmith.evaluation import EvaluationResult
+from local_runner import iter_jsonl_examples, run_local_evaluation
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), '..', 'datasets', 'bug_to_user_story.jsonl')
+
+
+class EchoEvaluator:
+    """Avaliador simulado: score 1.0 se a saída contém o bug report."""
+
+    def evaluate_run(self, run, example):
+        score = 1.0 if example.inputs["bug_report"] in run.outputs["output"] else 0.0
+        return {"results": [EvaluationResult(key="echo", score=score, comment="ok")]}
+
+
+class TestLocalRunner:
+    """Verifica leitura do JSONL, pool limitado e gravação dos resultados."""
+
+    def test_streams_repository_dataset(self):
+        examples = list(iter_jsonl_examples(DATASET_PATH))
+        assert len(examples) == 34
+        assert all(e.inputs.get("bug_report") for e in examples)
+        assert len({e.id for e in examples}) == 34
+
+    def test_evaluates_and_writes_results(self, tmp_path):
+        output = tmp_path / "results.jsonl"
+        rows = run_local_evaluation(
+            lambda inputs: {"output": f"story for {inputs['bug_report']}"},
+            iter_jsonl_examples(DATASET_PATH),
+            EchoEvaluator(),
+            max_workers=3,
+            output_path=str(output),
+        )
+        assert rows == []  # com arquivo de saída, os resultados não ficam em memória
+        records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+        assert len(records) == 34
+        assert all(r["scores"] == {"echo": 1.0} for r in records)
+
+    def test_respects_worker_bound(self):
+        active = {"now": 0, "max": 0}
+        lock = threading.Lock()
+
+        def target(inputs):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.01)
+            with lock:
+                active["now"] -= 1
+            return {"output": inputs["bug_report"]}
+
+        run_local_evaluation(target, iter_jsonl_examples(DATASET_PATH), EchoEvaluator(), max_workers=2)
+        assert active["max"] <= 2
+
+    def test_target_error_is_recorded(self):
+        def failing_target(inputs):
+            raise RuntimeError("boom")
+
+        rows = run_local_evaluation(failing_target, list(iter_jsonl_examples(DATASET_PATH))[:2], EchoEvaluator())
+        assert all(row["run"].error == "boom" for row in rows)
@@ -0,0 +1,281 @@
+"""
+Testes das métricas LLM-as-Judge (src/metrics.py) com um juiz simulado.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import metrics
+
+
+class StubResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubJudge:
+    """Juiz simulado que devolve respostas pré-definidas e conta as chamadas."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def invoke(self, messages):
+        self.prompts.append(messages[-1].content)
+        return StubResponse(self.responses[min(len(self.prompts), len(self.responses)) - 1])
+
+
+@pytest.fixture
+def judge(monkeypatch):
+    def install(*responses):
+        stub = StubJudge(*responses)
+        monkeypatch.setattr(metrics, "get_evaluator_llm", lambda model=None: stub)
+        return stub
+    return install
+
+
+class TestFusedJudge:
+    """Verifica o modo fused (uma chamada ao juiz para várias métricas)."""
+
+    def test_scores_all_metrics_in_one_call(self, judge):
+        stub = judge(json.dumps({
+            "tone": {"score": 0.9, "reasoning": "ok"},
+            "f1_score": {"precision": 0.8, "recall": 1.0, "reasoning": "ok"},
+        }))
+        result = metrics.evaluate_fused_scores("bug", "story", "ref", metrics=["tone", "f1_score"])
+        assert len(stub.prompts) == 1
+        assert result["tone"] == {"score": 0.9, "reasoning": "ok"}
+        assert result["f1_score"]["score"] == pytest.approx(0.8889, abs=1e-4)
+
+    def test_missing_metric_is_left_for_fallback(self, judge):
+        judge(json.dumps({"tone": {"score": 0.9}, "completeness": {"reasoning": "sem score"}}))
+        result = metrics.evaluate_fused_scores("bug", "story", "ref", metrics=["tone", "completeness"])
+        assert "tone" in result
+        assert "completeness" not in result
+
+    def test_unknown_metric_raises(self):
+        with pytest.raises(ValueError):
+            metrics.evaluate_fused_scores("bug", "story", "ref", metrics=["clarity"])
+
+
+class TestJudgeCache:
+    """Verifica o cache persistente das respostas do juiz."""
+
+    @pytest.fixture(autouse=True)
+    def judge_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("JUDGE_CACHE_PATH", str(tmp_path / "judge.sqlite"))
+        monkeypatch.setattr(metrics, "resolve_llm_provider", lambda model=None: ("stub", model or "stub-model"))
+        yield metrics.configure_judge_cache(enabled=True)
+        metrics.configure_judge_cache(enabled=False)
+
+    def test_unchanged_prompt_is_served_from_cache(self, judge, judge_cache):
+        stub = judge('{"score": 0.9, "reasoning": "ok"}')
+        first = metrics.evaluate_tone_score("bug", "story", "ref")
+        second = metrics.evaluate_tone_score("bug", "story", "ref")
+        assert first == second
+        assert len(stub.prompts) == 1
+        assert judge_cache.stats()["hits"] == 1
+
+    def test_invalid_response_is_not_cached(self, judge, monkeypatch):
+        monkeypatch.setattr(metrics, "_reask", False)
+        stub = judge('{"score": 0.9, "reason', '{"score": 0.9, "reasoning": "ok"}')
+        assert metrics.evaluate_tone_score("bug", "story", "ref")["score"] == 0.0
+        assert metrics.evaluate_tone_score("bug", "story", "ref")["score"] == 0.9
+        assert len(stub.prompts) == 2
+        assert metrics.evaluate_tone_score("bug", "story", "ref")["score"] == 0.9
+        assert len(stub.prompts) == 2
+
+    def test_invalid_reask_response_is_not_cached(self, judge, monkeypatch):
+        monkeypatch.setattr(metrics, "_reask", True)
+        stub = judge("sem json", "ainda sem json", "sem json", '{"score": 0.7, "reasoning": "ok"}')
+        assert metrics.evaluate_tone_score("bug", "story", "ref")["score"] == 0.0
+        assert metrics.evaluate_tone_score("bug", "story", "ref")["score"] == 0.7
+        assert len(stub.prompts) == 4
+
+    def test_changed_story_is_judged_again(self, judge):
+        stub = judge('{"score": 0.9, "reasoning": "ok"}')
+        metrics.evaluate_tone_score("bug", "story", "ref")
+        metrics.evaluate_tone_score("bug", "story v2", "ref")
+        assert len(stub.prompts) == 2
+
+
+class TestAsyncMetrics:
+    """Verifica as versões assíncronas das métricas."""
+
+    def test_async_metric_matches_sync(self, judge, monkeypatch):
+        stub = judge('{"score": 0.8, "reasoning": "ok"}')
+
+        async def ainvoke(messages):
+            return stub.invoke(messages)
+
+        stub.ainvoke = ainvoke
+        sync_result = metrics.evaluate_completeness_score("bug", "story", "ref")
+        async_result = asyncio.run(metrics.aevaluate_completeness_score("bug", "story", "ref"))
+        assert sync_result == async_result
+        assert stub.prompts[0] == stub.prompts[1]
+
+
+class TestJudgeRetries:
+    """Verifica que só falhas definitivas viram score 0.0."""
+
+    @pytest.fixture(autouse=True)
+    def fast_retries(self, monkeypatch):
+        from retry import RetryPolicy
+        stats = metrics.configure_judge_retries(max_attempts=3)
+        monkeypatch.setattr(metrics, "_retry_policy", RetryPolicy(
+            max_attempts=3, base_delays={"rate_limit": 0.001, "server": 0.001}))
+        return stats
+
+    def test_transient_error_is_retried(self, judge, fast_retries):
+        from fake_llm import SimulatedProviderError
+        stub = judge('{"score": 0.9, "reasoning": "ok"}')
+        original = stub.invoke
+        failures = [SimulatedProviderError("Rate limit", 429)]
+
+        def invoke(messages):
+            if failures:
+                raise failures.pop()
+            return original(messages)
+
+        stub.invoke = invoke
+        assert metrics.evaluate_tone_score("bug", "story", "ref")["score"] == 0.9
+        assert fast_retries.snapshot()["Tone Score"]["retries"] == 1
+
+    def test_terminal_failure_is_scored_zero(self, judge, fast_retries):
+        stub = judge('{"score": 0.9}')
+
+        def invoke(messages):
+            raise ValueError("requisição inválida")
+
+        stub.invoke = invoke
+        assert metrics.evaluate_tone_score("bug", "story", "ref")["score"] == 0.0
+        assert fast_retries.snapshot()["Tone Score"]["failures"] == 1
+
+    def test_response_without_json_is_counted_as_parse_failure(self, judge, fast_retries):
+        judge('{"score": 0.9, "reasoning": "a resposta foi cortada')
+        result = metrics.evaluate_tone_score("bug", "story", "ref")
+        assert result["score"] == 0.0
+        assert "truncated" in result["reasoning"]
+        counters = fast_retries.snapshot()["Tone Score"]
+        assert counters["reasks"] == 1
+        assert counters["parse_failures"] == 1
+        assert counters["failures"] == 0
+
+
+class TestJudgeSchemaValidation:
+    """Verifica a validação por schema e o re-ask único de respostas inválidas."""
+
+    @pytest.fixture(autouse=True)
+    def stats(self):
+        metrics.configure_judge_validation(json_mode=True, reask=True)
+        return metrics.configure_judge_retries(max_attempts=1)
+
+    def test_out_of_range_score_is_reasked_once(self, judge, stats):
+        stub = judge('{"score": 7, "reasoning": "nota de 0 a 10"}', '{"score": 0.7, "reasoning": "ok"}')
+        result = metrics.evaluate_tone_score("bug", "story", "ref")
+        assert result == {"score": 0.7, "reasoning": "ok"}
+        assert len(stub.prompts) == 2
+        assert "score" in stub.prompts[1] and "less than or equal to 1" in stub.prompts[1]
+        counters = stats.snapshot()["Tone Score"]
+        assert (counters["invalid_responses"], counters["reasks"], counters["parse_failures"]) == (1, 1, 0)
+
+    def test_f1_requires_precision_and_recall(self, judge, stats):
+        judge('{"precision": 0.8, "reasoning": "sem recall"}')
+        result = metrics.evaluate_f1_score("bug", "story", "ref")
+        assert result["score"] == 0.0
+        assert "recall" in result["reasoning"]
+        assert stats.snapshot()["F1-Score"]["parse_failures"] == 1
+
+    def test_without_reask_invalid_response_scores_zero(self, judge, stats):
+        metrics.configure_judge_validation(reask=False)
+        try:
+            stub = judge('{"reasoning": "sem score"}', '{"score": 0.9}')
+            assert metrics.evaluate_tone_score("bug", "story", "ref")["score"] == 0.0
+            assert len(stub.prompts) == 1
+        finally:
+            metrics.configure_judge_validation()
+
+    def test_fused_reask_fills_missing_metrics(self, judge, stats):
+        stub = judge(json.dumps({"tone": {"score": 0.9, "reasoning": "ok"}}),
+                     json.dumps({"completeness": {"score": 0.8, "reasoning": "ok"}}))
+        result = metrics.evaluate_fused_scores("bug", "story", "ref", metrics=["tone", "completeness"])
+        assert len(stub.prompts) == 2
+        assert "completeness" in stub.prompts[1]
+        assert result["tone"]["score"] == 0.9
+        assert result["completeness"]["score"] == 0.8
+
+    def test_json_mode_kwargs_by_client_type(self):
+        from types import SimpleNamespace
+        from utils import json_mode_kwargs
+        assert json_mode_kwargs(SimpleNamespace(_llm_type="openai-chat")) == {"response_format": {"type": "json_object"}}
+        assert "generation_config" in json_mode_kwargs(SimpleNamespace(_llm_type="chat-google-generative-ai"))
+        assert json_mode_kwargs(SimpleNamespace(_llm_type="fake-chat")) == {}
+
+
+class TestPrefixCacheLayout:
+    """Verifica o layout prefixo estático + parte variável e o cache de contexto do juiz."""
+
+    TEMPLATES = ["F1_SCORE_PROMPT", "CLARITY_PROMPT", "PRECISION_PROMPT", "TONE_PROMPT",
+                 "ACCEPTANCE_CRITERIA_PROMPT", "USER_STORY_FORMAT_PROMPT", "COMPLETENESS_PROMPT"]
+
+    @staticmethod
+    def render(template, tag):
+        values = dict(question=f"q{tag}", answer=f"a{tag}", reference=f"r{tag}",
+                      bug_report=f"b{tag}", user_story=f"s{tag}")
+        return template.format(**values)
+
+    @pytest.fixture
+    def fake_judge(self, monkeypatch):
+        from fake_llm import FakeChatModel
+        metrics.configure_judge_validation(json_mode=True, reask=True)
+        metrics.configure_judge_retries(max_attempts=1)
+        llm = FakeChatModel(prefix_cache_min_tokens=64)
+        monkeypatch.setattr(metrics, "get_evaluator_llm", lambda model=None: llm)
+        yield llm
+        metrics.configure_judge_context_cache(enabled=False)
+
+    @pytest.mark.parametrize("name", TEMPLATES)
+    def test_static_prefix_is_identical_across_examples(self, name):
+        template = getattr(metrics, name)
+        prefix_a, payload_a = metrics.split_judge_prompt(self.render(template, "A"))
+        prefix_b, payload_b = metrics.split_judge_prompt(self.render(template, "B"))
+        assert prefix_a == prefix_b and "Retorne APENAS" in prefix_a
+        assert payload_a.startswith(metrics.PAYLOAD_MARKER)
+        assert "sA" in payload_a or "aA" in payload_a
+
+    def test_fused_prompt_puts_examples_after_the_prefix(self):
+        metric_names = ["tone", "completeness"]
+        first = metrics.split_judge_prompt(metrics._build_fused_prompt("b1", "s1", "r1", metric_names))
+        second = metrics.split_judge_prompt(metrics._build_fused_prompt("b2", "s2", "r2", metric_names))
+        assert first[0] == second[0]
+        assert "s1" in first[1] and "s1" not in first[0]
+
+    def test_implicit_prefix_cache_reports_cached_tokens(self, fake_judge):
+        from langchain_core.messages import HumanMessage
+        first = fake_judge.invoke([HumanMessage(content=self.render(metrics.TONE_PROMPT, "A"))])
+        second = fake_judge.invoke([HumanMessage(content=self.render(metrics.TONE_PROMPT, "B"))])
+        assert "input_token_details" not in first.usage_metadata
+        assert second.usage_metadata["input_token_details"]["cache_read"] > 0
+
+    def test_explicit_context_is_created_once_and_reused(self, fake_judge, monkeypatch):
+        from fake_llm import FakeChatModel
+        plain = metrics.evaluate_tone_score("bug", "story", "ref")
+        monkeypatch.setattr(metrics, "get_evaluator_llm", lambda model=None: cached_llm)
+        cached_llm = FakeChatModel(prefix_cache_min_tokens=64)
+        manager = metrics.configure_judge_context_cache(enabled=True)
+        assert metrics.evaluate_tone_score("bug", "story", "ref") == plain
+        metrics.evaluate_tone_score("outro bug", "outra story", "ref")
+        assert manager.stats() == {"created": 1, "reused": 1, "fallbacks": 0}
+
+    def test_prefix_below_provider_minimum_falls_back(self, fake_judge):
+        fake_judge.prefix_cache_min_tokens = 100_000
+        manager = metrics.configure_judge_context_cache(enabled=True)
+        result = metrics.evaluate_tone_score("bug", "story", "ref")
+        metrics.evaluate_tone_score("bug 2", "story 2", "ref")
+        assert 0.0 <= result["score"] <= 1.0
+        assert manager.stats() == {"created": 0, "reused": 0, "fallbacks": 2}
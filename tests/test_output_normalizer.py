@@ -0,0 +1,59 @@
+"""
+Testes da normalização da saída do gerador (src/output_normalizer.py).
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from output_normalizer import (
+    EMPTY, UNMATCHED, OutputNormalizer, register_prompt_strategies, strategies_for_prompt,
+)
+
+STORY = "# Corrigir login\n\n**Como** um cliente, **Eu quero** entrar, **Para que** eu compre."
+
+
+class TestOutputNormalizer:
+    """Verifica cada estratégia, a ordem da cadeia e os contadores."""
+
+    def test_default_chain_matches_previous_smart_parsing(self):
+        normalizer = OutputNormalizer()
+        xml = normalizer.normalize(f"Raciocínio...\n<user_story>\n{STORY}\n</user_story>\nFim.")
+        header = normalizer.normalize(f"Claro! Segue a história:\n\n{STORY}\n")
+        raw = normalizer.normalize("Sem título nenhum")
+        assert (xml.text, xml.strategy) == (STORY, "xml_tag")
+        assert (header.text, header.strategy) == (STORY, "markdown_header")
+        assert (raw.text, raw.strategy) == ("Sem título nenhum", "raw")
+        assert normalizer.normalize(None).strategy == EMPTY
+        assert normalizer.stats() == {"xml_tag": 1, "markdown_header": 1, "raw": 1, EMPTY: 1, UNMATCHED: 0}
+
+    def test_h2_title_after_reasoning_is_kept(self):
+        result = OutputNormalizer().normalize("Raciocínio aqui.\n## Historia\nComo um cliente...")
+        assert (result.text, result.strategy) == ("## Historia\nComo um cliente...", "markdown_header")
+
+    def test_unclosed_tag_from_stop_sequence(self):
+        assert OutputNormalizer().normalize(f"<user_story>\n{STORY}\n").text == STORY
+
+    def test_chain_without_raw_leaves_text_unmatched(self):
+        normalizer = OutputNormalizer(["xml_tag"])
+        result = normalizer.normalize(STORY)
+        assert (result.text, result.strategy) == (STORY, UNMATCHED)
+
+    def test_registered_strategies_per_prompt(self):
+        register_prompt_strategies("prompt_de_teste_xml", "xml_tag", "raw")
+        assert OutputNormalizer.for_prompt("prompt_de_teste_xml").strategies == ("xml_tag", "raw")
+        assert strategies_for_prompt("prompt_sem_registro") == ("xml_tag", "markdown_header", "raw")
+        assert strategies_for_prompt("bug_to_user_story_v2") == ("xml_tag", "markdown_header", "raw")
+        assert strategies_for_prompt("bug_to_user_story_v1") == ("markdown_header", "raw")
+        with pytest.raises(ValueError):
+            register_prompt_strategies("prompt_de_teste_xml", "json")
+
+    def test_stream_completes_on_closing_tag_split_across_chunks(self):
+        stream = OutputNormalizer().stream()
+        chunks = ["Pensando...<user_", "story>\n", STORY, "\n</user_st", "ory>", "texto extra"]
+        done = [stream.feed(chunk) for chunk in chunks]
+        assert done == [False, False, False, False, True, True]
+        assert "texto extra" not in stream.text()
+        assert stream.finish().text == STORY
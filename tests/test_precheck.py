@@ -0,0 +1,84 @@
+"""
+Testes da pré-checagem estrutural (src/precheck.py).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from precheck import HARD_FAIL_MAX_SCORE, Prechecker, check_acceptance_criteria, check_user_story_format
+
+GOOD_STORY = """# Salvar Perfil com Caracteres Especiais
+
+**Como** um usuario cadastrado na plataforma,
+**Eu quero** salvar meu perfil com qualquer caractere no nome,
+**Para que** eu possa usar meu nome real.
+
+## Criterios de Aceite
+
+### Cenario 1: Salvamento bem-sucedido
+- **Dado** que estou na tela de edicao de perfil
+- **Quando** insiro um nome com acentos e clico em Salvar
+- **Entao** o perfil deve ser salvo com HTTP 200
+
+### Cenario 2: Prevencao do Erro 500
+- **Dado** que o sistema recebe um nome nao-ASCII
+- **Quando** tenta persistir os dados
+- **Então** nao deve ocorrer Erro 500
+
+### Cenário 3: Validacao no frontend
+- **Dado** que estou preenchendo o campo de nome
+- **Quando** insiro caracteres validos
+- **Entao** o frontend deve aceitar a entrada
+"""
+
+PLAIN_V1_STORY = """Como um usuário do sistema, eu quero salvar meu perfil com acentos,
+para que meus dados fiquem corretos.
+
+Critérios de Aceite:
+- O sistema deve aceitar caracteres especiais
+- Não deve retornar erro 500
+"""
+
+
+class TestRules:
+    """Verifica as regras de cada métrica."""
+
+    def test_well_formed_story_goes_to_judge(self):
+        assert not check_user_story_format(GOOD_STORY).short_circuit
+        result = check_acceptance_criteria(GOOD_STORY)
+        assert not result.short_circuit
+        assert all(result.checks.values())
+
+    def test_plain_story_with_criteria_still_goes_to_judge(self):
+        assert not check_user_story_format(PLAIN_V1_STORY).short_circuit
+        assert not check_acceptance_criteria(PLAIN_V1_STORY).short_circuit
+
+    def test_missing_template_is_short_circuited(self):
+        result = check_user_story_format("# Corrigir bug\n\nO botão salvar deve funcionar com acentos no nome do usuário.")
+        assert result.short_circuit
+        local = result.to_metric_result()
+        assert local["score"] <= HARD_FAIL_MAX_SCORE
+        assert "Como/Eu quero/Para que" in local["reasoning"]
+
+    def test_missing_criteria_is_short_circuited(self):
+        story = "# Titulo\n\n**Como** cliente, **Eu quero** comprar sem erros, **Para que** receba meus pedidos."
+        assert check_acceptance_criteria(story).short_circuit
+        assert not check_user_story_format(story).short_circuit
+
+    def test_truncated_output_is_short_circuited(self):
+        assert check_user_story_format("# Titulo").short_circuit
+        assert check_acceptance_criteria("# Titulo").short_circuit
+
+
+class TestPrechecker:
+    """Verifica os contadores de short-circuit."""
+
+    def test_counts_short_circuit_rate(self):
+        prechecker = Prechecker()
+        assert prechecker.run(GOOD_STORY) == {}
+        broken = prechecker.run("Desculpe, não consigo ajudar com isso.")
+        assert set(broken) == {"user_story_format", "acceptance_criteria"}
+        stats = prechecker.stats()
+        assert stats["user_story_format"] == {"checked": 2, "short_circuited": 1, "rate": 0.5}
@@ -0,0 +1,92 @@
+"""
+Testes do modo de profiling (src/profiling.py).
+"""
+
+import os
+import sys
+import json
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from profiling import CpuProfiler, TraceRecorder, configure_profiling, get_trace_recorder, span
+
+
+class TestTraceRecorder:
+    """Verifica os eventos no formato Chrome Trace."""
+
+    def test_span_records_complete_event(self):
+        recorder = TraceRecorder()
+        with recorder.span("judge:Tone Score", "judge", metric="tone"):
+            pass
+
+        event = [e for e in recorder.events() if e["ph"] == "X"][0]
+        assert event["name"] == "judge:Tone Score"
+        assert event["cat"] == "judge"
+        assert event["dur"] >= 0
+        assert event["args"] == {"metric": "tone"}
+
+    def test_threads_and_tasks_get_own_lanes(self):
+        recorder = TraceRecorder()
+
+        def work():
+            with recorder.span("generate", "generate"):
+                pass
+
+        threads = [threading.Thread(target=work, name=f"worker-{i}") for i in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        async def task_work():
+            with recorder.span("judge", "judge"):
+                await asyncio.sleep(0)
+
+        async def main():
+            await asyncio.gather(task_work(), task_work())
+
+        asyncio.run(main())
+
+        lanes = {e["tid"] for e in recorder.events() if e["ph"] == "X"}
+        names = {e["args"]["name"] for e in recorder.events() if e["ph"] == "M"}
+        assert len(lanes) == 4
+        assert {"worker-0", "worker-1"} <= names
+
+    def test_disabled_span_is_noop(self):
+        configure_profiling(enabled=False)
+        with span("generate"):
+            pass
+        assert get_trace_recorder() is None
+
+    def test_cpu_profiler_includes_worker_threads(self):
+        def busy_worker_function():
+            return sum(range(10000))
+
+        profiler = CpuProfiler()
+        profiler.start()
+        t = threading.Thread(target=busy_worker_function)
+        t.start()
+        t.join()
+        stats = profiler.stop()
+
+        assert any(func[2] == "busy_worker_function" for func in stats.stats)
+
+
+class TestProfileRun:
+    """Verifica o trace gerado por uma avaliação completa (provider simulado)."""
+
+    def test_profile_writes_trace(self, fake_provider, tmp_path):
+        import evaluate
+        evaluate.run_evaluation_for_prompt(
+            "bug_to_user_story_v2", use_cache=False, local_dataset="datasets/bug_to_user_story.jsonl",
+            results_dir=str(tmp_path), profile=True
+        )
+
+        trace = json.loads(next(tmp_path.glob("*.trace.json")).read_text(encoding="utf-8"))
+        categories = {e["cat"] for e in trace["traceEvents"] if e["ph"] == "X"}
+        assert {"load_prompt", "chain", "generate", "judge", "parse", "queue", "serialization", "aggregate"} <= categories
+        judge_spans = [e for e in trace["traceEvents"] if e.get("cat") == "judge"]
+        assert len(judge_spans) == 34 * 5
+        assert get_trace_recorder() is None
@@ -11,9 +11,12 @@ Critérios conforme docs/00.proposicao_problema.md:
 """
 
 import os
+import sys
 import pytest
-import yaml
-from langchain_core.prompts import load_prompt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from prompt_loader import load_prompt_config, load_prompt_file
 
 # Caminhos dos prompts
 PROMPTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'prompts')
@@ -26,7 +29,7 @@ V2_PATH = os.path.join(PROMPTS_DIR, 'bug_to_user_story_v2.yml')
 @pytest.fixture
 def v2_prompt():
     """Carrega e retorna o prompt V2 via LangChain."""
-    return load_prompt(V2_PATH)
+    return load_prompt_file(V2_PATH)
 
 @pytest.fixture
 def v2_template(v2_prompt):
@@ -36,8 +39,7 @@ def v2_template(v2_prompt):
 @pytest.fixture
 def v2_yaml():
     """Carrega o YAML bruto do prompt V2 (para verificar metadados)."""
-    with open(V2_PATH, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    return load_prompt_config(V2_PATH)
 
 
 # ================================================================
@@ -287,3 +289,43 @@ class TestAdvancedTechniques:
 
         assert techniques_found >= 2, \
             f"O prompt deve usar pelo menos 2 técnicas avançadas. Encontradas: {techniques_found}."
+
+
+# ================================================================
+# CARREGAMENTO DOS PROMPTS (src/prompt_loader.py)
+# ================================================================
+
+class TestPromptLoader:
+    """Verifica o cache em memória dos prompts compilados."""
+
+    def test_matches_langchain_load_prompt(self):
+        """O parse em memória produz o mesmo template do load_prompt do LangChain."""
+        from langchain_core.prompts import load_prompt
+        for path in (V1_PATH, V2_PATH):
+            expected = load_prompt(path, encoding="utf-8")
+            loaded = load_prompt_file(path)
+            assert loaded.template == expected.template
+            assert loaded.input_variables == expected.input_variables
+
+    def test_cache_hit_and_invalidation_on_edit(self, tmp_path):
+        """O segundo carregamento reaproveita o compilado; editar o arquivo invalida a entrada."""
+        from prompt_loader import PromptCache
+        path = tmp_path / "p.yml"
+        path.write_text('_type: "prompt"\ninput_variables: ["bug_report"]\ntemplate: "Bug: {bug_report}"\n',
+                        encoding="utf-8")
+        cache = PromptCache()
+
+        first = cache.get_prompt(str(path))
+        assert cache.get_prompt(str(path)) is first
+        assert cache.stats()["hits"] == 1
+
+        path.write_text('_type: "prompt"\ninput_variables: ["bug_report"]\ntemplate: "Relato: {bug_report}"\n',
+                        encoding="utf-8")
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+        assert cache.get_prompt(str(path)).template == "Relato: {bug_report}"
+        assert cache.stats()["entries"] == 1
+
+    def test_config_is_a_copy(self):
+        """Modificar o YAML retornado não altera o cache."""
+        load_prompt_config(V2_PATH)["techniques"].append("x")
+        assert "x" not in load_prompt_config(V2_PATH)["techniques"]
@@ -0,0 +1,81 @@
+"""
+Testes do rate limiter compartilhado (src/rate_limiter.py).
+"""
+
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import rate_limiter
+import utils
+from llm_registry import get_llm_registry
+from rate_limiter import ProviderRateLimiter, get_rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters():
+    rate_limiter.reset_rate_limiters()
+    get_llm_registry().invalidate()
+    yield
+    rate_limiter.reset_rate_limiters()
+    get_llm_registry().invalidate()
+
+
+class TestProviderRateLimiter:
+    """Verifica os baldes de RPM/TPM e a contagem de espera."""
+
+    def test_rpm_blocks_after_burst(self):
+        limiter = ProviderRateLimiter(("fake", "m"), rpm=600, burst_seconds=0.1)  # 10 req/s, rajada de 1
+        start = time.perf_counter()
+        for _ in range(3):
+            assert limiter.acquire()
+        assert time.perf_counter() - start >= 0.15
+        assert limiter.stats()["waits"] == 2
+        assert limiter.stats()["total_wait_s"] > 0
+
+    def test_non_blocking_acquire_fails_when_empty(self):
+        limiter = ProviderRateLimiter(("fake", "m"), rpm=60, burst_seconds=1)
+        assert limiter.acquire(blocking=False)
+        assert not limiter.acquire(blocking=False)
+
+    def test_token_debt_delays_next_call(self):
+        limiter = ProviderRateLimiter(("fake", "m"), tpm=6000, burst_seconds=1)  # 100 tokens/s
+        assert limiter.acquire(blocking=False)
+        limiter.record_usage(120)
+        assert not limiter.acquire(blocking=False)
+        assert limiter.stats()["tokens_used"] == 120
+
+
+class TestSharedLimiter:
+    """Verifica o compartilhamento entre os clientes do gerador e do juiz."""
+
+    def test_unconfigured_model_has_no_limiter(self, monkeypatch):
+        monkeypatch.delenv("LLM_RATE_LIMIT_RPM", raising=False)
+        monkeypatch.delenv("LLM_RATE_LIMIT_TPM", raising=False)
+        monkeypatch.delenv("LLM_RATE_LIMITS", raising=False)
+        assert get_rate_limiter("openai", "gpt-4o") is None
+
+    def test_per_model_override(self, monkeypatch):
+        monkeypatch.setenv("LLM_RATE_LIMIT_RPM", "60")
+        monkeypatch.setenv("LLM_RATE_LIMITS", '{"gemini-2.0-flash": {"rpm": 15, "tpm": 1000000}}')
+        assert get_rate_limiter("google", "gemini-2.0-flash").stats()["rpm"] == 15
+        assert get_rate_limiter("openai", "gpt-4o").stats()["rpm"] == 60
+
+    def test_generator_and_judge_share_budget(self, monkeypatch):
+        monkeypatch.setenv("LLM_PROVIDER", "fake")
+        monkeypatch.setenv("FAKE_LLM_LATENCY_MS", "0")
+        monkeypatch.setenv("FAKE_LLM_ERROR_RATE", "0")
+        monkeypatch.setenv("LLM_RATE_LIMIT_RPM", "6000")
+        generator = utils.get_llm("fake-chat", temperature=0.0)
+        judge = utils.get_eval_llm("fake-chat", temperature=0.2)
+        assert generator is not judge
+        assert generator.rate_limiter is judge.rate_limiter
+
+        generator.invoke("Bug Report: \"botão não salva\"")
+        judge.invoke("Avalie o tom. Responda em JSON com score")
+        stats = generator.rate_limiter.stats()
+        assert stats["acquired"] == 2
+        assert stats["tokens_used"] > 0
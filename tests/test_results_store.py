@@ -0,0 +1,116 @@
+"""
+Testes do arquivo de resultados por exemplo e da retomada (src/results_store.py).
+"""
+
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from results_store import ResultsStore, aggregate_scores, is_failed
+
+
+def record(example_id, **scores):
+    return {"example_id": example_id, "output": "story", "error": None, "scores": scores,
+            "reasoning": {}, "timings": {"generation_s": 0.1, "judge_s": 0.2}}
+
+
+class TestResultsStore:
+    """Verifica escrita incremental, leitura tolerante e agregação."""
+
+    def test_append_and_read_back(self, tmp_path):
+        store = ResultsStore(str(tmp_path / "r.jsonl"))
+        store.append(record("a", tone=0.9))
+        store.append(record("b", tone=0.7))
+        assert store.completed_ids() == {"a", "b"}
+
+    def test_truncated_last_line_is_ignored(self, tmp_path):
+        path = tmp_path / "r.jsonl"
+        store = ResultsStore(str(path))
+        store.append(record("a", tone=0.9))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"example_id": "b", "sco')
+        resumed = ResultsStore(str(path), resume=True)
+        assert resumed.completed_ids() == {"a"}
+        resumed.append(record("b", tone=0.7))
+        assert resumed.completed_ids() == {"a", "b"}
+
+    def test_without_resume_starts_fresh(self, tmp_path):
+        path = str(tmp_path / "r.jsonl")
+        ResultsStore(path).append(record("a", tone=0.9))
+        assert ResultsStore(path, resume=False).records() == []
+
+    def test_failed_examples_are_not_completed(self, tmp_path):
+        store = ResultsStore(str(tmp_path / "r.jsonl"))
+        store.append(record("a", tone=0.9))
+        store.append(dict(record("b"), error="timeout"))
+        store.append(record("c", error=0))
+        assert store.completed_ids() == {"a"}
+        assert [is_failed(r) for r in store.records()] == [False, True, True]
+        store.append(record("b", tone=0.7))
+        assert store.completed_ids() == {"a", "b"}
+
+    def test_aggregate_keeps_zero_scores_and_skips_error(self):
+        scores = aggregate_scores([record("a", tone=0.0), record("b", tone=1.0), record("c", error=0)])
+        assert scores == {"tone": [0.0, 1.0]}
+
+
+class TestResume:
+    """Verifica que --resume pula os exemplos já concluídos do mesmo experimento."""
+
+    def run(self, tmp_path, resume):
+        import evaluate
+        return evaluate.run_evaluation_for_prompt(
+            "bug_to_user_story_v2", use_cache=False, local_dataset="datasets/bug_to_user_story.jsonl",
+            results_dir=str(tmp_path), resume=resume
+        )
+
+    def test_resume_skips_finished_examples(self, fake_provider, tmp_path, monkeypatch):
+        import evaluate
+        self.run(tmp_path, resume=False)
+        (results_file,) = tmp_path.glob("*.jsonl")
+        lines = results_file.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 34
+
+        # Simula uma queda no exemplo 30: sobram 30 linhas completas e uma truncada
+        results_file.write_text("\n".join(lines[:30]) + "\n" + lines[30][:20], encoding="utf-8")
+        evaluated = []
+        original = evaluate.GlobalEvaluator.evaluate_run
+
+        def counting_evaluate_run(self, run, example=None):
+            evaluated.append(str(example.id))
+            return original(self, run, example)
+
+        monkeypatch.setattr(evaluate.GlobalEvaluator, "evaluate_run", counting_evaluate_run)
+        resumed = self.run(tmp_path, resume=True)
+        assert len(evaluated) == 4
+        records = [json.loads(l) for l in results_file.read_text(encoding="utf-8").splitlines()]
+        assert len({r["example_id"] for r in records}) == 34
+        # A média final considera os 30 exemplos anteriores + os 4 retomados
+        assert resumed == pytest.approx({m: sum(v) / len(v) for m, v in aggregate_scores(records).items()})
+
+    def test_resume_retries_failed_examples(self, fake_provider, tmp_path, monkeypatch):
+        import evaluate
+        self.run(tmp_path, resume=False)
+        (results_file,) = tmp_path.glob("*.jsonl")
+        records = [json.loads(l) for l in results_file.read_text(encoding="utf-8").splitlines()]
+
+        # Um exemplo com erro na geração e outro sem saída para o juiz
+        records[3].update(output="", error="boom")
+        records[7].update(output="", scores={"error": 0})
+        results_file.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+        evaluated = []
+        original = evaluate.GlobalEvaluator.evaluate_run
+
+        def counting_evaluate_run(self, run, example=None):
+            evaluated.append(str(example.id))
+            return original(self, run, example)
+
+        monkeypatch.setattr(evaluate.GlobalEvaluator, "evaluate_run", counting_evaluate_run)
+        self.run(tmp_path, resume=True)
+        assert sorted(evaluated) == sorted([records[3]["example_id"], records[7]["example_id"]])
+        resumed = ResultsStore(str(results_file), resume=True)
+        assert len(resumed.completed_ids()) == 34
+        assert not any(is_failed(r) for r in resumed.records())
@@ -0,0 +1,198 @@
+"""
+Testes de retry/backoff e hedging das chamadas ao juiz (src/retry.py).
+"""
+
+import os
+import sys
+import asyncio
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import concurrency
+from concurrency import AdaptiveConcurrencyController, concurrency_slot
+from retry import HedgePolicy, JudgeCallStats, RetryPolicy, acall_with_retry, call_with_retry
+from fake_llm import SimulatedProviderError
+
+FAST = RetryPolicy(max_attempts=3, base_delays={"rate_limit": 0.001, "server": 0.001, "timeout": 0.001})
+
+
+def flaky(*errors, result="ok"):
+    """Função que levanta os erros dados, em ordem, e depois retorna `result`."""
+    remaining = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+class TestRetryPolicy:
+    """Verifica o backoff exponencial com jitter e a classificação."""
+
+    def test_backoff_grows_with_jitter(self):
+        policy = RetryPolicy(max_attempts=5)
+        for attempt in range(1, 4):
+            cap = 2.0 * 2 ** (attempt - 1)
+            assert cap / 2 <= policy.delay_for("rate_limit", attempt) <= cap
+
+    def test_non_transient_errors_are_not_retried(self):
+        assert RetryPolicy().delay_for("other", 1) is None
+        assert RetryPolicy(max_attempts=2).delay_for("server", 2) is None
+
+
+class TestCallWithRetry:
+    """Verifica retry de erros transitórios e falha imediata dos definitivos."""
+
+    def test_transient_errors_are_retried(self):
+        stats = JudgeCallStats()
+        fn = flaky(SimulatedProviderError("Rate limit", 429), TimeoutError("timed out"))
+        assert call_with_retry(fn, FAST, stats, "tone", sleep=lambda s: None) == "ok"
+        assert stats.snapshot()["tone"]["retries"] == 2
+        assert stats.snapshot()["tone"]["failures"] == 0
+
+    def test_terminal_error_fails_immediately(self):
+        stats = JudgeCallStats()
+        fn = flaky(ValueError("API key inválida"))
+        with pytest.raises(ValueError):
+            call_with_retry(fn, FAST, stats, "tone", sleep=lambda s: None)
+        assert len(fn.calls) == 1
+        assert stats.snapshot()["tone"]["failures"] == 1
+
+    def test_gives_up_after_max_attempts(self):
+        stats = JudgeCallStats()
+        fn = flaky(*[SimulatedProviderError("Service unavailable", 503)] * 5)
+        with pytest.raises(SimulatedProviderError):
+            call_with_retry(fn, FAST, stats, "tone", sleep=lambda s: None)
+        assert len(fn.calls) == 3
+
+    def test_async_retry(self):
+        stats = JudgeCallStats()
+        fn = flaky(SimulatedProviderError("Rate limit", 429))
+
+        async def afn():
+            return fn()
+
+        assert asyncio.run(acall_with_retry(afn, FAST, stats, "tone")) == "ok"
+        assert stats.snapshot()["tone"]["retries"] == 1
+
+
+class TestHedging:
+    """Verifica o disparo da duplicata após o percentil de latência."""
+
+    def warm(self, hedge, latency_s=0.01):
+        for _ in range(hedge.min_samples):
+            hedge.record("tone", latency_s)
+
+    def test_no_hedge_until_enough_samples(self):
+        hedge = HedgePolicy(min_samples=5)
+        assert hedge.threshold("tone") is None
+        self.warm(hedge)
+        assert hedge.threshold("tone") == pytest.approx(0.01)
+
+    def test_slow_call_is_hedged_and_backup_wins(self):
+        hedge = HedgePolicy(min_samples=5)
+        self.warm(hedge)
+        stats = JudgeCallStats()
+        calls = []
+        lock = threading.Lock()
+
+        def fn():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            time.sleep(0.5 if first else 0.01)
+            return "primary" if first else "backup"
+
+        start = time.perf_counter()
+        assert call_with_retry(fn, FAST, stats, "tone", hedge=hedge) == "backup"
+        assert time.perf_counter() - start < 0.4
+        assert stats.snapshot()["tone"]["hedges"] == 1
+        assert stats.snapshot()["tone"]["hedge_wins"] == 1
+
+    def test_async_hedge_cancels_loser(self):
+        hedge = HedgePolicy(min_samples=5)
+        self.warm(hedge)
+        stats = JudgeCallStats()
+        cancelled = []
+        started = []
+
+        async def afn():
+            started.append(1)
+            try:
+                await asyncio.sleep(0.5 if len(started) == 1 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return len(started)
+
+        assert asyncio.run(acall_with_retry(afn, FAST, stats, "tone", hedge=hedge)) == 2
+        assert cancelled == [1]
+
+    def slotted(self, monkeypatch, max_concurrency):
+        controller = AdaptiveConcurrencyController(1, max_concurrency, initial_concurrency=max_concurrency,
+                                                   verbose=False)
+        monkeypatch.setattr(concurrency, "_controller", controller)
+        return controller
+
+    def test_running_loser_gives_back_its_slot(self, monkeypatch):
+        controller = self.slotted(monkeypatch, 4)
+        hedge = HedgePolicy(min_samples=5)
+        self.warm(hedge)
+        calls = []
+        lock = threading.Lock()
+
+        def fn():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            with concurrency_slot():
+                time.sleep(0.3 if first else 0.01)
+            return "primary" if first else "backup"
+
+        assert call_with_retry(fn, FAST, JudgeCallStats(), "tone", hedge=hedge) == "backup"
+        assert controller.in_flight == 1  # a original ainda está em andamento
+        deadline = time.perf_counter() + 2
+        while controller.in_flight and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert controller.in_flight == 0
+
+    def test_queued_duplicate_never_calls_the_llm(self, monkeypatch):
+        # Pool de 1 thread (limite 1): a duplicata fica na fila e é cancelada quando a original responde
+        controller = self.slotted(monkeypatch, 1)
+        hedge = HedgePolicy(min_samples=5)
+        self.warm(hedge)
+        stats = JudgeCallStats()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            with concurrency_slot():
+                time.sleep(0.1)
+            return "primary"
+
+        assert call_with_retry(fn, FAST, stats, "tone", hedge=hedge) == "primary"
+        time.sleep(0.05)
+        assert calls == [1]
+        assert stats.snapshot()["tone"]["hedges"] == 1
+        assert controller.in_flight == 0
+
+    def test_time_queued_in_the_pool_does_not_trigger_hedge(self, monkeypatch):
+        self.slotted(monkeypatch, 1)
+        hedge = HedgePolicy(min_samples=5)
+        self.warm(hedge, latency_s=0.1)
+        stats = JudgeCallStats()
+        blocker = threading.Event()
+        import retry
+        retry._submit(lambda: blocker.wait(1))  # ocupa a única thread do pool
+        threading.Timer(0.2, blocker.set).start()
+
+        assert call_with_retry(lambda: time.sleep(0.02) or "ok", FAST, stats, "tone", hedge=hedge) == "ok"
+        assert stats.snapshot()["tone"]["hedges"] == 0
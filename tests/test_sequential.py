@@ -0,0 +1,88 @@
+"""
+Testes do teste sequencial com early stopping (src/sequential.py).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from langsmith.evaluation import EvaluationResult
+from local_runner import iter_jsonl_examples
+from sequential import SequentialTester, run_sequential_evaluation
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), '..', 'datasets', 'bug_to_user_story.jsonl')
+
+
+class ConstantEvaluator:
+    """Avaliador simulado: mesmo score para todas as métricas alvo."""
+
+    def __init__(self, score):
+        self.score = score
+        self.calls = 0
+
+    def evaluate_run(self, run, example):
+        self.calls += 1
+        return {"results": [EvaluationResult(key=m, score=self.score, comment="ok")
+                            for m in ("tone", "acceptance_criteria", "user_story_format", "completeness")]}
+
+
+def echo_target(inputs):
+    return {"output": inputs["bug_report"]}
+
+
+class TestSequentialTester:
+    """Verifica os intervalos de confiança e as decisões por métrica."""
+
+    def test_clear_pass_and_fail(self):
+        tester = SequentialTester(["tone", "completeness"], threshold=0.9, max_looks=3, min_examples=10)
+        for i in range(20):
+            tester.add({"tone": 0.97 + (i % 3) * 0.01, "completeness": 0.6 + (i % 3) * 0.01})
+        intervals = tester.intervals()
+        assert intervals["tone"].decision == "pass"
+        assert intervals["completeness"].decision == "fail"
+        assert tester.decided()
+
+    def test_scores_near_threshold_stay_undecided(self):
+        tester = SequentialTester(["tone"], threshold=0.9, max_looks=3, min_examples=10)
+        for i in range(20):
+            tester.add({"tone": 0.85 if i % 2 else 0.95})
+        assert tester.intervals()["tone"].decision == "undecided"
+        assert not tester.decided()
+
+    def test_no_decision_before_min_examples(self):
+        tester = SequentialTester(["tone"], max_looks=1, min_examples=10)
+        for _ in range(5):
+            tester.add({"tone": 1.0})
+        assert not tester.decided()
+
+
+class TestRunSequential:
+    """Verifica a parada antecipada sobre o dataset do repositório."""
+
+    def test_stops_early_when_decided(self, tmp_path):
+        evaluator = ConstantEvaluator(1.0)
+        output = tmp_path / "seq.jsonl"
+        results, tester = run_sequential_evaluation(
+            echo_target, iter_jsonl_examples(DATASET_PATH), evaluator,
+            batch_size=10, max_workers=2, output_path=str(output)
+        )
+        assert len(results) == 10
+        assert evaluator.calls == 10
+        assert tester.decided()
+        assert len(output.read_text(encoding="utf-8").splitlines()) == 10
+
+    def test_runs_full_dataset_when_undecided(self):
+        results, tester = run_sequential_evaluation(
+            echo_target, iter_jsonl_examples(DATASET_PATH), ConstantEvaluator(0.9),
+            batch_size=10, max_workers=2
+        )
+        assert len(results) == 34
+        assert not tester.decided()
+
+    def test_batches_are_reproducible(self):
+        first, _ = run_sequential_evaluation(echo_target, iter_jsonl_examples(DATASET_PATH),
+                                             ConstantEvaluator(1.0), batch_size=10, seed=7)
+        second, _ = run_sequential_evaluation(echo_target, iter_jsonl_examples(DATASET_PATH),
+                                              ConstantEvaluator(1.0), batch_size=10, seed=7)
+        assert {r["example"].id for r in first} == {r["example"].id for r in second}
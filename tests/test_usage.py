@@ -0,0 +1,110 @@
+"""
+Testes da contabilidade de tokens e latência (src/usage.py).
+"""
+
+import os
+import sys
+import json
+import threading
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from langchain_core.messages import AIMessage
+from concurrency import AdaptiveConcurrencyController
+from usage import (example_scope, example_usage_summary, get_usage_tracker, merge_usage, reset_usage_tracker,
+                   track_llm_call, track_stage, usage_totals)
+
+
+def response(input_tokens, output_tokens):
+    return AIMessage(content="ok", usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens,
+                                                   "total_tokens": input_tokens + output_tokens})
+
+
+class TestUsageTracker:
+    """Verifica o registro por etapa e por exemplo."""
+
+    def test_llm_call_records_tokens(self):
+        tracker = reset_usage_tracker()
+        with track_llm_call("judge:Tone Score") as call:
+            call.add_response(response(100, 20))
+        with track_stage("parse"):
+            pass
+
+        stages = tracker.stages()
+        assert stages["judge:Tone Score"]["calls"] == 1
+        assert stages["judge:Tone Score"]["prompt_tokens"] == 100
+        assert stages["judge:Tone Score"]["completion_tokens"] == 20
+        assert stages["parse"]["prompt_tokens"] == 0
+        assert usage_totals(stages)["tokens"] == 120
+
+    def test_cached_prompt_tokens_are_recorded(self):
+        tracker = reset_usage_tracker()
+        message = response(1000, 10)
+        message.usage_metadata["input_token_details"] = {"cache_read": 768}
+        with track_llm_call("judge:Tone Score") as call:
+            call.add_response(message)
+        stages = tracker.stages()
+        assert stages["judge:Tone Score"]["cached_tokens"] == 768
+        assert usage_totals(stages)["cached_tokens"] == 768
+
+    def test_example_scope_collects_only_its_calls(self):
+        reset_usage_tracker()
+        with track_llm_call("generate") as call:
+            call.add_response(response(50, 50))
+        with example_scope() as usage:
+            with track_llm_call("judge:Tone Score") as call:
+                call.add_response(response(10, 5))
+
+        assert list(usage) == ["judge:Tone Score"]
+        assert get_usage_tracker().stages()["generate"]["prompt_tokens"] == 50
+
+    def test_concurrency_wait_counts_as_queue(self):
+        reset_usage_tracker()
+        controller = AdaptiveConcurrencyController(min_concurrency=1, max_concurrency=1, verbose=False)
+        controller.acquire()
+        threading.Timer(0.05, lambda: controller.release(0.01)).start()
+
+        with track_llm_call("generate"):
+            with controller.slot():
+                pass
+
+        assert get_usage_tracker().stages()["generate"]["queue_s"] >= 0.04
+
+    def test_merge_and_example_summary(self):
+        gen = {"generate": {"calls": 1, "prompt_tokens": 10, "completion_tokens": 5, "wall_s": 1.0, "queue_s": 0.0}}
+        judge = {"judge:Tone Score": {"calls": 1, "prompt_tokens": 20, "completion_tokens": 1, "wall_s": 0.5}}
+        records = [
+            {"example_id": "a", "usage": merge_usage([gen, judge]), "timings": {"generation_s": 1.0, "judge_s": 0.5}},
+            {"example_id": "b", "usage": gen, "timings": {"generation_s": 1.0, "judge_s": None}},
+        ]
+        summary = example_usage_summary(records)
+        assert summary["examples"] == 2
+        assert summary["max_example_id"] == "a"
+        assert summary["max_tokens"] == 36
+        assert summary["avg_wall_s"] == pytest.approx(1.25)
+
+
+class TestUsageReport:
+    """Verifica o uso gravado por exemplo em uma avaliação completa (provider simulado)."""
+
+    def test_records_and_summary_include_usage(self, fake_provider, tmp_path):
+        import evaluate
+        run_info = {}
+        evaluate.run_evaluation_for_prompt(
+            "bug_to_user_story_v2", use_cache=False, local_dataset="datasets/bug_to_user_story.jsonl",
+            results_dir=str(tmp_path), run_info=run_info
+        )
+
+        (results_file,) = tmp_path.glob("*.jsonl")
+        records = [json.loads(line) for line in results_file.read_text(encoding="utf-8").splitlines()]
+        assert all({"generate", "judge:Tone Score", "parse"} <= set(r["usage"]) for r in records)
+
+        # A soma por exemplo fecha com o total por etapa (exceto load_prompt, que é da execução)
+        usage = run_info["usage"]
+        per_example_tokens = sum(usage_totals(r["usage"])["tokens"] for r in records)
+        assert per_example_tokens == usage["totals"]["tokens"] > 0
+        assert usage["stages"]["load_prompt"]["calls"] == 1
+
+        summary = json.loads(next(tmp_path.glob("*.summary.json")).read_text(encoding="utf-8"))
+        assert summary["usage"]["per_example"]["examples"] == 34